@@ -6,9 +6,15 @@ from api import models as api_models
 class PostAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("title",)}
 
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "run_at", "locked_by")
+    list_filter = ("status", "name")
+
 admin.site.register(api_models.User)
 admin.site.register(api_models.Profile)
 admin.site.register(api_models.Category)
 admin.site.register(api_models.Post, PostAdmin)
 admin.site.register(api_models.Comment)
 admin.site.register(api_models.Bookmark)
+admin.site.register(api_models.Tag)
+admin.site.register(api_models.Job, JobAdmin)
@@ -1,6 +1,22 @@
 from django.apps import AppConfig
+from django.conf import settings
+
+
+def app_settings(setting, defaults):
+    """
+    The reader for one of the app's settings dicts (COMMENTS, JOB_QUEUE, ...):
+    config(name) is settings.<setting>[name], else defaults[name]. Settings are
+    read on every call, so override_settings applies.
+    """
+    def config(name):
+        return getattr(settings, setting, {}).get(name, defaults[name])
+    return config
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Register the background tasks for both web and worker processes
+        from api import tasks  # noqa: F401
@@ -0,0 +1,198 @@
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from api import engagement
+from api import models as api_models
+from api import serializer as api_serializer
+from api.cache import VALIDATOR_HEADERS, is_personalized, response_cache
+from api.conditional import atag_validators, conditional_response, make_etag, set_validators
+from api.pagination import KeysetCursorPagination
+from api.prefetch import apply_prefetch_plan
+from api.view_counter import record_view
+
+
+class AsyncReadAPIView(View):
+    """
+    Async-native counterpart of the public read views (see api/views.py).
+
+    Same URLs, query parameters and JSON bodies, but every database wait
+    (validators, cache misses, the page itself) is awaited on the async ORM,
+    so under an ASGI server one worker keeps serving other requests while a
+    query is in flight. Serialization happens on the event loop, which is safe
+    because the prefetch plan has loaded every relation the serializer reads.
+
+    JSON only; the browsable API stays on the sync views.
+    """
+    serializer_class = None
+    paginated = True
+    cursor_ordering = None
+    cache_tags = ("posts",)
+    cache_meta = None
+    posts_view = False  # serializes posts, so ?expand=viewer applies
+    renderer = JSONRenderer()
+
+    async def get(self, request, *args, **kwargs):
+        # The DRF wrapper gives the serializers and the paginator `query_params`; the
+        # authenticators only run if something reads `user` (?expand=viewer)
+        self.request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        # ?expand=viewer: the caller's own state, kept out of the shared cache and ETags
+        self.personalized = is_personalized(request)
+        try:
+            etag, last_modified = (None, None) if self.personalized else await self.get_validators()
+            response = conditional_response(request, etag, last_modified)
+            if response is not None:
+                if response.status_code == 304:
+                    await self.not_modified()
+                return response
+
+            key = None
+            if response_cache.enabled and not self.personalized:
+                key = await sync_to_async(response_cache.key_for)(request, self.get_cache_tags(), self.renderer.format)
+                entry = await sync_to_async(response_cache.get)(key)
+                if entry is not None:
+                    await self.cache_hit(entry["meta"])
+                    response = HttpResponse(entry["content"], status=entry["status"], content_type=entry["content_type"])
+                    for header, value in entry.get("headers", {}).items():
+                        response[header] = value
+                    response["X-Cache"] = "HIT"
+                    return set_validators(response, etag, last_modified)
+
+            response = HttpResponse(self.renderer.render(await self.get_data()), content_type="application/json")
+        except APIException as exc:
+            return HttpResponse(self.renderer.render({"detail": exc.detail}), status=exc.status_code, content_type="application/json")
+
+        set_validators(response, etag, last_modified)
+        if key is not None:
+            await sync_to_async(response_cache.set)(key, {
+                "content": response.content,
+                "status": response.status_code,
+                "content_type": response["Content-Type"],
+                "headers": {header: response[header] for header in VALIDATOR_HEADERS if response.has_header(header)},
+                "meta": self.cache_meta,
+            })
+            response["X-Cache"] = "MISS"
+        if self.personalized:
+            response["Cache-Control"] = "private, no-cache"
+        return response
+
+    def get_cache_tags(self):
+        return self.cache_tags
+
+    async def cache_hit(self, meta):
+        pass
+
+    async def not_modified(self):
+        pass
+
+    async def get_validators(self):
+        return None, None
+
+    def get_serializer(self, *args, viewer_state=None, **kwargs):
+        context = {"request": self.request, "view": self}
+        if viewer_state is not None:
+            context["viewer_state"] = viewer_state
+        return self.serializer_class(*args, context=context, **kwargs)
+
+    async def get_viewer_state(self, posts):
+        if not (self.personalized and self.posts_view):
+            return None
+        # Authenticates (a token check, maybe a user lookup) off the event loop
+        user = await sync_to_async(lambda: self.request.user)()
+        return await engagement.aviewer_state(user, [post.id for post in posts])
+
+    async def get_queryset(self):
+        raise NotImplementedError
+
+    async def get_data(self):
+        queryset = await self.get_queryset()
+        if not self.paginated:
+            return self.get_serializer([row async for row in queryset], many=True).data
+
+        paginator = KeysetCursorPagination()
+        page_queryset = paginator.build_page_queryset(queryset, self.request, self)
+        if paginator.wants_count:
+            paginator.count = await queryset.acount()
+        page = paginator.finish_page([row async for row in page_queryset])
+        viewer_state = await self.get_viewer_state(page)
+        return paginator.get_paginated_data(self.get_serializer(page, many=True, viewer_state=viewer_state).data)
+
+
+class AsyncCategoryListAPIView(AsyncReadAPIView):
+    serializer_class = api_serializer.CategorySerializer
+    cursor_ordering = ('id',)
+    cache_tags = ("categories",)
+
+    async def get_validators(self):
+        return await atag_validators(self.request, self.get_cache_tags(), self.renderer.format)
+
+    async def get_queryset(self):
+        return api_models.Category.objects.all()
+
+
+class AsyncPostCategoryListAPIView(AsyncReadAPIView):
+    serializer_class = api_serializer.PostListSerializer
+    posts_view = True
+    cache_tags = ("posts", "categories")
+
+    async def get_validators(self):
+        return await atag_validators(self.request, self.get_cache_tags(), self.renderer.format)
+
+    async def get_queryset(self):
+        category = await api_models.Category.objects.filter(slug=self.kwargs['category_slug']).afirst()
+        if category is None:
+            raise NotFound()
+        posts = api_models.Post.objects.filter(category=category, status="Active")
+        return apply_prefetch_plan(posts, self.get_serializer())
+
+
+class AsyncPostListAPIView(AsyncReadAPIView):
+    serializer_class = api_serializer.PostListSerializer
+    posts_view = True
+    cache_tags = ("posts",)
+
+    async def get_validators(self):
+        return await atag_validators(self.request, self.get_cache_tags(), self.renderer.format)
+
+    async def get_queryset(self):
+        posts = api_models.Post.objects.filter(status="Active")
+        return apply_prefetch_plan(posts, self.get_serializer())
+
+
+class AsyncPostDetailAPIView(AsyncReadAPIView):
+    serializer_class = api_serializer.PostDetailSerializer
+    posts_view = True
+    paginated = False
+
+    def get_cache_tags(self):
+        return (f"post:{self.kwargs['slug']}",)
+
+    async def get_validators(self):
+        # Same validators as PostDetailAPIView: edits and counter updates, not views
+        self.validator_row = await api_models.Post.objects.filter(
+            slug=self.kwargs['slug'], status="Active"
+        ).values('id', 'updated_at').afirst()
+        if self.validator_row is None:
+            return None, None
+        etag = make_etag(self.request.get_full_path(), self.renderer.format, *self.validator_row.values())
+        return etag, self.validator_row['updated_at']
+
+    async def not_modified(self):
+        record_view(self.validator_row['id'])
+
+    async def cache_hit(self, meta):
+        record_view(meta["post_id"])
+
+    async def get_data(self):
+        posts = apply_prefetch_plan(api_models.Post.objects.all(), self.get_serializer())
+        post = await posts.filter(slug=self.kwargs['slug'], status="Active").afirst()
+        if post is None:
+            raise NotFound()
+        # Views are buffered in memory (api/view_counter.py); recording one never waits on the database
+        post.views += record_view(post.id)
+        self.cache_meta = {"post_id": post.id}
+        return self.get_serializer(post, viewer_state=await self.get_viewer_state([post])).data
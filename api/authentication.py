@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.models import TokenUser
+
+from api import models as api_models
+from api.cache import shared_cache
+
+
+def _key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def cached_user(user_id):
+    """
+    The User row for `user_id`, kept in the cache for CLAIMS_USER_CACHE_TIMEOUT
+    seconds and dropped by forget() whenever the user is saved or deleted.
+    """
+    cache = shared_cache()
+    user = cache.get(_key(user_id))
+    if user is None:
+        user = api_models.User.objects.filter(id=user_id).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed("User not found or inactive.", code="user_not_found")
+        cache.set(_key(user_id), user, getattr(settings, "CLAIMS_USER_CACHE_TIMEOUT", 60))
+    return user
+
+
+def forget(user_id):
+    shared_cache().delete(_key(user_id))
+
+
+class ClaimsUser(TokenUser):
+    """
+    The caller as their access token describes them: id, email, username and
+    full_name come from the claims MyTokenObtainPairSerializer puts in the
+    token, without a query. Any other attribute (the profile, a model instance
+    for a foreign key) is read from `instance`, the full User loaded on first
+    use through cached_user(). Filter querysets on `user_id=request.user.id`.
+    """
+
+    @cached_property
+    def email(self):
+        return self.token.get("email", "")
+
+    @cached_property
+    def full_name(self):
+        return self.token.get("full_name", "")
+
+    @cached_property
+    def instance(self):
+        return cached_user(self.id)
+
+    def __getattr__(self, attr):
+        if attr.startswith("_") or attr == "token":
+            raise AttributeError(attr)
+        return getattr(self.instance, attr)
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWTAuthentication without the per-request User query. Access tokens live
+    for five minutes, so a user deactivated in the meantime keeps read access
+    until theirs expires; reach `instance` where that matters.
+    """
+
+    def get_user(self, validated_token):
+        super().get_user(validated_token)  # checks the user id claim is present
+        return ClaimsUser(validated_token)
+
+
+class ClaimsUserMixin:
+    """For read-only views that only need the caller's id: authenticate from the token claims."""
+
+    authentication_classes = [ClaimsJWTAuthentication, SessionAuthentication]
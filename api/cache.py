@@ -0,0 +1,183 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+
+
+class ResponseCache:
+    """
+    Rendered-response cache for the public read endpoints with tag invalidation.
+
+    Each cached response is stored under a key built from the URL path, the
+    sorted query string (so the pagination cursor, page size, ?fields= and
+    ?expand= each get their own entry), the negotiated format and the current
+    version of every tag the view declares. Invalidating a tag bumps its
+    version, which orphans every key built with the old one; the orphaned
+    entries simply age out. Works with any Django cache backend (locmem,
+    file, database, ...).
+    """
+
+    def __init__(self, alias="default", timeout=60, prefix="resp"):
+        self.alias = alias
+        self.timeout = timeout
+        self.prefix = prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    @property
+    def enabled(self):
+        return self.timeout > 0
+
+    def _tag_key(self, tag):
+        return f"{self.prefix}:tag:{tag}"
+
+    def tag_versions(self, tags):
+        keys = [self._tag_key(tag) for tag in tags]
+        versions = self.cache.get_many(keys)
+        for key in keys:
+            if key not in versions:
+                # Start from the clock so an evicted tag can never revive an older entry
+                self.cache.add(key, time.time_ns(), None)
+                versions[key] = self.cache.get(key)
+        return [versions[key] for key in keys]
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            key = self._tag_key(tag)
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.set(key, time.time_ns(), None)
+
+    def key_for(self, request, tags, format=None):
+        query = "&".join(f"{name}={value}" for name, values in sorted(request.GET.lists()) for value in values)
+        if format is None:
+            format = getattr(getattr(request, "accepted_renderer", None), "format", "")
+        raw = "|".join([
+            request.path,
+            query,
+            format,
+            ",".join(f"{tag}={version}" for tag, version in zip(tags, self.tag_versions(tags))),
+        ])
+        return f"{self.prefix}:{hashlib.md5(raw.encode('utf-8')).hexdigest()}"
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, entry):
+        self.cache.set(key, entry, self.timeout)
+
+
+response_cache = ResponseCache(**{
+    "alias": settings.RESPONSE_CACHE.get("ALIAS", "default"),
+    "timeout": settings.RESPONSE_CACHE.get("TIMEOUT", 60),
+})
+
+
+def invalidate(*tags):
+    response_cache.invalidate(*tags)
+
+
+def shared_cache(alias=None):
+    """
+    The cache holding state that every process reads and writes: the tag
+    versions (above), unread counts (api/unread.py), cached users
+    (api/authentication.py) and, under its own alias, throttle buckets
+    (api/throttling.py). See require_shared_cache().
+    """
+    return caches[alias] if alias else response_cache.cache
+
+
+def require_shared_cache(reason):
+    """
+    Refuse to start when writes to shared_cache() stay in this process: a
+    locmem cache would never carry them to the web processes that read them.
+    """
+    if isinstance(shared_cache(), LocMemCache):
+        raise ImproperlyConfigured(
+            f"{reason}, so the per-process locmem cache would hide its invalidations: "
+            "set CACHE_BACKEND=db (after `manage.py createcachetable`) or CACHE_BACKEND=file."
+        )
+
+
+def is_personalized(request):
+    """
+    True when the response carries the caller's own state (?expand=viewer on
+    the post reads), so it must neither be shared through the response cache
+    nor be answered from a shared ETag.
+    """
+    expand = request.GET.get("expand", "")
+    return "viewer" in {item.strip() for item in expand.split(",")}
+
+
+def post_tags(post):
+    """An edit: every feed, the post's page and its comment pages."""
+    return ("posts", f"post:{post.slug}", f"comments:{post.id}")
+
+
+def engagement_tags(post):
+    """
+    A like, bookmark or comment: the post's page only. Feeds are not emptied
+    for a counter change; the counts on their cards catch up when the cached
+    entries expire (RESPONSE_CACHE["TIMEOUT"]).
+    """
+    return (f"post:{post.slug}",)
+
+
+# Validator headers stored with a cached body, so a stale body is never sent with a newer ETag
+VALIDATOR_HEADERS = ("ETag", "Last-Modified")
+
+
+class CachedResponseMixin:
+    """
+    Serve GETs of a public, non-personalized view from the response cache.
+
+    Views declare `cache_tags` (or override get_cache_tags()); a view may set
+    `self.cache_meta` while building the response and gets it back in
+    cache_hit() when a later request is served from the cache.
+    """
+    cache_tags = ("posts",)
+    cache_meta = None
+
+    def get_cache_tags(self):
+        return self.cache_tags
+
+    def cache_hit(self, meta):
+        pass
+
+    def get(self, request, *args, **kwargs):
+        if not response_cache.enabled or is_personalized(request):
+            return super().get(request, *args, **kwargs)
+
+        key = response_cache.key_for(request, self.get_cache_tags())
+        entry = response_cache.get(key)
+        if entry is not None:
+            self.cache_hit(entry["meta"])
+            response = HttpResponse(entry["content"], status=entry["status"], content_type=entry["content_type"])
+            for header, value in entry.get("headers", {}).items():
+                response[header] = value
+            response["X-Cache"] = "HIT"
+            return response
+
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            meta = self.cache_meta
+
+            def store(rendered):
+                response_cache.set(key, {
+                    "content": rendered.content,
+                    "status": rendered.status_code,
+                    "content_type": rendered["Content-Type"],
+                    "headers": {header: rendered[header] for header in VALIDATOR_HEADERS if rendered.has_header(header)},
+                    "meta": meta,
+                })
+
+            response.add_post_render_callback(store)
+        response["X-Cache"] = "MISS"
+        return response
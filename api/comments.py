@@ -0,0 +1,70 @@
+from django.db.models import F
+
+from api import models as api_models
+from api.apps import app_settings
+
+PATH_WIDTH = 10  # digits per id in Comment.path
+
+
+config = app_settings("COMMENTS", {
+    "PREVIEW_SIZE": 3,
+    "MAX_DEPTH": 8,
+})
+
+
+def path_segment(comment_id):
+    return f"{comment_id:0{PATH_WIDTH}d}/"
+
+
+def subtree_bounds(path):
+    """
+    "0000000012/" -> ("0000000012/", "0000000013/"): every path strictly between the two
+    is a descendant. Bumping the last id keeps the bounds to digits, so the range (unlike
+    LIKE 'prefix%') is served by the plain path index under any database collation.
+    """
+    *ancestors, last = ancestor_ids(path)
+    return path, "".join(path_segment(comment_id) for comment_id in ancestors + [last + 1])
+
+
+def ancestor_ids(path):
+    """ "0000000012/0000000034/" -> [12, 34] """
+    return [int(part) for part in path.split("/") if part]
+
+
+def place(comment):
+    """
+    Before a new comment is saved: set its depth under its parent. A reply
+    past MAX_DEPTH is attached to the deepest allowed ancestor instead, so
+    threads never grow deeper (or paths longer) than the UI can show.
+    """
+    parent = comment.parent
+    if parent is None:
+        comment.depth = 0
+        return
+    if parent.depth + 1 >= config("MAX_DEPTH"):
+        ancestors = ancestor_ids(parent.path)
+        comment.parent_id = ancestors[config("MAX_DEPTH") - 2]
+        parent = api_models.Comment.objects.only("id", "depth", "post_id").get(id=comment.parent_id)
+    comment.depth = parent.depth + 1
+    comment.post_id = parent.post_id
+
+
+def thread(comment):
+    """After a new comment is saved: store its materialized path and count it on its parent."""
+    parent_path = ""
+    if comment.parent_id:
+        parent_path = api_models.Comment.objects.values_list("path", flat=True).get(id=comment.parent_id)
+        api_models.Comment.objects.filter(id=comment.parent_id).update(reply_count=F("reply_count") + 1)
+    comment.path = parent_path + path_segment(comment.id)
+    api_models.Comment.objects.filter(id=comment.id).update(path=comment.path)
+
+
+def unthread(comment):
+    """After a comment is deleted (its replies cascade with it): uncount it on its parent."""
+    if comment.parent_id:
+        api_models.Comment.objects.filter(id=comment.parent_id).update(reply_count=F("reply_count") - 1)
+
+
+def preview(queryset):
+    """The comments embedded in feed and detail payloads: the newest few top-level ones."""
+    return queryset.filter(parent__isnull=True).order_by("-date", "-id")[:config("PREVIEW_SIZE")]
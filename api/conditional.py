@@ -0,0 +1,97 @@
+import hashlib
+import time
+
+from asgiref.sync import sync_to_async
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from api.cache import is_personalized, response_cache
+
+
+def make_etag(*parts):
+    digest = hashlib.md5("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _renderer_format(request):
+    renderer = getattr(request, "accepted_renderer", None)
+    return getattr(renderer, "format", "")
+
+
+def _tag_validators(request, versions, format):
+    # The window rolls the tag over at the pace cached lists expire, see tag_validators()
+    window = int(time.time() // (response_cache.timeout or 60))
+    return make_etag(request.get_full_path(), format, window, *versions), None
+
+
+def tag_validators(request, tags, format=None):
+    """
+    (etag, None) for a list endpoint, built from the versions of the response
+    cache tags it declares (api/cache.py). Saves and deletes of the rows a
+    list renders bump those, so this is a cache read however large the table.
+    Counter updates (likes, comments, views) don't bump list tags; they reach
+    a list as its cached entries expire, and the ETag moves on every
+    RESPONSE_CACHE["TIMEOUT"] seconds to match. The full query string is part
+    of the ETag, so every page, cursor and sparse fieldset validates on its
+    own. Lists send no Last-Modified.
+    """
+    format = _renderer_format(request) if format is None else format
+    return _tag_validators(request, response_cache.tag_versions(tags), format)
+
+
+async def atag_validators(request, tags, format="json"):
+    """tag_validators() for async views."""
+    versions = await sync_to_async(response_cache.tag_versions)(tags)
+    return _tag_validators(request, versions, format)
+
+
+def conditional_response(request, etag, last_modified):
+    """The 304 (or 412) to answer with when the client's copy is current, else None."""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    if not (etag or timestamp):
+        return None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None and etag:
+        response["ETag"] = etag
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    # A body from the response cache keeps the validators it was rendered with
+    if response.status_code == 200 and not response.has_header("ETag"):
+        if etag:
+            response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(int(last_modified.timestamp()))
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Answer If-None-Match / If-Modified-Since with 304 before building the response.
+
+    Views implement get_validators() -> (etag, last_modified datetime); it must be
+    far cheaper than the response itself (a cache read or a single indexed lookup).
+    Returning (None, None) skips conditional handling, e.g. to let a 404 happen.
+    """
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def not_modified(self):
+        pass
+
+    def get(self, request, *args, **kwargs):
+        if is_personalized(request):
+            response = super().get(request, *args, **kwargs)
+            response["Cache-Control"] = "private, no-cache"
+            return response
+
+        etag, last_modified = self.get_validators()
+        response = conditional_response(request, etag, last_modified)
+        if response is not None:
+            if response.status_code == 304:
+                self.not_modified()
+            return response
+
+        return set_validators(super().get(request, *args, **kwargs), etag, last_modified)
@@ -0,0 +1,66 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+
+from api.realtime import notification_group
+
+
+@database_sync_to_async
+def user_for_token(raw_token):
+    auth = JWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return AnonymousUser()
+
+
+class JWTQueryStringAuthMiddleware:
+    """
+    Authenticate a WebSocket with the same SimpleJWT access token as the REST
+    API, passed as ?token=<access> (browsers cannot set headers on a socket).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        token = parse_qs(scope.get("query_string", b"").decode()).get("token", [None])[0]
+        scope = dict(scope, user=await user_for_token(token) if token else AnonymousUser())
+        return await self.app(scope, receive, send)
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    """
+    ws/notifications/?token=<access>
+
+    Pushes {"event": "notification.created", ...} for every new notification
+    of the connected user, {"event": "notification.updated", ...} when a
+    coalesced notification takes in another actor, and
+    {"event": "notification.removed", "id": ...} when one is withdrawn
+    (e.g. an unlike), instead of the dashboard polling the notification list.
+    """
+
+    async def connect(self):
+        user = self.scope["user"]
+        if not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.group = notification_group(user.id)
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, "group"):
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # Clients may ping to keep idle proxies from closing the socket
+        if content.get("event") == "ping":
+            await self.send_json({"event": "pong"})
+
+    async def notification_push(self, message):
+        await self.send_json(message["payload"])
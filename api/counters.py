@@ -0,0 +1,109 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from api import models as api_models
+from api import stats
+
+
+# ----------------- Incremental maintenance -------------------
+# Every write path adjusts the stored totals with a single UPDATE ... SET x = x + n,
+# so concurrent requests never overwrite each other's increments. The UPDATE also
+# moves `updated_at`, which the HTTP validators (api/conditional.py) are built from.
+
+def bump_post(post_id, **deltas):
+    """bump_post(post.id, likes_count=1, comments_count=-1)"""
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if changes:
+        api_models.Post.objects.filter(id=post_id).update(updated_at=timezone.now(), **changes)
+
+
+def touch_post(post_id):
+    """Mark a post as changed when something it renders changed elsewhere (e.g. a comment reply)."""
+    api_models.Post.objects.filter(id=post_id).update(updated_at=timezone.now())
+
+
+def touch_posts(posts):
+    """touch_post() for a queryset of posts, e.g. all of an author's when their name changes."""
+    posts.update(updated_at=timezone.now())
+
+
+def comment_added(comment):
+    """Count a new comment on its post and in its post author's rollup for today."""
+    author_id = api_models.Post.objects.filter(id=comment.post_id).values_list("user_id", flat=True).first()
+    if author_id is None:
+        return
+    bump_post(comment.post_id, comments_count=1)
+    stats.record_activity(author_id, comments=1)
+
+
+def comment_removed(comment):
+    """
+    Take a deleted comment back out of its post's total and its author's rollup
+    for the day it was made. Runs per row, so replies cascading with a thread
+    are each counted.
+    """
+    author_id = api_models.Post.objects.filter(id=comment.post_id).values_list("user_id", flat=True).first()
+    if author_id is None:
+        return
+    bump_post(comment.post_id, comments_count=-1)
+    stats.record_activity(author_id, day=timezone.localdate(comment.date), comments=-1)
+
+
+def bump_category(category_id, delta):
+    if category_id and delta:
+        api_models.Category.objects.filter(id=category_id).update(
+            active_post_count=F("active_post_count") + delta, updated_at=timezone.now()
+        )
+
+
+def post_placement_changed(old_category_id, old_status, new_category_id, new_status):
+    """Move a post between categories / in or out of "Active" for the category totals."""
+    if old_category_id == new_category_id and old_status == new_status:
+        return
+    if old_status == "Active":
+        bump_category(old_category_id, -1)
+    if new_status == "Active":
+        bump_category(new_category_id, 1)
+
+
+# ----------------- Reconciliation -------------------
+
+def _count(queryset, key):
+    return Coalesce(Subquery(
+        queryset.filter(**{key: OuterRef("pk")}).order_by().values(key).annotate(total=Count("*")).values("total")
+    ), 0)
+
+
+def actual_post_counts():
+    return {
+        "likes_count": _count(api_models.Post.likes.through.objects.all(), "post_id"),
+        "comments_count": _count(api_models.Comment.objects.all(), "post_id"),
+        "bookmarks_count": _count(api_models.Bookmark.objects.all(), "post_id"),
+    }
+
+
+def actual_category_counts():
+    return {
+        "active_post_count": _count(api_models.Post.objects.filter(status="Active"), "category_id"),
+    }
+
+
+def _drifted_ids(model, expected):
+    annotations = {f"actual_{field}": expression for field, expression in expected.items()}
+    drift = Q()
+    for field in expected:
+        drift |= ~Q(**{field: F(f"actual_{field}")})
+    return list(model.objects.annotate(**annotations).filter(drift).values_list("id", flat=True))
+
+
+def reconcile(model, expected, batch_size=1000, dry_run=False):
+    """
+    Rewrite the stored counters of rows whose value differs from the source
+    tables. Returns the number of drifted rows.
+    """
+    ids = _drifted_ids(model, expected)
+    if not dry_run:
+        for start in range(0, len(ids), batch_size):
+            model.objects.filter(id__in=ids[start:start + batch_size]).update(updated_at=timezone.now(), **expected)
+    return len(ids)
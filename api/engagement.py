@@ -0,0 +1,105 @@
+from django.db import IntegrityError, transaction
+
+from api import counters
+from api.cache import is_personalized
+from api import models as api_models
+
+
+def _remove(rows):
+    return rows.delete()[0]
+
+
+def _toggle(post_id, rows, create, counter):
+    """
+    Flip one (user, post) engagement row and return (engaged, delta, count).
+
+    The existence check is the DELETE itself (an index lookup on the unique
+    (user, post) pair): a row removed means it was an un-like; nothing removed
+    means a like, inserted under a savepoint. If a concurrent request inserted
+    the same row in between, the unique constraint rejects ours and that
+    request has already counted it. The counter therefore moves only when a
+    row really appeared or disappeared, and the count returned is read back
+    from it rather than counted.
+    """
+    with transaction.atomic():
+        if _remove(rows):
+            engaged, delta = False, -1
+        else:
+            try:
+                with transaction.atomic():
+                    create()
+                engaged, delta = True, 1
+            except IntegrityError:
+                engaged, delta = True, 0
+        counters.bump_post(post_id, **{counter: delta})
+        count = api_models.Post.objects.values_list(counter, flat=True).get(id=post_id)
+    return engaged, delta, count
+
+
+def toggle_like(post_id, user_id):
+    """Like or un-like; returns (liked, delta, likes_count)."""
+    Like = api_models.Post.likes.through
+    return _toggle(
+        post_id,
+        Like.objects.filter(post_id=post_id, user_id=user_id),
+        lambda: Like.objects.create(post_id=post_id, user_id=user_id),
+        "likes_count",
+    )
+
+
+def toggle_bookmark(post_id, user_id):
+    """Bookmark or un-bookmark; returns (bookmarked, delta, bookmarks_count)."""
+    return _toggle(
+        post_id,
+        api_models.Bookmark.objects.filter(post_id=post_id, user_id=user_id),
+        lambda: api_models.Bookmark.objects.create(post_id=post_id, user_id=user_id),
+        "bookmarks_count",
+    )
+
+
+def _state(post_ids, liked, bookmarked):
+    return {post_id: {"liked": post_id in liked, "bookmarked": post_id in bookmarked} for post_id in post_ids}
+
+
+def _engaged_rows(user_id, post_ids):
+    # Both lookups are served by the unique (post, user) / (user, post) indexes
+    likes = api_models.Post.likes.through.objects.filter(user_id=user_id, post_id__in=post_ids).values_list("post_id", flat=True)
+    bookmarks = api_models.Bookmark.objects.filter(user_id=user_id, post_id__in=post_ids).values_list("post_id", flat=True)
+    return likes, bookmarks
+
+
+def viewer_state(user, post_ids):
+    """
+    {post_id: {"liked": bool, "bookmarked": bool}} for `user` over a page of
+    posts, in two indexed queries whatever the number of likes on the posts.
+    Anonymous users get all-False without a query.
+    """
+    post_ids = list(post_ids)
+    if user is None or not user.is_authenticated or not post_ids:
+        return _state(post_ids, set(), set())
+    likes, bookmarks = _engaged_rows(user.id, post_ids)
+    return _state(post_ids, set(likes), set(bookmarks))
+
+
+async def aviewer_state(user, post_ids):
+    """viewer_state() on the async ORM."""
+    post_ids = list(post_ids)
+    if user is None or not user.is_authenticated or not post_ids:
+        return _state(post_ids, set(), set())
+    likes, bookmarks = _engaged_rows(user.id, post_ids)
+    return _state(post_ids, {post_id async for post_id in likes}, {post_id async for post_id in bookmarks})
+
+
+class ViewerStateMixin:
+    """
+    For post read views: with ?expand=viewer, look up the caller's like and
+    bookmark flags for the posts being serialized (the page, or the single
+    post) in one batch and hand them to ViewerStateField via the context.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        if args and args[0] is not None and is_personalized(self.request):
+            posts = args[0] if kwargs.get("many") else [args[0]]
+            kwargs.setdefault("context", self.get_serializer_context())
+            kwargs["context"]["viewer_state"] = viewer_state(self.request.user, [post.id for post in posts])
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,149 @@
+import hashlib
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import features, Image, ImageOps
+
+# Size presets per image kind: name -> (width, height). With a height the image is
+# center-cropped to exactly that box (avatars, category tiles); without one it is
+# scaled to the width, keeping its aspect ratio (post images, used as a srcset).
+PRESETS = {
+    "post": {"sm": (480, None), "md": (960, None), "lg": (1600, None)},
+    "profile": {"sm": (64, 64), "md": (128, 128), "lg": (256, 256)},
+    "category": {"sm": (160, 160), "md": (320, 320)},
+}
+
+# Best first; formats this Pillow build cannot encode are skipped
+FORMATS = ("avif", "webp", "jpeg")
+PIL_FORMATS = {"avif": "AVIF", "webp": "WEBP", "jpeg": "JPEG"}
+DEFAULT_QUALITY = {"avif": 50, "webp": 75, "jpeg": 80}
+
+
+def available_formats():
+    wanted = getattr(settings, "IMAGE_VARIANTS", {}).get("FORMATS", FORMATS)
+    return [fmt for fmt in wanted if fmt == "jpeg" or features.check(fmt)]
+
+
+def quality(fmt):
+    return getattr(settings, "IMAGE_VARIANTS", {}).get("QUALITY", {}).get(fmt, DEFAULT_QUALITY[fmt])
+
+
+VARIANTS_DIR = "image/variants"
+
+
+def variant_dir(source_name):
+    # Derived from the source name: the same source (e.g. the default avatar) shares its variants
+    stem = os.path.splitext(os.path.basename(source_name))[0][:40]
+    digest = hashlib.sha1(source_name.encode("utf-8")).hexdigest()[:10]
+    return f"{VARIANTS_DIR}/{stem}-{digest}"
+
+
+def delete_variants(directory, dry_run=False):
+    """Remove a variant directory (see variant_dir()) and its files; returns the bytes freed."""
+    storage = default_storage
+    if not storage.exists(directory):
+        return 0
+    freed = 0
+    for filename in storage.listdir(directory)[1]:
+        name = f"{directory}/{filename}"
+        freed += storage.size(name)
+        if not dry_run:
+            storage.delete(name)
+    if not dry_run:
+        storage.delete(directory)
+    return freed
+
+
+def needs_variants(instance):
+    """True when the instance's image has no variants yet, or they were made from another file."""
+    name = instance.image.name if instance.image else None
+    current = (instance.image_variants or {}).get("source")
+    return name != current
+
+
+def _resize(image, width, height):
+    if height:
+        return ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    if image.width <= width:
+        return image
+    return image.resize((width, round(image.height * width / image.width)), Image.Resampling.LANCZOS)
+
+
+def _encode(image, fmt):
+    if fmt == "jpeg" and image.mode != "RGB":
+        # No alpha in JPEG: flatten onto white
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A") if "A" in image.getbands() else None)
+        image = background
+    buffer = io.BytesIO()
+    # No exif/xmp is passed on, so camera, GPS and editor metadata are stripped
+    image.save(buffer, PIL_FORMATS[fmt], quality=quality(fmt), optimize=fmt == "jpeg")
+    return buffer.getvalue()
+
+
+def build_variants(field_file, kind, overwrite=False):
+    """
+    Render every preset of `kind` in every available format for the image in
+    `field_file` and store them next to the media. Returns the JSON kept in
+    the model's `image_variants`:
+
+        {"source": "image/a.jpg", "width": 3000, "height": 2000,
+         "variants": {"sm": {"width": 480, "height": 320,
+                             "files": {"avif": "image/variants/...", ...}}, ...}}
+
+    Presets wider than the original are skipped (never upscale), except the
+    smallest one, so every image gets at least one variant. Files that
+    already exist are reused unless `overwrite` is set. Variants go to the
+    default storage: they are derived files owned by the source's JSON, not
+    reference-counted blobs.
+    """
+    storage = default_storage
+    with field_file.open("rb") as source:
+        with Image.open(source) as original:
+            original.seek(0)  # first frame of animated images
+            image = ImageOps.exif_transpose(original)
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+    directory = variant_dir(field_file.name)
+    variants = {}
+    presets = sorted(PRESETS[kind].items(), key=lambda item: item[1][0])
+    for index, (preset, (width, height)) in enumerate(presets):
+        if index and width > image.width and not height:
+            continue
+        resized = _resize(image, width, height)
+        files = {}
+        for fmt in available_formats():
+            name = f"{directory}/{preset}.{fmt}"
+            if storage.exists(name):
+                if not overwrite:
+                    files[fmt] = name
+                    continue
+                storage.delete(name)
+            files[fmt] = storage.save(name, ContentFile(_encode(resized, fmt)))
+        variants[preset] = {"width": resized.width, "height": resized.height, "files": files}
+
+    return {"source": field_file.name, "width": image.width, "height": image.height, "variants": variants}
+
+
+def variant_urls(data, storage=default_storage, build_url=None):
+    """
+    The API shape of stored variants: per preset the size and one URL per
+    format, plus a ready-made `srcset` per format for <picture>/<img>.
+    """
+    build_url = build_url or (lambda url: url)
+    variants = {}
+    srcset = {}
+    for preset, variant in data["variants"].items():
+        urls = {fmt: build_url(storage.url(name)) for fmt, name in variant["files"].items()}
+        variants[preset] = {"width": variant["width"], "height": variant["height"], **urls}
+        for fmt, url in urls.items():
+            srcset.setdefault(fmt, []).append(f"{url} {variant['width']}w")
+    return {
+        "width": data["width"],
+        "height": data["height"],
+        "variants": variants,
+        "srcset": {fmt: ", ".join(entries) for fmt, entries in srcset.items()},
+    }
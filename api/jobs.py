@@ -0,0 +1,143 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api import models as api_models
+from api.apps import app_settings
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+config = app_settings("JOB_QUEUE", {
+    "EAGER": False,
+    "MAX_ATTEMPTS": 5,
+    "BACKOFF_BASE": 10,
+    "BACKOFF_MAX": 3600,
+    "LOCK_TIMEOUT": 600,
+})
+
+
+def task(func=None, *, name=None, max_attempts=None):
+    """
+    Register a function as a background task:
+
+        @task
+        def send_welcome_email(user_id): ...
+
+        enqueue(send_welcome_email, user_id=user.id)
+
+    Tasks receive their JSON payload as keyword arguments and may run more
+    than once (a retry after a crash mid-task), so they should be idempotent.
+    """
+    def register(func):
+        func.task_name = name or f"{func.__module__}.{func.__name__}"
+        func.max_attempts = max_attempts
+        _registry[func.task_name] = func
+        return func
+    return register(func) if func else register
+
+
+def enqueue(func, delay=0, unique=False, **payload):
+    """
+    Queue a call of a registered task. The row is written in the caller's
+    transaction, so a rolled-back request never leaves a job behind. With
+    JOB_QUEUE["EAGER"] the task runs right away instead (development, tests).
+    With `unique`, an identical call still waiting in the queue is reused.
+    """
+    eager = config("EAGER")
+    if unique and not eager:
+        waiting = api_models.Job.objects.filter(name=func.task_name, payload=payload, status="queued").first()
+        if waiting is not None:
+            return waiting
+    now = timezone.now()
+    job = api_models.Job.objects.create(
+        name=func.task_name,
+        payload=payload,
+        max_attempts=func.max_attempts or config("MAX_ATTEMPTS"),
+        run_at=now + timedelta(seconds=delay),
+        # An eager job is created already claimed, as its first attempt
+        status="running" if eager else "queued",
+        attempts=1 if eager else 0,
+        locked_by="eager" if eager else None,
+        locked_at=now if eager else None,
+    )
+    if eager:
+        run_job(job)
+    return job
+
+
+def backoff(attempts):
+    """Exponential backoff with jitter: ~base, 2*base, 4*base, ... capped at BACKOFF_MAX seconds."""
+    delay = min(config("BACKOFF_BASE") * 2 ** (attempts - 1), config("BACKOFF_MAX"))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def requeue_stale():
+    """Put jobs back in the queue whose worker died while running them."""
+    cutoff = timezone.now() - timedelta(seconds=config("LOCK_TIMEOUT"))
+    return api_models.Job.objects.filter(status="running", locked_at__lt=cutoff).update(
+        status="queued", locked_by=None, locked_at=None
+    )
+
+
+def claim(worker_id, limit=1):
+    """
+    Take up to `limit` due jobs for this worker. Each claim is a conditional
+    UPDATE (status queued -> running), so two workers racing for the same row
+    can never both win it, on any database.
+    """
+    now = timezone.now()
+    candidates = api_models.Job.objects.filter(status="queued", run_at__lte=now).order_by("run_at", "id")
+    claimed = []
+    for job_id in candidates.values_list("id", flat=True)[:limit * 4]:
+        won = api_models.Job.objects.filter(id=job_id, status="queued").update(
+            status="running", locked_by=worker_id, locked_at=now, attempts=F("attempts") + 1
+        )
+        if won:
+            claimed.append(job_id)
+            if len(claimed) == limit:
+                break
+    return list(api_models.Job.objects.filter(id__in=claimed).order_by("run_at", "id"))
+
+
+def run_job(job):
+    """Run a claimed job. Done jobs are deleted; failures are retried with backoff until max_attempts."""
+    func = _registry.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f"No task registered as {job.name!r}")
+        with transaction.atomic():
+            func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.error("Job %s (%s) failed for good after %s attempts", job.id, job.name, job.attempts)
+            api_models.Job.objects.filter(id=job.id).update(status="failed", last_error=error, locked_by=None)
+        else:
+            logger.warning("Job %s (%s) failed, attempt %s of %s", job.id, job.name, job.attempts, job.max_attempts)
+            api_models.Job.objects.filter(id=job.id).update(
+                status="queued",
+                last_error=error,
+                locked_by=None,
+                locked_at=None,
+                run_at=timezone.now() + timedelta(seconds=backoff(job.attempts)),
+            )
+        return False
+    api_models.Job.objects.filter(id=job.id).delete()
+    return True
+
+
+def run_due(worker_id, limit=1):
+    """Claim and run up to `limit` due jobs; returns how many were run."""
+    claimed = claim(worker_id, limit)
+    for job in claimed:
+        ok = run_job(job)
+        logger.info("[%s] %s #%s: %s", worker_id, job.name, job.id, "done" if ok else "failed")
+    return len(claimed)
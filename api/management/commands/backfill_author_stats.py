@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from api import models as api_models
+from api import stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the AuthorDailyStats rollup from the post, comment and bookmark tables, in chunks of authors. "
+        "Views and likes already recorded per day are kept; only the untracked remainder is backfilled."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=200, help="Authors rebuilt per transaction.")
+        parser.add_argument("--author", type=int, action="append", dest="authors", help="Only rebuild this author id (repeatable).")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        author_ids = options["authors"] or list(
+            api_models.Post.objects.order_by("user_id").values_list("user_id", flat=True).distinct()
+        )
+
+        rows = 0
+        for start in range(0, len(author_ids), chunk_size):
+            chunk = author_ids[start:start + chunk_size]
+            rows += stats.rebuild_author_stats(chunk)
+            self.stdout.write(f"Rebuilt {min(start + chunk_size, len(author_ids))}/{len(author_ids)} authors")
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} daily rollup row(s)."))
@@ -0,0 +1,95 @@
+import http.client
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import models as api_models
+
+
+def default_paths():
+    """The four public read endpoints, against real rows of this database."""
+    post = api_models.Post.objects.filter(status="Active").order_by("-id").first()
+    category = api_models.Category.objects.order_by("id").first()
+    paths = ["/api/v1/post/lists/", "/api/v1/post/category/list/"]
+    if category:
+        paths.append(f"/api/v1/post/category/posts/{category.slug}/")
+    if post:
+        paths.append(f"/api/v1/post/detail/{post.slug}/")
+    return paths
+
+
+class Client(threading.local):
+    """One keep-alive connection per benchmark thread."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.connection = connection_class(parts.netloc, timeout=30)
+
+    def get(self, path):
+        try:
+            self.connection.request("GET", path, headers={"Accept": "application/json"})
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent read throughput of running servers, e.g. the sync WSGI stack against "
+        "the ASGI + async views profile:\n"
+        "  RESPONSE_CACHE_TIMEOUT=0 gunicorn backend.wsgi:application -w 4 -b 127.0.0.1:8000\n"
+        "  RESPONSE_CACHE_TIMEOUT=0 ASYNC_READ_VIEWS=true CHANNEL_LAYER=none gunicorn backend.asgi:application "
+        "-k uvicorn_worker.UvicornWorker -w 4 -b 127.0.0.1:8001\n"
+        "  manage.py bench_read_throughput --target sync=http://127.0.0.1:8000 --target async=http://127.0.0.1:8001\n"
+        "Disable the response cache on both servers, or every read is a cache hit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", action="append", required=True, help="name=base URL of a running server (repeatable).")
+        parser.add_argument("--path", action="append", help="Path to request (repeatable); defaults to the public read endpoints.")
+        parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight at once.")
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per target.")
+        parser.add_argument("--warmup", type=int, default=100, help="Unmeasured requests per target first.")
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options["target"]:
+            name, sep, url = target.partition("=")
+            if not sep or not url.startswith(("http://", "https://")):
+                raise CommandError(f"--target must look like name=http://host:port, got {target!r}")
+            targets.append((name, url.rstrip("/")))
+        paths = options["path"] or default_paths()
+
+        self.stdout.write(f"{len(paths)} path(s), {options['requests']} requests per target, concurrency {options['concurrency']}")
+        self.stdout.write(f"{'target':<12}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for name, url in targets:
+            client = Client(url)
+            self.run(client, paths, options["warmup"], options["concurrency"])
+            elapsed, latencies, errors = self.run(client, paths, options["requests"], options["concurrency"])
+            quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+            self.stdout.write(
+                f"{name:<12}{len(latencies) / elapsed:>10.1f}{quantiles[49] * 1000:>10.1f}"
+                f"{quantiles[94] * 1000:>10.1f}{quantiles[98] * 1000:>10.1f}{errors:>8}"
+            )
+
+    def run(self, client, paths, count, concurrency):
+        def one(i):
+            start = time.perf_counter()
+            status = client.get(paths[i % len(paths)])
+            return time.perf_counter() - start, status
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(count)))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, status in results if status == 200]
+        return elapsed, latencies, count - len(latencies)
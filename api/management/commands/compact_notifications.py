@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api import notifications
+
+
+class Command(BaseCommand):
+    help = "Delete (optionally archiving first) seen notifications older than the retention period, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.NOTIFICATION_RETENTION_DAYS, help="Keep seen notifications updated within this many days.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows deleted per transaction.")
+        parser.add_argument("--archive", help="Append the removed rows to this file as JSON lines.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many rows would be removed.")
+
+    def handle(self, *args, **options):
+        archive = open(options["archive"], "a", encoding="utf-8") if options["archive"] and not options["dry_run"] else None
+        try:
+            removed = notifications.compact(options["days"], options["batch_size"], archive, options["dry_run"])
+        finally:
+            if archive is not None:
+                archive.close()
+        verb = "Would remove" if options["dry_run"] else "Removed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} seen notification(s) older than {options['days']} days."))
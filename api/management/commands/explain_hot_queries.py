@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api import comments as comment_threads
+from api import models as api_models
+
+INDEXED_MODELS = (api_models.Post, api_models.Comment, api_models.Notification, api_models.Tag, api_models.PostTag)
+
+
+def hot_queries():
+    """The query shapes behind the feeds, dashboards and engagement toggles."""
+    post = api_models.Post.objects.order_by("-id").first()
+    post_id = post.id if post else 1
+    user_id = post.user_id if post else 1
+    category_id = post.category_id if post else 1
+    tag_id = api_models.Tag.objects.values_list("id", flat=True).first() or 1
+    low, high = comment_threads.subtree_bounds(comment_threads.path_segment(1))
+    now = timezone.now()
+
+    active = api_models.Post.objects.filter(status="Active").order_by("-date", "-id")
+    return [
+        ("Active feed, first page", active[:21]),
+        ("Active feed, deep keyset page", active.filter(Q(date__lt=now) | Q(date=now, id__lt=post_id))[:21]),
+        ("Category feed", active.filter(category_id=category_id)[:21]),
+        ("Tag feed", active.filter(tag_links__tag_id=tag_id)[:21]),
+        ("Tag cloud", api_models.Tag.objects.filter(post_count__gt=0).order_by("-post_count", "name")[:100]),
+        ("Author dashboard posts", api_models.Post.objects.filter(user_id=user_id).order_by("-id")[:21]),
+        ("Unseen notifications", api_models.Notification.objects.filter(user_id=user_id, seen=False).order_by("-updated", "-id")[:21]),
+        ("Bookmark lookup", api_models.Bookmark.objects.filter(post_id=post_id, user_id=user_id)),
+        ("Top-level comments page", api_models.Comment.objects.filter(post_id=post_id, parent__isnull=True).order_by("-date", "-id")[:21]),
+        ("Replies page", api_models.Comment.objects.filter(post_id=post_id, parent_id=1).order_by("date", "id")[:21]),
+        ("Thread subtree", api_models.Comment.objects.filter(post_id=post_id, path__gt=low, path__lt=high).order_by("path")[:21]),
+        ("Comments on an author's posts", api_models.Comment.objects.filter(post__user_id=user_id).order_by("-id")[:21]),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Print EXPLAIN plans for the hot query shapes. With --compare, also print the plans "
+        "with the tuned indexes dropped inside a rolled-back transaction (SQLite and PostgreSQL "
+        "both have transactional DDL), for a before/after view."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--compare", action="store_true", help="Also show the plans without the tuned indexes.")
+        parser.add_argument("--analyze", action="store_true", help="PostgreSQL only: EXPLAIN ANALYZE (runs the queries).")
+
+    def handle(self, *args, **options):
+        explain_options = {"analyze": True} if options["analyze"] and connection.vendor == "postgresql" else {}
+
+        if options["compare"]:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for model in INDEXED_MODELS:
+                        for index in model._meta.indexes:
+                            cursor.execute(f"DROP INDEX IF EXISTS {connection.ops.quote_name(index.name)}")
+                self.print_plans("BEFORE (without tuned indexes)", explain_options)
+                transaction.set_rollback(True)
+
+        self.print_plans("AFTER" if options["compare"] else "CURRENT", explain_options)
+
+    def print_plans(self, title, explain_options):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== {title} [{connection.vendor}] =="))
+        for label, queryset in hot_queries():
+            self.stdout.write(self.style.SUCCESS(label))
+            self.stdout.write(f"  {queryset.query}")
+            for line in queryset.explain(**explain_options).splitlines():
+                self.stdout.write(f"    {line}")
+            self.stdout.write("")
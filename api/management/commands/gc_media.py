@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api import storage
+from api import uploads
+
+
+class Command(BaseCommand):
+    help = "Delete content-addressed media blobs that no profile, category or post references any more, their image variants, and expired uploads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-hours", type=float, default=24, help="Keep orphans uploaded (or re-uploaded) more recently than this.")
+        parser.add_argument("--recount", action="store_true", help="Recompute reference counts from the tables first.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted.")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+
+        if options["recount"]:
+            drifted = storage.recount(dry_run)
+            self.stdout.write(f"{'Found' if dry_run else 'Repaired'} {drifted} blob(s) with drifted reference counts.")
+
+        if not dry_run:
+            # First, so blobs of completed uploads that were never attached become collectable
+            expired = uploads.purge_expired()
+            self.stdout.write(f"Dropped {expired} expired upload(s).")
+
+        removed, freed = storage.collect_garbage(timedelta(hours=options["grace_hours"]), dry_run)
+        verb = "Would delete" if dry_run else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {removed} orphaned blob(s), {freed / 1024 / 1024:.1f} MiB."))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api import images
+from api import jobs
+from api import models as api_models
+from api import tasks
+
+MODELS = {"post": api_models.Post, "profile": api_models.Profile, "category": api_models.Category}
+
+
+class Command(BaseCommand):
+    help = "Queue (or, with --now, build) the resized image variants of existing posts, profiles and categories."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", choices=sorted(MODELS), action="append", help="Limit to these models (repeatable).")
+        parser.add_argument("--force", action="store_true", help="Rebuild (and overwrite) even up-to-date variants, e.g. after changing the presets.")
+        parser.add_argument("--now", action="store_true", help="Build in this process instead of queueing jobs.")
+
+    def handle(self, *args, **options):
+        for name in options["model"] or sorted(MODELS):
+            rows = MODELS[name].objects.exclude(Q(image__isnull=True) | Q(image="")).only("id", "image", "image_variants")
+            done = 0
+            for instance in rows.iterator(chunk_size=500):
+                if not options["force"] and not images.needs_variants(instance):
+                    continue
+                if options["now"]:
+                    tasks.generate_image_variants(model=name, pk=instance.pk, force=options["force"])
+                else:
+                    jobs.enqueue(tasks.generate_image_variants, unique=True, model=name, pk=instance.pk, force=options["force"])
+                done += 1
+            verb = "Built" if options["now"] else "Queued"
+            self.stdout.write(self.style.SUCCESS(f"{verb} variants for {done} {name}(s)."))
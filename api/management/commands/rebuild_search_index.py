@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api import models as api_models
+from api import search
+
+
+class Command(BaseCommand):
+    help = "Re-index every post in the full-text search index."
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        count = 0
+        for post in api_models.Post.objects.only("id", "title", "tags", "description").iterator(chunk_size=500):
+            backend.index(post)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} post(s) with {type(backend).__name__}."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from api import counters
+from api import models as api_models
+
+
+class Command(BaseCommand):
+    help = "Repair drift in the denormalized like/comment/bookmark/post counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows rewritten per UPDATE.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many rows have drifted.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        dry_run = options["dry_run"]
+
+        posts = counters.reconcile(api_models.Post, counters.actual_post_counts(), batch_size, dry_run)
+        categories = counters.reconcile(api_models.Category, counters.actual_category_counts(), batch_size, dry_run)
+
+        verb = "Found" if dry_run else "Repaired"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {posts} post(s) and {categories} category(ies) with drifted counters."))
@@ -0,0 +1,105 @@
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from api import cache, jobs, realtime
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (emails, notifications, ...) until interrupted."
+    max_backoff = 60  # seconds between retries while claiming keeps failing
+
+    def add_arguments(self, parser):
+        queue = getattr(settings, "JOB_QUEUE", {})
+        parser.add_argument("--concurrency", type=int, default=queue.get("CONCURRENCY", 2), help="Worker threads.")
+        parser.add_argument(
+            "--poll-interval", type=float, default=queue.get("POLL_INTERVAL", 1.0),
+            help="Seconds to wait before polling an empty queue again.",
+        )
+        parser.add_argument("--burst", action="store_true", help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        self.check_shared_state()
+        self.stop = threading.Event()
+        signal.signal(signal.SIGINT, lambda *_: self.stop.set())
+        signal.signal(signal.SIGTERM, lambda *_: self.stop.set())
+
+        # A peer worker that crashed mid-job leaves it "running"; sweep for those at startup
+        # and then once per lease, not only when some worker happens to restart
+        self.requeue_interval = jobs.config("LOCK_TIMEOUT")
+        self.next_requeue = 0
+        self.maybe_requeue()
+
+        base_id = f"{socket.gethostname()}:{os.getpid()}"
+        threads = [
+            threading.Thread(target=self.work, args=(f"{base_id}:{i}", options), daemon=True)
+            for i in range(max(1, options["concurrency"]))
+        ]
+        self.stdout.write(self.style.SUCCESS(f"Worker {base_id} running {len(threads)} thread(s)."))
+        for thread in threads:
+            thread.start()
+        # Join with a timeout so the main thread keeps receiving signals
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+            self.maybe_requeue()
+        connection.close()
+        self.stdout.write("Worker stopped.")
+
+    def check_shared_state(self):
+        # Jobs push notifications to sockets served by the web processes, and invalidate
+        # cached responses and unread counts the web processes serve
+        reason = "Jobs run in this worker, apart from the web processes"
+        try:
+            realtime.require_shared_layer(reason)
+            cache.require_shared_cache(reason)
+        except ImproperlyConfigured as error:
+            raise CommandError(str(error))
+
+    def maybe_requeue(self):
+        if time.monotonic() < self.next_requeue:
+            return
+        self.next_requeue = time.monotonic() + self.requeue_interval
+        close_old_connections()
+        try:
+            requeued = jobs.requeue_stale()
+        except Exception as error:
+            # The database being briefly away must not take the worker down; the next sweep retries
+            self.stderr.write(f"Could not requeue orphaned jobs: {error}")
+            return
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} orphaned job(s).")
+
+    def work(self, worker_id, options):
+        # Every thread has its own database connection
+        failures = 0
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                try:
+                    ran = jobs.run_due(worker_id)
+                except Exception:
+                    # A lost connection or a bug in the claim must not silently take this thread
+                    # down while the process stays up: log, drop the connection, back off, go on
+                    failures += 1
+                    logger.exception("Worker %s could not claim or run jobs (failure %s in a row).", worker_id, failures)
+                    connection.close()
+                    self.stop.wait(min(options["poll_interval"] * 2 ** failures, self.max_backoff))
+                    continue
+                failures = 0
+                if not ran:
+                    if options["burst"]:
+                        break
+                    self.stop.wait(options["poll_interval"])
+        finally:
+            connection.close()
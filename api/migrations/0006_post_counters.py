@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:28
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, key):
+    return Coalesce(Subquery(
+        queryset.filter(**{key: OuterRef('pk')}).order_by().values(key).annotate(total=Count('*')).values('total')
+    ), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model('api', 'Post')
+    Category = apps.get_model('api', 'Category')
+    Comment = apps.get_model('api', 'Comment')
+    Bookmark = apps.get_model('api', 'Bookmark')
+
+    Post.objects.update(
+        likes_count=_count(Post.likes.through.objects.all(), 'post_id'),
+        comments_count=_count(Comment.objects.all(), 'post_id'),
+        bookmarks_count=_count(Bookmark.objects.all(), 'post_id'),
+    )
+    Category.objects.update(
+        active_post_count=_count(Post.objects.filter(status='Active'), 'category_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_alter_notification_options_comment_user_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='active_post_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='bookmarks_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
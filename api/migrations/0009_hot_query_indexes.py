@@ -0,0 +1,66 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:33
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_bookmarks(apps, schema_editor):
+    # Concurrent double-taps could create the same (user, post) bookmark twice; keep the oldest.
+    Bookmark = apps.get_model('api', 'Bookmark')
+    Post = apps.get_model('api', 'Post')
+
+    duplicates = (
+        Bookmark.objects.order_by().values('user_id', 'post_id')
+        .annotate(keep=Min('id'), total=Count('id')).filter(total__gt=1)
+    )
+    post_ids = set()
+    for row in duplicates:
+        Bookmark.objects.filter(user_id=row['user_id'], post_id=row['post_id']).exclude(id=row['keep']).delete()
+        post_ids.add(row['post_id'])
+
+    if post_ids:
+        totals = (
+            Bookmark.objects.filter(post_id=OuterRef('pk')).order_by()
+            .values('post_id').annotate(total=Count('*')).values('total')
+        )
+        Post.objects.filter(id__in=post_ids).update(bookmarks_count=Coalesce(Subquery(totals), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_post_category_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-date'], name='comment_post_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'seen', '-id'], name='noti_user_seen_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('status', 'Active')), fields=['-date', '-id'], name='post_active_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('status', 'Active')), fields=['category', '-date', '-id'], name='post_active_category_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('status', 'Active')), fields=['updated_at'], name='post_active_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['user', '-id'], name='post_user_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_bookmarks, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='bookmark',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_user_post_bookmark'),
+        ),
+    ]
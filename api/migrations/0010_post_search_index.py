@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:52
+
+from django.conf import settings
+from django.db import migrations, OperationalError
+from django.utils.html import strip_tags
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    Post = apps.get_model('api', 'Post')
+
+    if connection.vendor == 'postgresql':
+        config = getattr(settings, 'SEARCH_CONFIG', 'english')
+        schema_editor.execute(
+            "CREATE TABLE api_post_search ("
+            " post_id bigint PRIMARY KEY REFERENCES api_post(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,"
+            " document tsvector NOT NULL)"
+        )
+        schema_editor.execute("CREATE INDEX api_post_search_document_idx ON api_post_search USING GIN (document)")
+        schema_editor.execute(
+            "INSERT INTO api_post_search (post_id, document) "
+            "SELECT id,"
+            " setweight(to_tsvector(%s::regconfig, COALESCE(title, '')), 'A') ||"
+            " setweight(to_tsvector(%s::regconfig, replace(COALESCE(tags, ''), ',', ' ')), 'B') ||"
+            " setweight(to_tsvector(%s::regconfig, regexp_replace(COALESCE(description, ''), '<[^>]+>', ' ', 'g')), 'C') "
+            "FROM api_post",
+            [config, config, config],
+        )
+    elif connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE api_post_fts USING fts5(title, tags, description, tokenize='porter unicode61')"
+            )
+        except OperationalError:
+            return # SQLite built without FTS5: api.search falls back to a LIKE scan
+        for post in Post.objects.values('id', 'title', 'tags', 'description').iterator():
+            schema_editor.execute(
+                "INSERT INTO api_post_fts (rowid, title, tags, description) VALUES (%s, %s, %s, %s)",
+                [post['id'], post['title'] or '', (post['tags'] or '').replace(',', ' '), strip_tags(post['description'] or '')],
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS api_post_search")
+    elif schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS api_post_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
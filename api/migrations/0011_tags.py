@@ -0,0 +1,71 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def parse_existing_tags(apps, schema_editor):
+    # Same rules as api.tags.parse_tags, frozen here for the migration
+    Post = apps.get_model('api', 'Post')
+    Tag = apps.get_model('api', 'Tag')
+    PostTag = apps.get_model('api', 'PostTag')
+
+    tags = {}
+    links = set()
+    active = {}
+    for post_id, raw, status in Post.objects.exclude(tags__isnull=True).exclude(tags='').values_list('id', 'tags', 'status').iterator():
+        for part in raw.split(','):
+            name = part.strip()[:50]
+            slug = slugify(name)
+            if not slug:
+                continue
+            tags.setdefault(slug, name)
+            if (post_id, slug) not in links:
+                links.add((post_id, slug))
+                active[slug] = active.get(slug, 0) + (status == 'Active')
+
+    Tag.objects.bulk_create(
+        [Tag(name=name, slug=slug, post_count=active[slug]) for slug, name in tags.items()], batch_size=500
+    )
+    tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+    PostTag.objects.bulk_create(
+        [PostTag(post_id=post_id, tag_id=tag_ids[slug]) for post_id, slug in links], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_post_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('slug', models.SlugField(max_length=60, unique=True)),
+                ('post_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Tags',
+                'ordering': ['name'],
+                'indexes': [models.Index(fields=['-post_count', 'name'], name='tag_cloud_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='api.post')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_links', to='api.tag')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tag', 'post'], name='post_tag_lookup_idx')],
+                'constraints': [models.UniqueConstraint(fields=('post', 'tag'), name='unique_post_tag')],
+            },
+        ),
+        migrations.RunPython(parse_existing_tags, migrations.RunPython.noop),
+    ]
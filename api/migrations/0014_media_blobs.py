@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:53
+
+import api.storage
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='image',
+            field=models.FileField(blank=True, null=True, storage=api.storage.media_storage, upload_to='image'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.FileField(blank=True, null=True, storage=api.storage.media_storage, upload_to='image'),
+        ),
+        migrations.AlterField(
+            model_name='profile',
+            name='image',
+            field=models.FileField(blank=True, default='default/default.user.jpg', null=True, storage=api.storage.media_storage, upload_to='image'),
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('digest', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_seen_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['refcount', 'last_seen_at'], name='blob_orphan_idx')],
+            },
+        ),
+    ]
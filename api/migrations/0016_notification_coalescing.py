@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-17 04:58
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill(apps, schema_editor):
+    Notification = apps.get_model("api", "Notification")
+    Notification.objects.update(updated=F("date"))
+    # Unseen rows are the ones later events fold into (and unlikes take actors out of)
+    rows = Notification.objects.filter(seen=False, actor__isnull=False).values_list("id", "actor_id", "actor__username")
+    for noti_id, actor_id, username in rows.iterator(chunk_size=1000):
+        Notification.objects.filter(id=noti_id).update(latest_actors=[{"id": actor_id, "username": username}])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='latest_actors',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='updated',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
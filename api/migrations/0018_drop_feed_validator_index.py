@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:41
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_comment_threads'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_active_updated_idx',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-17 05:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_drop_feed_validator_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='notification',
+            name='noti_user_seen_idx',
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'seen', '-updated', '-id'], name='noti_user_seen_idx'),
+        ),
+    ]
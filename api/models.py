@@ -1,9 +1,24 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.utils import timezone
 from django.utils.text import slugify
 from shortuuid.django_fields import ShortUUIDField
 import shortuuid
+import uuid
+
+from api.cache import engagement_tags, invalidate, post_tags
+from api import authentication
+from api.storage import media_storage
+from api import comments
+from api import counters
+from api import images
+from api import storage as media
+from api import realtime
+from api import search
+from api import stats
+from api import tags
+from api import unread
 
 # ----------------- User -------------------
 class User(AbstractUser):
@@ -31,7 +46,8 @@ class User(AbstractUser):
 # ----------------- Profile -------------------
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    image = models.FileField(upload_to="image", default="default/default.user.jpg", null=True, blank=True)
+    image = models.FileField(upload_to="image", storage=media_storage, default="default/default.user.jpg", null=True, blank=True)
+    image_variants = models.JSONField(null=True, blank=True) # Resized WebP/AVIF/JPEG copies, see api/images.py
     full_name = models.CharField(max_length=100, null=True, blank=True)
     bio = models.CharField(max_length=100, null=True, blank=True)
     about = models.CharField(max_length=100, null=True, blank=True)
@@ -65,11 +81,23 @@ post_save.connect(create_user_profile, sender=User)
 post_save.connect(save_user_profile, sender=User)
 
 
+def forget_cached_user(sender, instance, **kwargs):
+    # Token-authenticated requests read the full user from the cache (api/authentication.py)
+    authentication.forget(instance.id)
+
+
+post_save.connect(forget_cached_user, sender=User)
+post_delete.connect(forget_cached_user, sender=User)
+
+
 # ----------------- Category -------------------
 class Category(models.Model):
     title = models.CharField(max_length=100)
-    image = models.FileField(upload_to="image", null=True, blank=True)
+    image = models.FileField(upload_to="image", storage=media_storage, null=True, blank=True)
+    image_variants = models.JSONField(null=True, blank=True) # Resized WebP/AVIF/JPEG copies, see api/images.py
     slug = models.SlugField(unique=True, null=True, blank=True)
+    active_post_count = models.IntegerField(default=0) # Maintained by api/counters.py
+    updated_at = models.DateTimeField(auto_now=True) # Also bumped by counter updates; HTTP validator
 
     def __str__(self):
         return self.title
@@ -98,12 +126,18 @@ class Post(models.Model):
     title = models.CharField(max_length=100)
     tags = models.CharField(max_length=100, null=True, blank=True)
     description = models.TextField(null=True, blank=True)
-    image = models.FileField(upload_to="image", null=True, blank=True)
+    image = models.FileField(upload_to="image", storage=media_storage, null=True, blank=True)
+    image_variants = models.JSONField(null=True, blank=True) # Resized WebP/AVIF/JPEG copies, see api/images.py
     status = models.CharField(max_length=100, choices=STATUS, default="Active")
     views = models.IntegerField(default=0)
     likes = models.ManyToManyField(User, related_name="likes_user", blank=True)
+    # Denormalized engagement totals, maintained by api/counters.py
+    likes_count = models.IntegerField(default=0)
+    comments_count = models.IntegerField(default=0)
+    bookmarks_count = models.IntegerField(default=0)
     slug = models.SlugField(unique=True, null=True, blank=True)
     date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True) # Also bumped by counter updates; HTTP validator
 
     def __str__(self):
         return self.title
@@ -111,6 +145,13 @@ class Post(models.Model):
     class Meta:
         ordering = ['-date']
         verbose_name_plural = "Posts"
+        indexes = [
+            # Public feeds: WHERE status = 'Active' ORDER BY date DESC, id DESC (keyset pagination)
+            models.Index(fields=['-date', '-id'], name='post_active_feed_idx', condition=models.Q(status="Active")),
+            models.Index(fields=['category', '-date', '-id'], name='post_active_category_idx', condition=models.Q(status="Active")),
+            # Author dashboard: WHERE user_id = ? ORDER BY id DESC
+            models.Index(fields=['user', '-id'], name='post_user_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -122,6 +163,42 @@ class Post(models.Model):
         return Comment.objects.filter(post=self)
 
 
+# ----------------- Tag -------------------
+class Tag(models.Model):
+    name = models.CharField(max_length=50)
+    slug = models.SlugField(unique=True, max_length=60)
+    post_count = models.IntegerField(default=0) # Active posts with this tag, maintained by api/tags.py
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = "Tags"
+        indexes = [
+            # Tag cloud: ORDER BY post_count DESC
+            models.Index(fields=['-post_count', 'name'], name='tag_cloud_idx'),
+        ]
+
+
+class PostTag(models.Model):
+    """Normalized form of the comma-separated `Post.tags`, kept in sync on post save."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="tag_links")
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="post_links")
+
+    def __str__(self):
+        return f"{self.post.title} #{self.tag.name}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'tag'], name='unique_post_tag'),
+        ]
+        indexes = [
+            # Tag feed: WHERE tag_id = ? -> post ids
+            models.Index(fields=['tag', 'post'], name='post_tag_lookup_idx'),
+        ]
+
+
 # ----------------- Comment -------------------
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='comments')
@@ -131,6 +208,12 @@ class Comment(models.Model):
     comment = models.TextField(null=True, blank=True)
     reply = models.TextField(null=True, blank=True)
     date = models.DateTimeField(auto_now_add=True)
+    # Threads (api/comments.py): `path` is the zero-padded ids from the root down to this
+    # comment ("0000000012/0000000034/"), so a whole subtree is one prefix range in path order
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='replies')
+    path = models.CharField(max_length=255, blank=True, default="")
+    depth = models.PositiveSmallIntegerField(default=0)
+    reply_count = models.PositiveIntegerField(default=0)  # direct replies
 
     def __str__(self):
         return self.post.title
@@ -138,6 +221,12 @@ class Comment(models.Model):
     class Meta:
         ordering = ['-date']
         verbose_name_plural = "Comment"
+        indexes = [
+            models.Index(fields=['post', '-date'], name='comment_post_date_idx'),
+            # Comment pages: WHERE post_id = ? AND parent_id IS NULL (or = ?) ORDER BY date, id
+            models.Index(fields=['post', 'parent', '-date', '-id'], name='comment_thread_idx'),
+            models.Index(fields=['path'], name='comment_path_idx'),
+        ]
 
 
 # ----------------- Bookmark -------------------
@@ -152,6 +241,9 @@ class Bookmark(models.Model):
     class Meta:
         ordering = ['-date']
         verbose_name_plural = "Bookmark"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_user_post_bookmark'),
+        ]
 
 
 # ----------------- Notification -------------------
@@ -169,6 +261,10 @@ class Notification(models.Model):
     type = models.CharField(max_length=100, choices=NOTI_TYPE, default="Like")
     seen = models.BooleanField(default=False)
     date = models.DateTimeField(auto_now_add=True)
+    # Coalesced notifications (api/notifications.py): one unseen row per (user, post, type)
+    actor_count = models.PositiveIntegerField(default=1)
+    latest_actors = models.JSONField(default=list, blank=True)  # [{"id", "username"}, ...], newest first
+    updated = models.DateTimeField(default=timezone.now)  # Last activity folded in; the inbox is ordered by it
 
     def __str__(self):
         # Improved __str__ for better readability
@@ -178,4 +274,357 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-date']
-        verbose_name_plural = "Notifications" # Corrected pluralization
\ No newline at end of file
+        verbose_name_plural = "Notifications" # Corrected pluralization
+        indexes = [
+            # Dashboard inbox: WHERE user_id = ? AND seen = ? ORDER BY updated DESC, id DESC
+            models.Index(fields=['user', 'seen', '-updated', '-id'], name='noti_user_seen_idx'),
+        ]
+
+
+# ----------------- Background Jobs -------------------
+class Job(models.Model):
+    """A queued call of a registered task (api/jobs.py), run by `manage.py run_worker`."""
+    STATUS = (
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("failed", "Failed"),
+    )
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            # Worker poll: WHERE status = 'queued' AND run_at <= now ORDER BY run_at, id
+            models.Index(fields=['status', 'run_at', 'id'], name='job_due_idx'),
+        ]
+
+
+# ----------------- Media Blobs -------------------
+class MediaBlob(models.Model):
+    """An uploaded file stored once under its content digest (api/storage.py)."""
+    name = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    # Model fields currently pointing at the blob; orphans (<= 0) are removed by `manage.py gc_media`
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Last time an upload resolved to this blob, so gc_media leaves just re-uploaded blobs alone
+    last_seen_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # gc_media: WHERE refcount <= 0 AND last_seen_at < cutoff
+            models.Index(fields=['refcount', 'last_seen_at'], name='blob_orphan_idx'),
+        ]
+
+
+# ----------------- Chunked Uploads -------------------
+class Upload(models.Model):
+    """A resumable image upload in progress (api/uploads.py); posts attach it by id once complete."""
+    STATUS = (
+        ("pending", "Pending"),
+        ("complete", "Complete"),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="uploads")
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    content_type = models.CharField(max_length=50, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS, default="pending")
+    # Media storage name once complete
+    name = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # gc_media: WHERE updated_at < cutoff
+            models.Index(fields=['updated_at'], name='upload_expiry_idx'),
+        ]
+
+
+# ----------------- Author Daily Stats -------------------
+class AuthorDailyStats(models.Model):
+    """Per-author, per-day engagement rollup read by the dashboard charts (see api/stats.py)."""
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="daily_stats")
+    date = models.DateField()
+    posts = models.IntegerField(default=0)
+    views = models.IntegerField(default=0)
+    likes = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+    bookmarks = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.author.username} {self.date}"
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = "Author Daily Stats"
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'date'], name='unique_author_daily_stats'),
+        ]
+
+
+# ----------------- Response cache invalidation -------------------
+# Likes and bookmarks only touch counters through UPDATEs, so their views invalidate explicitly.
+def invalidate_post_cache(sender, instance, **kwargs):
+    invalidate("categories", *post_tags(instance))
+
+
+def invalidate_comment_cache(sender, instance, **kwargs):
+    post = Post.objects.filter(id=instance.post_id).only("slug").first()
+    if post is not None:
+        invalidate(f"comments:{post.id}", *engagement_tags(post))
+
+
+def invalidate_category_cache(sender, instance, **kwargs):
+    # Post pages show their category too, and validate by the post's updated_at
+    posts = Post.objects.filter(category_id=instance.id)
+    slugs = posts.values_list("slug", flat=True)
+    invalidate("categories", "posts", *(f"post:{slug}" for slug in slugs.iterator(chunk_size=2000)))
+    counters.touch_posts(posts)
+
+
+# The author fields post and comment payloads embed (Public*Serializer in api/serializer.py)
+AUTHOR_FIELDS = {
+    "user": ("username", "full_name"),
+    "profile": ("full_name", "image", "bio", "author"),
+}
+
+
+def snapshot_author_fields(sender, instance, **kwargs):
+    fields = AUTHOR_FIELDS[sender._meta.model_name]
+    instance._author_fields = {field: instance.__dict__[field] for field in fields if field in instance.__dict__}
+
+
+def author_fields_changed(sender, instance):
+    # A field deferred when the row was loaded may have changed unseen
+    before = getattr(instance, "_author_fields", {})
+    fields = AUTHOR_FIELDS[sender._meta.model_name]
+    return any(field not in before or before[field] != instance.__dict__.get(field) for field in fields)
+
+
+def invalidate_author_cache(sender, instance, **kwargs):
+    user_id = instance.id if sender is User else instance.user_id
+    posts = Post.objects.filter(user_id=user_id)
+    slugs = posts.values_list("slug", flat=True)
+    commented = Comment.objects.filter(user_id=user_id).values_list("post_id", flat=True).distinct()
+    invalidate(
+        "posts",
+        *(f"post:{slug}" for slug in slugs.iterator(chunk_size=2000)),
+        *(f"comments:{post_id}" for post_id in commented.iterator(chunk_size=2000)),
+    )
+    counters.touch_posts(posts)
+
+
+def invalidate_author_cache_on_save(sender, instance, created, **kwargs):
+    # Saving a user saves their profile too, so most saves change nothing shown
+    if not created and author_fields_changed(sender, instance):
+        invalidate_author_cache(sender, instance)
+    snapshot_author_fields(sender, instance)
+
+
+post_save.connect(invalidate_post_cache, sender=Post)
+post_delete.connect(invalidate_post_cache, sender=Post)
+post_save.connect(invalidate_comment_cache, sender=Comment)
+post_delete.connect(invalidate_comment_cache, sender=Comment)
+post_save.connect(invalidate_category_cache, sender=Category)
+post_delete.connect(invalidate_category_cache, sender=Category)
+post_init.connect(snapshot_author_fields, sender=User)
+post_init.connect(snapshot_author_fields, sender=Profile)
+post_save.connect(invalidate_author_cache_on_save, sender=User)
+post_save.connect(invalidate_author_cache_on_save, sender=Profile)
+post_delete.connect(invalidate_author_cache, sender=User)
+post_delete.connect(invalidate_author_cache, sender=Profile)
+
+
+# ----------------- Search index maintenance -------------------
+def index_post_for_search(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+def remove_post_from_search(sender, instance, **kwargs):
+    search.remove_post(instance.id)
+
+
+post_save.connect(index_post_for_search, sender=Post)
+post_delete.connect(remove_post_from_search, sender=Post)
+
+
+# ----------------- Comment threads -------------------
+def place_comment(sender, instance, **kwargs):
+    if instance._state.adding:
+        comments.place(instance)
+
+
+def thread_comment(sender, instance, created, **kwargs):
+    if created:
+        comments.thread(instance)
+        counters.comment_added(instance)
+
+
+def unthread_comment(sender, instance, **kwargs):
+    comments.unthread(instance)
+    counters.comment_removed(instance)
+
+
+pre_save.connect(place_comment, sender=Comment)
+post_save.connect(thread_comment, sender=Comment)
+post_delete.connect(unthread_comment, sender=Comment)
+
+
+# ----------------- Tag maintenance -------------------
+def sync_tags_on_save(sender, instance, **kwargs):
+    tags.sync_post_tags(instance)
+
+
+def remember_post_tags(sender, instance, **kwargs):
+    # The PostTag rows are gone (cascade) by the time post_delete fires
+    instance._tag_ids = list(instance.tag_links.values_list("tag_id", flat=True))
+
+
+def refresh_tags_on_delete(sender, instance, **kwargs):
+    tags.refresh_tag_counts(getattr(instance, "_tag_ids", []))
+
+
+post_save.connect(sync_tags_on_save, sender=Post)
+pre_delete.connect(remember_post_tags, sender=Post)
+post_delete.connect(refresh_tags_on_delete, sender=Post)
+
+
+# ----------------- Counters -------------------
+# Posts and comments are counted here rather than in the views, so rows created or
+# deleted anywhere (admin, shell, fixtures, cascades) keep the totals balanced.
+def snapshot_post_placement(sender, instance, **kwargs):
+    # Skipped while a field is deferred: an unknown old placement is left to `reconcile_counters`
+    if "category_id" in instance.__dict__ and "status" in instance.__dict__:
+        instance._placement = (instance.category_id, instance.status)
+
+
+def count_post(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        counters.post_placement_changed(None, None, instance.category_id, instance.status)
+        stats.record_activity(instance.user_id, posts=1)
+    elif hasattr(instance, "_placement") and (update_fields is None or {"category", "status"} & set(update_fields)):
+        counters.post_placement_changed(*instance._placement, instance.category_id, instance.status)
+    snapshot_post_placement(sender, instance)
+
+
+def uncount_post(sender, instance, **kwargs):
+    # Also when the post goes with its author or category (cascade), not just through the dashboard
+    counters.post_placement_changed(instance.category_id, instance.status, None, None)
+
+
+post_init.connect(snapshot_post_placement, sender=Post)
+post_save.connect(count_post, sender=Post)
+post_delete.connect(uncount_post, sender=Post)
+
+
+# ----------------- Realtime push -------------------
+def push_notification_created(sender, instance, created, **kwargs):
+    if created:
+        realtime.push_created(instance.id)
+
+
+def push_notification_removed(sender, instance, **kwargs):
+    realtime.push_removed(instance.user_id, instance.id)
+
+
+post_save.connect(push_notification_created, sender=Notification)
+post_delete.connect(push_notification_removed, sender=Notification)
+
+
+# ----------------- Unread notification counts -------------------
+def count_unread_on_save(sender, instance, created, **kwargs):
+    if created:
+        if not instance.seen:
+            unread.adjust(instance.user_id, 1)
+    else:
+        # seen may have flipped either way (admin, shell); recount on the next read
+        unread.forget(instance.user_id)
+
+
+def count_unread_on_delete(sender, instance, **kwargs):
+    if not instance.seen:
+        unread.adjust(instance.user_id, -1)
+
+
+post_save.connect(count_unread_on_save, sender=Notification)
+post_delete.connect(count_unread_on_delete, sender=Notification)
+
+
+# ----------------- Image variants -------------------
+def queue_image_variants(sender, instance, **kwargs):
+    # Resizing happens in the worker; the variants are filled in once it has run
+    if images.needs_variants(instance):
+        from api import jobs, tasks
+        jobs.enqueue(tasks.generate_image_variants, unique=True, model=sender._meta.model_name, pk=instance.pk)
+
+
+post_save.connect(queue_image_variants, sender=Profile)
+post_save.connect(queue_image_variants, sender=Category)
+post_save.connect(queue_image_variants, sender=Post)
+
+
+# ----------------- Media blob reference counts -------------------
+# Kept in signals rather than in save(), so admin, serializers and shell edits all count.
+# QuerySet.update(image=...) bypasses them; `manage.py gc_media --recount` repairs the counts.
+def snapshot_media_name(sender, instance, **kwargs):
+    # Skipped while the field is deferred: an unknown old name is never decremented
+    if "image" in instance.__dict__:
+        instance._media_name = instance.image.name if instance.image else None
+
+
+def count_media_references(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and "image" not in update_fields:
+        return
+    if "image" not in instance.__dict__:
+        return
+    new = instance.image.name if instance.image else None
+    if created:
+        media.incref(new)
+    elif hasattr(instance, "_media_name") and instance._media_name != new:
+        media.incref(new)
+        media.decref(instance._media_name)
+    instance._media_name = new
+
+
+def release_media_reference(sender, instance, **kwargs):
+    name = getattr(instance, "_media_name", None)
+    if name is None and "image" in instance.__dict__ and instance.image:
+        name = instance.image.name
+    media.decref(name)
+
+
+post_init.connect(snapshot_media_name, sender=Profile)
+post_init.connect(snapshot_media_name, sender=Category)
+post_init.connect(snapshot_media_name, sender=Post)
+post_save.connect(count_media_references, sender=Profile)
+post_save.connect(count_media_references, sender=Category)
+post_save.connect(count_media_references, sender=Post)
+post_delete.connect(release_media_reference, sender=Profile)
+post_delete.connect(release_media_reference, sender=Category)
+post_delete.connect(release_media_reference, sender=Post)
@@ -0,0 +1,124 @@
+import json
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api import models as api_models
+from api.apps import app_settings
+from api import realtime
+
+
+config = app_settings("NOTIFICATION_COALESCE", {
+    "ENABLED": True,
+    "TYPES": ["Like", "Comment", "Bookmark"],
+    "LATEST_ACTORS": 10,
+})
+
+
+def coalesces(noti_type):
+    return config("ENABLED") and noti_type in config("TYPES")
+
+
+def _lock_post(post_id):
+    # Serializes events on one post, so two of them never both open a new row for it
+    list(api_models.Post.objects.select_for_update().filter(id=post_id).values_list("id", flat=True))
+
+
+def _open_row(recipient_id, post_id, noti_type):
+    """The unseen row new events on (recipient, post, type) are folded into."""
+    return api_models.Notification.objects.filter(
+        user_id=recipient_id, post_id=post_id, type=noti_type, seen=False
+    ).order_by("-id").first()
+
+
+def record(recipient_id, post_id, noti_type, actor_id=None):
+    """
+    Notify `recipient_id` of an event on a post. When the type coalesces, the
+    event is folded into the recipient's unseen row for the post and type
+    ("12 people liked your post"): `actor_count` counts distinct people and
+    `latest_actors` keeps the most recent ones, newest first. Once that row
+    is seen, the next event opens a new one. Call inside a transaction.
+    """
+    if not coalesces(noti_type):
+        return api_models.Notification.objects.create(user_id=recipient_id, post_id=post_id, type=noti_type, actor_id=actor_id)
+
+    _lock_post(post_id)
+    actor = None
+    if actor_id:
+        actor = {"id": actor_id, "username": api_models.User.objects.filter(id=actor_id).values_list("username", flat=True).first()}
+
+    row = _open_row(recipient_id, post_id, noti_type)
+    if row is None:
+        return api_models.Notification.objects.create(
+            user_id=recipient_id, post_id=post_id, type=noti_type, actor_id=actor_id, latest_actors=[actor] if actor else []
+        )
+
+    latest = row.latest_actors or []
+    # Someone already in the row (a repeated like after an unlike, a second comment) is not counted again
+    repeat = actor is not None and any(entry["id"] == actor_id for entry in latest)
+    if actor is not None:
+        latest = [actor] + [entry for entry in latest if entry["id"] != actor_id]
+    api_models.Notification.objects.filter(id=row.id).update(
+        actor_id=actor_id or row.actor_id,
+        actor_count=F("actor_count") + (0 if repeat else 1),
+        latest_actors=latest[:config("LATEST_ACTORS")],
+        updated=timezone.now(),
+    )
+    realtime.push_updated(row.id)
+    return row
+
+
+def retract(recipient_id, post_id, noti_type, actor_id):
+    """
+    Take an actor back out of the unseen row (an unlike, an un-bookmark).
+    Rows already seen keep their history. An actor that has dropped out of
+    `latest_actors` can't be told apart from the rest and stays counted.
+    """
+    _lock_post(post_id)
+    row = _open_row(recipient_id, post_id, noti_type)
+    if row is None or not any(entry["id"] == actor_id for entry in row.latest_actors or []):
+        return
+    if row.actor_count <= 1:
+        row.delete()
+        return
+    latest = [entry for entry in row.latest_actors if entry["id"] != actor_id]
+    api_models.Notification.objects.filter(id=row.id).update(
+        actor_id=latest[0]["id"] if latest else None,
+        actor_count=F("actor_count") - 1,
+        latest_actors=latest,
+    )
+    realtime.push_updated(row.id)
+
+
+def compact(days, batch_size=1000, archive=None, dry_run=False):
+    """
+    Delete seen notifications not updated in the last `days` days, `batch_size`
+    rows per transaction, oldest first, so the table and its index stay small
+    and no long lock is held. With `archive` (a text file), each batch is
+    written to it as JSON lines before it is deleted. Unseen rows are kept
+    whatever their age. Returns how many rows were (or would be) removed.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    old = api_models.Notification.objects.filter(seen=True, updated__lt=cutoff).order_by("id")
+    if dry_run:
+        return old.count()
+
+    removed = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            rows = list(old.filter(id__gt=last_id).values(
+                "id", "user_id", "actor_id", "post_id", "type", "actor_count", "latest_actors", "date", "updated"
+            )[:batch_size])
+            if not rows:
+                return removed
+            if archive is not None:
+                for row in rows:
+                    archive.write(json.dumps(row, default=str) + "\n")
+            # Seen rows leave the unread counts alone and nobody needs a socket event for them,
+            # so the per-row delete signals are skipped
+            api_models.Notification.objects.filter(id__in=[row["id"] for row in rows])._raw_delete(old.db)
+        removed += len(rows)
+        last_id = rows[-1]["id"]
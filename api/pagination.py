@@ -0,0 +1,184 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _positive_int(value, cutoff=None):
+    value = int(value)
+    if value <= 0:
+        raise ValueError(value)
+    if cutoff:
+        return min(value, cutoff)
+    return value
+
+
+class KeysetCursorPagination(CursorPagination):
+    """
+    Keyset (seek) pagination over a composite ordering, e.g. ('-date', '-id').
+
+    The cursor carries the full sort key of the boundary row, so every page is
+    a single indexed range scan of `page_size + 1` rows no matter how deep the
+    client has scrolled. The last ordering field must be unique (the pk) so
+    rows sharing a timestamp are never skipped or repeated.
+
+    Views can override the defaults with:
+      cursor_ordering           tuple of ordering fields
+      pagination_include_count  add a total `count` (issues a COUNT(*))
+    """
+    ordering = ('-date', '-id')
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 20)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'API_MAX_PAGE_SIZE', 100)
+    include_count = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.build_page_queryset(queryset, request, view)
+        if self.wants_count:
+            self.count = queryset.count()
+        return self.finish_page(list(page_queryset))
+
+    def build_page_queryset(self, queryset, request, view=None):
+        """
+        First half of paginate_queryset(): the ordered, seek-filtered slice of
+        `page_size + 1` rows, not yet evaluated. Async views fetch it with the
+        async ORM and hand the rows to finish_page().
+        """
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = [self._get_model_field(queryset.model, order) for order in self.ordering]
+        self.cursor = self.decode_cursor(request)
+        self.count = None
+        self.wants_count = getattr(view, 'pagination_include_count', self.include_count)
+
+        self.reverse = bool(self.cursor and self.cursor['reverse'])
+        if self.reverse:
+            queryset = queryset.order_by(*[self._flip(order) for order in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if self.cursor:
+            queryset = queryset.filter(self._seek_filter(self.cursor['position'], self.reverse))
+
+        # Fetch one extra row to find out whether there is another page.
+        return queryset[:self.page_size + 1]
+
+    def finish_page(self, results):
+        """Second half of paginate_queryset(): trim the fetched rows to the page and set the links' state."""
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_previous = has_more
+            self.has_next = True
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor({'position': self._position(self.page[-1]), 'reverse': False})
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor({'position': self._position(self.page[0]), 'reverse': True})
+
+    def encode_cursor(self, cursor):
+        payload = json.dumps([cursor['position'], int(cursor['reverse'])], separators=(',', ':'))
+        encoded = urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            position, reverse = json.loads(urlsafe_b64decode(padded.encode('ascii')))
+            if len(position) != len(self.fields):
+                raise ValueError("Cursor does not match the ordering.")
+            position = [field.to_python(value) for field, value in zip(self.fields, position)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return {'position': position, 'reverse': bool(reverse)}
+
+    def get_paginated_data(self, data):
+        response = OrderedDict()
+        if self.count is not None:
+            response['count'] = self.count
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return response
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties']['count'] = {'type': 'integer'}
+        return response_schema
+
+    def _seek_filter(self, position, reverse):
+        # (a, b) < (x, y)  <=>  a < x OR (a = x AND b < y), per field direction.
+        seek = Q()
+        equal = {}
+        for order, value in zip(self.ordering, position):
+            name = order.lstrip('-')
+            descending = order.startswith('-') != reverse
+            seek |= Q(**equal, **{f"{name}__{'lt' if descending else 'gt'}": value})
+            equal[name] = value
+        return seek
+
+    def _position(self, instance):
+        position = []
+        for order in self.ordering:
+            value = getattr(instance, order.lstrip('-'))
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return position
+
+    @staticmethod
+    def _flip(order):
+        return order[1:] if order.startswith('-') else '-' + order
+
+    @staticmethod
+    def _get_model_field(model, order):
+        name = order.lstrip('-')
+        if name == 'pk':
+            return model._meta.pk
+        try:
+            return model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise ValueError(f"Cannot paginate {model.__name__} by unknown field '{name}'.")
@@ -0,0 +1,79 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+class PrefetchPlan:
+    """
+    The select_related / prefetch_related lookups needed to render a serializer
+    without issuing queries per row.
+
+    Built by walking the serializer's bound fields (so `depth`-generated nested
+    serializers are included): forward FK/O2O relations rendered as nested
+    serializers are joined, to-many relations become a Prefetch whose queryset
+    carries its own nested plan. The query count therefore depends on the shape
+    of the serializer, not on the number of rows, comments or likes.
+    """
+
+    def __init__(self, select=None, prefetch=None):
+        self.select = select or []
+        self.prefetch = prefetch or []
+
+    def apply(self, queryset):
+        if self.select:
+            queryset = queryset.select_related(*self.select)
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch)
+        return queryset
+
+    def __repr__(self):
+        lookups = [p.prefetch_to if isinstance(p, Prefetch) else p for p in self.prefetch]
+        return f"<PrefetchPlan select={self.select} prefetch={lookups}>"
+
+
+def build_prefetch_plan(serializer, model=None, prefix=''):
+    """
+    Build a PrefetchPlan for `serializer` (an instance, bound to a model).
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    model = model or serializer.Meta.model
+    plan = PrefetchPlan()
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*' or '.' in field.source:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+
+        lookup = prefix + field.source
+        related_model = model_field.related_model
+
+        if model_field.many_to_many or model_field.one_to_many:
+            queryset = related_model._default_manager.all()
+            to_attr = None
+            if isinstance(field, serializers.ListSerializer):
+                queryset = build_prefetch_plan(field.child, related_model).apply(queryset)
+                # A list that renders only part of the relation (e.g. a comment preview) narrows the
+                # prefetch; a sliced one has to land in its own attribute
+                if hasattr(field, "prefetch_queryset"):
+                    queryset = field.prefetch_queryset(queryset)
+                    to_attr = field.prefetch_to_attr
+            plan.prefetch.append(Prefetch(lookup, queryset=queryset, to_attr=to_attr))
+        elif isinstance(field, serializers.BaseSerializer):
+            # Forward FK / one-to-one rendered inline: join it and keep walking.
+            nested = build_prefetch_plan(field, related_model, prefix=lookup + '__')
+            plan.select.append(lookup)
+            plan.select.extend(nested.select)
+            plan.prefetch.extend(nested.prefetch)
+        # Plain PrimaryKeyRelatedFields read the local `<name>_id` column: nothing to load.
+
+    return plan
+
+
+def apply_prefetch_plan(queryset, serializer):
+    return build_prefetch_plan(serializer, queryset.model).apply(queryset)
@@ -0,0 +1,89 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+from api import models as api_models
+
+logger = logging.getLogger(__name__)
+
+
+def notification_group(user_id):
+    return f"notifications_{user_id}"
+
+
+def notification_event(notification_id, event="notification.created"):
+    """The compact payload pushed to the recipient's sockets, built with one query."""
+    row = api_models.Notification.objects.filter(id=notification_id).values(
+        "id", "type", "seen", "date", "user_id", "actor_id", "actor__username", "post_id", "post__slug", "post__title",
+        "actor_count", "latest_actors",
+    ).first()
+    if row is None:
+        return None
+    return row["user_id"], {
+        "event": event,
+        "id": row["id"],
+        "type": row["type"],
+        "seen": row["seen"],
+        "date": row["date"].isoformat(),
+        "actor_count": row["actor_count"],
+        "latest_actors": row["latest_actors"],
+        "actor": {"id": row["actor_id"], "username": row["actor__username"]} if row["actor_id"] else None,
+        "post": {"id": row["post_id"], "slug": row["post__slug"], "title": row["post__title"]} if row["post_id"] else None,
+    }
+
+
+def send(user_id, payload):
+    # Best effort: the write is committed, and an unreachable layer (Redis down) must neither turn
+    # the request into a 500 nor fail the job, whose retry would notify twice. Clients refetch on reconnect.
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(notification_group(user_id), {"type": "notification.push", "payload": payload})
+    except Exception:
+        logger.exception("Could not push %s to user %s.", payload.get("event"), user_id)
+
+
+def require_shared_layer(reason):
+    """
+    Refuse to start when pushes sent from this process cannot reach sockets
+    served by another one: the in-memory layer only delivers within its own
+    process, so notifications written by the job worker (or by a sibling web
+    worker) would never arrive. `reason` says why other processes are involved.
+    """
+    if isinstance(get_channel_layer(), InMemoryChannelLayer):
+        raise ImproperlyConfigured(
+            f"{reason}, so the in-memory channel layer cannot deliver notifications: "
+            "set CHANNEL_LAYER=redis, or CHANNEL_LAYER=none to run without the notification WebSocket."
+        )
+
+
+def push_created(notification_id):
+    # After commit: the socket must never see a notification that was rolled back
+    def push():
+        event = notification_event(notification_id)
+        if event is not None:
+            send(*event)
+    transaction.on_commit(push, robust=True)
+
+
+def push_updated(notification_id):
+    # A coalesced row took in (or lost) an actor
+    def push():
+        event = notification_event(notification_id, "notification.updated")
+        if event is not None:
+            send(*event)
+    transaction.on_commit(push, robust=True)
+
+
+def push_removed(user_id, notification_id):
+    transaction.on_commit(lambda: send(user_id, {"event": "notification.removed", "id": notification_id}), robust=True)
+
+
+def push_seen(user_id, ids=None, before=None):
+    # So the user's other tabs clear the same notifications and refetch the badge
+    payload = {"event": "notifications.seen", "ids": ids, "before": before}
+    transaction.on_commit(lambda: send(user_id, payload), robust=True)
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from api import consumers
+
+websocket_urlpatterns = [
+    path('ws/notifications/', consumers.NotificationConsumer.as_asgi()),
+]
@@ -0,0 +1,193 @@
+import html
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape, strip_tags
+
+# The databases mark matches with these private-use characters; the snippet is
+# escaped with them in place and only then are they turned into <mark> tags, so
+# nothing from a title, tag or description can ever come back as markup.
+MATCH_START = "\ue000"
+MATCH_STOP = "\ue001"
+
+
+def plain(text):
+    """Text as indexed: without the match sentinels, which a post could otherwise forge."""
+    return (text or "").replace(MATCH_START, "").replace(MATCH_STOP, "")
+
+
+def plain_description(description):
+    return plain(html.unescape(strip_tags(description or "")))
+
+
+def highlight(snippet):
+    """An escaped snippet whose only markup is <mark> around the matches."""
+    text = escape(html.unescape(snippet or ""))
+    return text.replace(MATCH_START, "<mark>").replace(MATCH_STOP, "</mark>")
+
+
+class PostgresSearchBackend:
+    """
+    tsvector documents in `api_post_search` with a GIN index. Title, tags and
+    description are weighted A, B and C; ranking is ts_rank and snippets
+    come from ts_headline, computed only for the returned page.
+    """
+    table = "api_post_search"
+
+    def __init__(self, config):
+        self.config = config
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {self.table} (post_id, document) VALUES (
+                    %s,
+                    setweight(to_tsvector(%s::regconfig, %s), 'A') ||
+                    setweight(to_tsvector(%s::regconfig, %s), 'B') ||
+                    setweight(to_tsvector(%s::regconfig, %s), 'C')
+                )
+                ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document
+                """,
+                [
+                    post.id,
+                    self.config, plain(post.title),
+                    self.config, plain(post.tags).replace(",", " "),
+                    self.config, plain_description(post.description),
+                ],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE post_id = %s", [post_id])
+
+    def search(self, query, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT hits.post_id, hits.rank,
+                       ts_headline(%s::regconfig,
+                                   translate(regexp_replace(COALESCE(p.description, p.title), '<[^>]*>', ' ', 'g'), %s, ''),
+                                   hits.query, %s)
+                FROM (
+                    SELECT s.post_id, ts_rank(s.document, q.query) AS rank, q.query
+                    FROM {self.table} s
+                    JOIN api_post p ON p.id = s.post_id
+                    CROSS JOIN websearch_to_tsquery(%s::regconfig, %s) AS q(query)
+                    WHERE s.document @@ q.query AND p.status = 'Active'
+                    ORDER BY rank DESC, s.post_id DESC
+                    LIMIT %s
+                ) hits
+                JOIN api_post p ON p.id = hits.post_id
+                ORDER BY hits.rank DESC, hits.post_id DESC
+                """,
+                [
+                    self.config, MATCH_START + MATCH_STOP,
+                    f'StartSel="{MATCH_START}", StopSel="{MATCH_STOP}", MaxWords=24, MinWords=8',
+                    self.config, query, limit,
+                ],
+            )
+            return [(post_id, rank, highlight(snippet)) for post_id, rank, snippet in cursor.fetchall()]
+
+
+class SQLiteFTSSearchBackend:
+    """
+    An FTS5 virtual table `api_post_fts` keyed by the post id (rowid), ranked
+    with bm25 (title weighted over tags over description) and snippet().
+    """
+    table = "api_post_fts"
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [post.id])
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, title, tags, description) VALUES (%s, %s, %s, %s)",
+                [post.id, plain(post.title), plain(post.tags).replace(",", " "), plain_description(post.description)],
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [post_id])
+
+    def search(self, query, limit):
+        match = self.match_expression(query)
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT {self.table}.rowid, -bm25({self.table}, 10.0, 5.0, 1.0) AS rank,
+                       snippet({self.table}, -1, %s, %s, '…', 16)
+                FROM {self.table}
+                JOIN api_post p ON p.id = {self.table}.rowid
+                WHERE {self.table} MATCH %s AND p.status = 'Active'
+                ORDER BY rank DESC, {self.table}.rowid DESC
+                LIMIT %s
+                """,
+                [MATCH_START, MATCH_STOP, match, limit],
+            )
+            return [(post_id, rank, highlight(snippet)) for post_id, rank, snippet in cursor.fetchall()]
+
+    @staticmethod
+    def match_expression(query):
+        # Quote every term so user input can never be parsed as FTS5 syntax;
+        # the last term also matches as a prefix (search-as-you-type).
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return ""
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += "*"
+        return " ".join(quoted)
+
+
+class BasicSearchBackend:
+    """Fallback for databases without a full-text index: a LIKE scan, only meant for development."""
+
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def search(self, query, limit):
+        from django.db.models import Q
+        from api.models import Post
+
+        terms = re.findall(r"\w+", query)
+        if not terms:
+            return []
+        match = Q()
+        for term in terms:
+            match &= Q(title__icontains=term) | Q(tags__icontains=term) | Q(description__icontains=term)
+        post_ids = Post.objects.filter(match, status="Active").values_list("id", flat=True)[:limit]
+        return [(post_id, 0.0, "") for post_id in post_ids]
+
+
+_backends = {}
+
+
+def get_backend():
+    """The search backend for the current database, picked once per database."""
+    name = connection.settings_dict["NAME"]
+    if name not in _backends:
+        if connection.vendor == "postgresql":
+            _backends[name] = PostgresSearchBackend(getattr(settings, "SEARCH_CONFIG", "english"))
+        elif connection.vendor == "sqlite" and SQLiteFTSSearchBackend.table in connection.introspection.table_names():
+            _backends[name] = SQLiteFTSSearchBackend()
+        else:
+            _backends[name] = BasicSearchBackend()
+    return _backends[name]
+
+
+def search_posts(query, limit):
+    """[(post_id, rank, snippet)] for active posts, best match first."""
+    return get_backend().search(query, limit)
+
+
+def index_post(post):
+    get_backend().index(post)
+
+
+def remove_post(post_id):
+    get_backend().remove(post_id)
@@ -2,6 +2,8 @@ from django.contrib.auth.password_validation import validate_password
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework import serializers
 
+from api import comments
+from api import images
 from api import models as api_models
 
 # Custom JWT Token Serializer
@@ -65,9 +67,49 @@ class ProfileSerializer(serializers.ModelSerializer):
 class PasswordResetSerializer(serializers.Serializer):
     email = serializers.EmailField()
 
+# Resized copies of `image` (api/images.py): per-size URLs for each format plus srcsets.
+# Null until the worker has generated them; clients then fall back to `image`.
+class ImageVariantsField(serializers.Field):
+    def __init__(self, **kwargs):
+        kwargs.setdefault("source", "*")
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        data = instance.image_variants
+        if not data or not data.get("variants") or images.needs_variants(instance):
+            return None
+        request = self.context.get("request")
+        return images.variant_urls(data, build_url=request.build_absolute_uri if request else None)
+
+
+# Public shapes for embedding people and categories in feeds (no password, otp or reset_token)
+class PublicUserSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = api_models.User
+        fields = ["id", "username", "full_name"]
+
+
+class PublicProfileSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
+    class Meta:
+        model = api_models.Profile
+        fields = ["id", "full_name", "image", "image_variants", "bio", "author"]
+
+
+class CategoryBriefSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
+    class Meta:
+        model = api_models.Category
+        fields = ["id", "title", "slug", "image", "image_variants"]
+
+
 # Category Serializer with post count and dynamic depth setting
 class CategorySerializer(serializers.ModelSerializer):
-    post_count = serializers.SerializerMethodField()
+    post_count = serializers.IntegerField(source="active_post_count", read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = api_models.Category
@@ -75,14 +117,12 @@ class CategorySerializer(serializers.ModelSerializer):
             "id",
             "title",
             "image",
+            "image_variants",
             "slug",
             "post_count",
         ]
         depth = 3  # Default depth
 
-    def get_post_count(self, category):
-        return category.posts.count()
-
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         request = self.context.get('request', None)
@@ -102,19 +142,46 @@ class CommentSerializer(serializers.ModelSerializer):
         if request and request.method == 'POST':
             self.Meta.depth = 0
 
-# Post Serializer with comments nested and likes count field
+class CommentPreviewListSerializer(serializers.ListSerializer):
+    """
+    Renders only the newest few top-level comments of a post (api/comments.py);
+    the full, threaded list is paginated at post/<post_id>/comments/. The
+    prefetch plan loads just those rows for the whole page of posts.
+    """
+
+    prefetch_to_attr = "comment_preview"
+
+    def prefetch_queryset(self, queryset):
+        return comments.preview(queryset)
+
+    def get_attribute(self, instance):
+        if hasattr(instance, self.prefetch_to_attr):
+            return getattr(instance, self.prefetch_to_attr)
+        # Not prefetched (e.g. a post just created): the same few rows, queried here
+        return comments.preview(super().get_attribute(instance).all())
+
+
+class CommentPreviewSerializer(CommentSerializer):
+    user = PublicUserSerializer(read_only=True)
+
+    class Meta(CommentSerializer.Meta):
+        list_serializer_class = CommentPreviewListSerializer
+
+
+# Post Serializer with a comment preview; likes/comments/bookmarks counts are stored columns
 class PostSerializer(serializers.ModelSerializer):
-    comments = CommentSerializer(many=True, read_only=True)
-    likes_count = serializers.SerializerMethodField()
+    # Declared so depth never reaches the password hash, otp or reset_token of a User
+    user = PublicUserSerializer(read_only=True)
+    profile = PublicProfileSerializer(read_only=True)
+    likes = PublicUserSerializer(many=True, read_only=True)
+    comments = CommentPreviewSerializer(many=True, read_only=True)
 
     class Meta:
         model = api_models.Post
         fields = "__all__"
+        read_only_fields = ["likes_count", "comments_count", "bookmarks_count"]
         depth = 3  # Default depth
 
-    def get_likes_count(self, obj):
-        return obj.likes.count()
-
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         request = self.context.get('request', None)
@@ -151,8 +218,152 @@ class NotificationSerializer(serializers.ModelSerializer):
 class AuthorStats(serializers.Serializer):
     views = serializers.IntegerField(default=0)
     posts = serializers.IntegerField(default=0)
+    active_posts = serializers.IntegerField(default=0)
+    likes = serializers.IntegerField(default=0)
+    comments = serializers.IntegerField(default=0)
+    bookmarks = serializers.IntegerField(default=0) # Bookmarks the author made
+    bookmarks_received = serializers.IntegerField(default=0) # Bookmarks on the author's posts
+
+# One day of an author's dashboard chart
+class AuthorStatsPoint(serializers.Serializer):
+    date = serializers.DateField()
+    views = serializers.IntegerField(default=0)
     likes = serializers.IntegerField(default=0)
-    bookmarks = serializers.IntegerField(default=0)
+    posts = serializers.IntegerField(default=0)
+    comments = serializers.IntegerField(default=0)
+    bookmarks = serializers.IntegerField(default=0) # Bookmarks the author's posts received that day
+
+class TagSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = api_models.Tag
+        fields = ["id", "name", "slug", "post_count"]
+
+
+class CommentBriefSerializer(serializers.ModelSerializer):
+    user = PublicUserSerializer(read_only=True)
+
+    class Meta:
+        model = api_models.Comment
+        fields = ["id", "user", "name", "comment", "reply", "date", "reply_count"]
+        list_serializer_class = CommentPreviewListSerializer
+
+
+# One comment of a thread page: replies are loaded on demand, by parent
+class CommentThreadSerializer(serializers.ModelSerializer):
+    user = PublicUserSerializer(read_only=True)
+
+    class Meta:
+        model = api_models.Comment
+        fields = ["id", "user", "name", "comment", "reply", "date", "parent", "depth", "reply_count"]
+
+
+def _csv_param(request, name):
+    value = request.query_params.get(name, "")
+    return {item.strip() for item in value.split(",") if item.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Lets the client shape the top-level representation from the query string:
+
+        ?fields=id,title,slug    keep only these fields
+        ?expand=comments,likes   add fields declared in Meta.expandable_fields
+
+    Only the root serializer (or the child of a root many=True list) reads the
+    params, so nested serializers keep their full declared shape.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is None or not self._is_root_serializer():
+            return fields
+
+        expand = _csv_param(request, "expand")
+        for name, (field_class, kwargs) in getattr(self.Meta, "expandable_fields", {}).items():
+            if name in expand:
+                fields[name] = field_class(**kwargs)
+
+        only = _csv_param(request, "fields")
+        if only:
+            fields = {name: field for name, field in fields.items() if name in only or name in expand}
+        return fields
+
+    def _is_root_serializer(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+
+class ViewerStateField(serializers.Field):
+    """
+    The requesting user's {"liked", "bookmarked"} flags for a post, looked up
+    from the `viewer_state` map the view puts in the context for the whole
+    page (api/engagement.py), never per post.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(source="*", read_only=True, **kwargs)
+
+    def to_representation(self, instance):
+        state = self.context.get("viewer_state")
+        if state is None:
+            return None
+        return state.get(instance.id, {"liked": False, "bookmarked": False})
+
+
+# Compact feed card: what the post lists render, with heavy relations opt-in via ?expand=
+class PostListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    user = PublicUserSerializer(read_only=True)
+    profile = PublicProfileSerializer(read_only=True)
+    category = CategoryBriefSerializer(read_only=True)
+    image_variants = ImageVariantsField()
+
+    class Meta:
+        model = api_models.Post
+        fields = [
+            "id",
+            "title",
+            "slug",
+            "image",
+            "image_variants",
+            "tags",
+            "status",
+            "views",
+            "date",
+            "user",
+            "profile",
+            "category",
+            "likes_count",
+            "comments_count",
+            "bookmarks_count",
+        ]
+        expandable_fields = {
+            "description": (serializers.CharField, {"read_only": True}),
+            "comments": (CommentBriefSerializer, {"many": True, "read_only": True}),
+            "likes": (PublicUserSerializer, {"many": True, "read_only": True}),
+            # The caller's own like/bookmark flags; such responses bypass the shared caches
+            "viewer": (ViewerStateField, {}),
+        }
+
+
+# Single post page: the card plus its body and comments
+class PostDetailSerializer(PostListSerializer):
+    comments = CommentBriefSerializer(many=True, read_only=True)
+
+    class Meta(PostListSerializer.Meta):
+        fields = PostListSerializer.Meta.fields + ["description", "comments"]
+        expandable_fields = {
+            "likes": (PublicUserSerializer, {"many": True, "read_only": True}),
+            "viewer": (ViewerStateField, {}),
+        }
+
+# Search hit: the feed card plus its relevance and a highlighted excerpt
+class PostSearchResultSerializer(PostListSerializer):
+    rank = serializers.FloatField(source="search_rank", read_only=True)
+    snippet = serializers.CharField(source="search_snippet", read_only=True)
+
+    class Meta(PostListSerializer.Meta):
+        fields = PostListSerializer.Meta.fields + ["rank", "snippet"]
 
 # ADDED THIS SERIALIZER
 class LikePostResponseSerializer(serializers.Serializer):
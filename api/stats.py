@@ -0,0 +1,148 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from api import models as api_models
+
+SERIES_METRICS = ("views", "likes", "comments", "bookmarks", "posts")
+
+
+def author_totals(user_id):
+    """
+    All dashboard totals for an author: one conditional-aggregation query over
+    their posts, reading the stored counters instead of the event tables, plus
+    an index-only count of the bookmarks they made themselves (`bookmarks`,
+    as the dashboard has always reported it; what their posts received is
+    `bookmarks_received`).
+    """
+    totals = api_models.Post.objects.filter(user_id=user_id).aggregate(
+        views=Coalesce(Sum("views"), 0),
+        posts=Count("id"),
+        active_posts=Count("id", filter=Q(status="Active")),
+        likes=Coalesce(Sum("likes_count"), 0),
+        comments=Coalesce(Sum("comments_count"), 0),
+        bookmarks_received=Coalesce(Sum("bookmarks_count"), 0),
+    )
+    totals["bookmarks"] = api_models.Bookmark.objects.filter(user_id=user_id).count()
+    return totals
+
+
+def author_series(user_id, start, end):
+    """
+    Per-day activity on an author's posts between `start` and `end` (inclusive),
+    read from the AuthorDailyStats rollup with empty days filled in.
+    """
+    rows = api_models.AuthorDailyStats.objects.filter(
+        author_id=user_id, date__gte=start, date__lte=end
+    ).values("date", *SERIES_METRICS)
+    by_day = {row["date"]: row for row in rows}
+
+    series = []
+    day = start
+    while day <= end:
+        row = by_day.get(day, {})
+        point = {"date": day}
+        for metric in SERIES_METRICS:
+            point[metric] = row.get(metric, 0)
+        series.append(point)
+        day += timedelta(days=1)
+    return series
+
+
+# ----------------- Incremental rollup maintenance -------------------
+
+def record_activity(author_id, day=None, **deltas):
+    """
+    Add to an author's rollup row for `day` (today by default), e.g.
+    record_activity(post.user_id, likes=1). Nets can go negative on a day
+    when more is undone (unlike, un-bookmark) than done.
+    """
+    changes = {metric: delta for metric, delta in deltas.items() if delta}
+    if not author_id or not changes:
+        return
+    day = day or timezone.localdate()
+    rows = api_models.AuthorDailyStats.objects.filter(author_id=author_id, date=day)
+    if rows.update(**{metric: F(metric) + delta for metric, delta in changes.items()}):
+        return
+    try:
+        with transaction.atomic():
+            api_models.AuthorDailyStats.objects.create(author_id=author_id, date=day, **changes)
+    except IntegrityError:
+        # Another request created today's row first
+        rows.update(**{metric: F(metric) + delta for metric, delta in changes.items()})
+
+
+def record_post_views(post_views):
+    """Fold a flushed {post_id: views} batch into the authors' rollup rows."""
+    per_author = defaultdict(int)
+    for post_id, author_id in api_models.Post.objects.filter(id__in=post_views).values_list("id", "user_id"):
+        per_author[author_id] += post_views[post_id]
+    for author_id, views in per_author.items():
+        record_activity(author_id, views=views)
+
+
+# ----------------- Rebuild -------------------
+
+def _daily_counts(queryset, author_field, value=None):
+    rows = (
+        queryset.annotate(day=TruncDate("date"))
+        .order_by()
+        .values(author_field, "day")
+        .annotate(total=Sum(value) if value else Count("id"))
+    )
+    return [(row[author_field], row["day"], row["total"] or 0) for row in rows]
+
+
+def rebuild_author_stats(author_ids):
+    """
+    Recompute the rollup rows of `author_ids` from the source tables.
+
+    Comments, bookmarks and posts are bucketed by their own timestamps and
+    rewritten. Likes and views carry no timestamp of their own, so the per-day
+    values already recorded by record_activity() / record_post_views() are
+    kept, and only what those rows don't account for (activity from before
+    the rollup existed) is added, on the publish days of the author's oldest
+    posts first. Running it again changes nothing.
+    """
+    posts = api_models.Post.objects.filter(user_id__in=author_ids)
+    sources = {
+        "posts": _daily_counts(posts, "user_id"),
+        "comments": _daily_counts(api_models.Comment.objects.filter(post__user_id__in=author_ids), "post__user_id"),
+        "bookmarks": _daily_counts(api_models.Bookmark.objects.filter(post__user_id__in=author_ids), "post__user_id"),
+    }
+
+    rows = {}
+    untracked = defaultdict(lambda: {"views": 0, "likes": 0})
+    for row in api_models.AuthorDailyStats.objects.filter(author_id__in=author_ids):
+        rows[(row.author_id, row.date)] = api_models.AuthorDailyStats(
+            author_id=row.author_id, date=row.date, views=row.views, likes=row.likes
+        )
+        untracked[row.author_id]["views"] -= row.views
+        untracked[row.author_id]["likes"] -= row.likes
+
+    for metric, counts in sources.items():
+        for author_id, day, total in counts:
+            row = rows.setdefault((author_id, day), api_models.AuthorDailyStats(author_id=author_id, date=day))
+            setattr(row, metric, total)
+
+    history = list(posts.order_by("date", "id").values_list("user_id", "date", "views", "likes_count"))
+    for author_id, date, views, likes in history:
+        untracked[author_id]["views"] += views
+        untracked[author_id]["likes"] += likes
+    for author_id, date, views, likes in history:
+        for metric, value in (("views", views), ("likes", likes)):
+            share = min(value, untracked[author_id][metric])
+            if share > 0:
+                day = timezone.localdate(date)
+                row = rows.setdefault((author_id, day), api_models.AuthorDailyStats(author_id=author_id, date=day))
+                setattr(row, metric, getattr(row, metric) + share)
+                untracked[author_id][metric] -= share
+
+    with transaction.atomic():
+        api_models.AuthorDailyStats.objects.filter(author_id__in=author_ids).delete()
+        api_models.AuthorDailyStats.objects.bulk_create(rows.values(), batch_size=500)
+    return len(rows)
@@ -0,0 +1,191 @@
+import hashlib
+import os
+import re
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+from api import images
+
+CAS_PREFIX = "cas/"
+
+
+def blob_name(digest, original_name):
+    ext = os.path.splitext(original_name)[1].lower()
+    if not re.fullmatch(r"\.[a-z0-9]{1,9}", ext):
+        ext = ""
+    return f"{CAS_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(CAS_PREFIX)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Media storage that files every upload under the SHA-256 of its content:
+
+        image/holiday.jpg  ->  cas/3f/a1/3fa1...c9.jpg
+
+    The digest is computed over the upload's chunks, so memory stays bounded
+    whatever the file size. The same picture uploaded again (by another user,
+    for another post) resolves to the existing blob and is not written twice.
+    A name can never point at different bytes later, so blob URLs are served
+    as immutable (see api.views.serve_media_blob).
+
+    Every stored blob gets a MediaBlob row whose `refcount` counts the model
+    fields pointing at it (maintained by signals in api/models.py); blobs
+    nobody references are removed by `manage.py gc_media`. Names that are not
+    under cas/ (files stored before this backend) are read as before.
+    """
+
+    def __init__(self, **kwargs):
+        # Same name means same bytes, so replacing a blob a concurrent upload just wrote is harmless
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        size = 0
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        digest = digest.hexdigest()
+        name = blob_name(digest, name)
+
+        if not self.exists(name):
+            content.seek(0)
+            name = super()._save(name, content)
+        register_blob(name, digest, size)
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        # _save() picks the final, content-derived name
+        return name
+
+
+def register_blob(name, digest, size):
+    from api.models import MediaBlob
+    if MediaBlob.objects.filter(name=name).update(last_seen_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(name=name, digest=digest, size=size)
+    except IntegrityError:
+        # A concurrent upload of the same bytes registered it first
+        pass
+
+
+def incref(*names):
+    from api.models import MediaBlob
+    for name in filter(is_blob, names):
+        MediaBlob.objects.filter(name=name).update(refcount=F("refcount") + 1)
+
+
+def decref(*names):
+    from api.models import MediaBlob
+    for name in filter(is_blob, names):
+        MediaBlob.objects.filter(name=name).update(refcount=F("refcount") - 1)
+
+
+media_storage_instance = ContentAddressedStorage()
+
+
+def media_storage():
+    """Storage callable for the models' FileFields."""
+    return media_storage_instance
+
+
+def actual_refcounts():
+    """Blob name -> number of image fields pointing at it, counted from the tables."""
+    from api.models import Category, Post, Profile
+    counts = Counter()
+    for model in (Profile, Category, Post):
+        names = model.objects.filter(image__startswith=CAS_PREFIX).values_list("image", flat=True)
+        counts.update(names.iterator(chunk_size=2000))
+    return counts
+
+
+def recount(dry_run=False):
+    """Rewrite refcounts that drifted (e.g. after QuerySet.update(image=...)); returns how many did."""
+    from api.models import MediaBlob
+    counts = actual_refcounts()
+    drifted = 0
+    for blob_id, name, refcount in MediaBlob.objects.values_list("id", "name", "refcount").iterator(chunk_size=2000):
+        if refcount != counts.get(name, 0):
+            drifted += 1
+            if not dry_run:
+                MediaBlob.objects.filter(id=blob_id).update(refcount=counts.get(name, 0))
+    return drifted
+
+
+def variant_dirs_in_use():
+    """Variant directories of the images fields point at, or that their image_variants still describe."""
+    from api.models import Category, Post, Profile
+    in_use = set()
+    for model in (Profile, Category, Post):
+        rows = model.objects.values_list("image", "image_variants__source")
+        for name, source in rows.iterator(chunk_size=2000):
+            in_use.update(images.variant_dir(each) for each in (name, source) if each)
+    return in_use
+
+
+def collect_garbage(grace, dry_run=False):
+    """
+    Delete blobs no field references that were not uploaded again within
+    `grace` (a timedelta), with their resized variants, plus stray files
+    under cas/ with no MediaBlob row (a rolled-back upload) and variant
+    directories of images no field uses any more (a replaced upload).
+    Returns (blobs removed, bytes freed).
+    """
+    from api.models import MediaBlob
+    storage = media_storage_instance
+    cutoff = timezone.now() - grace
+    removed = freed = 0
+    dropped = set()
+
+    orphans = MediaBlob.objects.filter(refcount__lte=0, last_seen_at__lt=cutoff)
+    for blob_id, name, size in orphans.values_list("id", "name", "size").iterator(chunk_size=500):
+        if not dry_run:
+            # Re-checked in the DELETE: a concurrent upload may have revived it
+            deleted, _ = MediaBlob.objects.filter(id=blob_id, refcount__lte=0, last_seen_at__lt=cutoff).delete()
+            if not deleted:
+                continue
+            storage.delete(name)
+        removed += 1
+        variants = images.variant_dir(name)
+        freed += size + images.delete_variants(variants, dry_run)
+        dropped.add(variants)
+
+    root = storage.path(CAS_PREFIX)
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, storage.location).replace(os.sep, "/")
+            if datetime.fromtimestamp(os.path.getmtime(path), tz=dt_timezone.utc) >= cutoff:
+                continue
+            if MediaBlob.objects.filter(name=name).exists():
+                continue
+            size = os.path.getsize(path)
+            if not dry_run:
+                storage.delete(name)
+            removed += 1
+            freed += size
+
+    in_use = variant_dirs_in_use()
+    root = storage.path(images.VARIANTS_DIR)
+    for entry in os.scandir(root) if os.path.isdir(root) else ():
+        directory = f"{images.VARIANTS_DIR}/{entry.name}"
+        if not entry.is_dir() or directory in in_use or directory in dropped:
+            continue
+        if datetime.fromtimestamp(entry.stat().st_mtime, tz=dt_timezone.utc) >= cutoff:
+            continue
+        freed += images.delete_variants(directory, dry_run)
+    return removed, freed
@@ -0,0 +1,65 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.text import slugify
+
+from api import models as api_models
+from api.cache import invalidate
+
+MAX_TAG_LENGTH = 50
+
+
+def parse_tags(raw):
+    """
+    "Django, python ,django,  " -> [("Django", "django"), ("python", "python")]
+
+    Tags are comma separated; the first spelling of a slug wins and tags that
+    slugify to nothing are dropped.
+    """
+    tags = {}
+    for part in (raw or "").split(","):
+        name = part.strip()[:MAX_TAG_LENGTH]
+        slug = slugify(name)
+        if slug and slug not in tags:
+            tags[slug] = name
+    return [(name, slug) for slug, name in tags.items()]
+
+
+def get_or_create_tags(parsed):
+    """Tag rows for parsed (name, slug) pairs, creating the missing ones in one INSERT."""
+    slugs = [slug for _, slug in parsed]
+    existing = api_models.Tag.objects.filter(slug__in=slugs)
+    known = {tag.slug for tag in existing}
+    missing = [api_models.Tag(name=name, slug=slug) for name, slug in parsed if slug not in known]
+    if missing:
+        # A concurrent save may insert the same slug; the unique index keeps one
+        api_models.Tag.objects.bulk_create(missing, ignore_conflicts=True)
+    return list(api_models.Tag.objects.filter(slug__in=slugs))
+
+
+def sync_post_tags(post):
+    """Bring a post's PostTag rows in line with its `tags` string and refresh the affected counts."""
+    wanted = {tag.id for tag in get_or_create_tags(parse_tags(post.tags))}
+    current = set(api_models.PostTag.objects.filter(post_id=post.id).values_list("tag_id", flat=True))
+
+    removed = current - wanted
+    added = wanted - current
+    if removed:
+        api_models.PostTag.objects.filter(post_id=post.id, tag_id__in=removed).delete()
+    if added:
+        api_models.PostTag.objects.bulk_create(
+            [api_models.PostTag(post_id=post.id, tag_id=tag_id) for tag_id in added], ignore_conflicts=True
+        )
+    # Recount the kept tags too: a status change moves the post in or out of every count
+    refresh_tag_counts(current | wanted)
+
+
+def refresh_tag_counts(tag_ids):
+    """Recompute `post_count` (active posts) for the given tags with one UPDATE."""
+    if not tag_ids:
+        return 0
+    active_links = api_models.PostTag.objects.filter(tag_id=OuterRef("pk"), post__status="Active")
+    updated = api_models.Tag.objects.filter(id__in=tag_ids).update(post_count=Coalesce(Subquery(
+        active_links.order_by().values("tag_id").annotate(total=Count("*")).values("total")
+    ), 0))
+    invalidate("tags")
+    return updated
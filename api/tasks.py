@@ -0,0 +1,123 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.utils import timezone
+from PIL import Image
+
+from api import counters
+from api import images
+from api import notifications
+from api import models as api_models
+from api.cache import invalidate, post_tags
+from api.jobs import task
+
+
+@task
+def send_password_reset_email(user_id):
+    # Built from the user's current otp/token, so a retried or late job never mails a stale link
+    user = api_models.User.objects.filter(id=user_id).first()
+    if user is None or not user.reset_token:
+        return
+
+    link = f"{settings.FRONTEND_URL}/create-new-password?otp={user.otp}&uidb64={user.pk}&reset_token={user.reset_token}"
+    merge_data = {
+        'link': link,
+        'username': user.username,
+    }
+    subject = "Password Reset Request"
+    text_body = render_to_string("email/password_reset.txt", merge_data)
+    html_body = render_to_string("email/password_reset.html", merge_data)
+
+    msg = EmailMultiAlternatives(
+        subject=subject,
+        from_email=settings.FROM_EMAIL,
+        to=[user.email],
+        body=text_body
+    )
+    msg.attach_alternative(html_body, "text/html")
+    msg.send()
+
+
+@task
+def notify_comment(post_id, actor_id=None):
+    post = api_models.Post.objects.filter(id=post_id).only("id", "user_id").first()
+    if post is None:
+        return
+    notifications.record(post.user_id, post.id, "Comment", actor_id)
+
+
+@task
+def sync_engagement_notification(post_id, actor_id, noti_type):
+    """
+    Make the "Like"/"Bookmark" notification match the actor's current state:
+    create it while the post is liked (bookmarked), remove it once it is not.
+    Idempotent and order independent, so quick like/unlike toggles whose jobs
+    run late, twice or out of order still settle on the right answer.
+    """
+    post = api_models.Post.objects.filter(id=post_id).only("id", "user_id").first()
+    if post is None or post.user_id == actor_id:
+        return
+
+    if noti_type == "Like":
+        engaged = api_models.Post.likes.through.objects.filter(post_id=post_id, user_id=actor_id).exists()
+    else:
+        engaged = api_models.Bookmark.objects.filter(post_id=post_id, user_id=actor_id).exists()
+
+    if notifications.coalesces(noti_type):
+        if engaged:
+            notifications.record(post.user_id, post_id, noti_type, actor_id)
+        else:
+            notifications.retract(post.user_id, post_id, noti_type, actor_id)
+        return
+
+    existing = api_models.Notification.objects.filter(user_id=post.user_id, post_id=post_id, type=noti_type, actor_id=actor_id)
+    if not engaged:
+        existing.delete()
+    elif not existing.exists():
+        api_models.Notification.objects.create(user_id=post.user_id, post_id=post_id, type=noti_type, actor_id=actor_id)
+
+
+@task
+def generate_image_variants(model, pk, force=False):
+    Model = apps.get_model("api", model)
+    instance = Model.objects.filter(pk=pk).only("id", "image").first()
+    if instance is None:
+        return
+
+    name = instance.image.name if instance.image else None
+    if not name:
+        data = None
+    else:
+        try:
+            data = images.build_variants(instance.image, model, overwrite=force)
+        except (OSError, Image.DecompressionBombError):
+            # Missing or not a decodable image: record it, so saves don't requeue it forever
+            data = {"source": name, "width": None, "height": None, "variants": {}}
+
+    # Only if the image was not replaced meanwhile; the newer upload has its own job
+    same_image = Q(image=name) if name else Q(image__isnull=True) | Q(image="")
+    changes = {"image_variants": data}
+    if model != "profile":
+        changes["updated_at"] = timezone.now()
+    if Model.objects.filter(same_image, pk=pk).update(**changes):
+        variants_changed(model, instance)
+
+
+def variants_changed(model, instance):
+    """
+    .update() sends no post_save, so do what the save signals would: drop the
+    cached responses that embed the image and move their validators on, or
+    readers keep revalidating the variant-less copy with 304s.
+    """
+    if model == "post":
+        invalidate("categories", *post_tags(instance))
+    elif model == "category":
+        invalidate("categories", "posts")
+    else:
+        # A profile is shown on its author's posts, which carry the validators
+        posts = api_models.Post.objects.filter(profile_id=instance.pk)
+        slugs = list(posts.values_list("slug", flat=True))
+        counters.touch_posts(posts)
+        invalidate("posts", *(f"post:{slug}" for slug in slugs))
@@ -1,3 +1,1633 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core import mail
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
 # Create your tests here.
+from channels.routing import URLRouter
+from PIL import Image
+
+from api import async_views
+from api import comments as comment_threads
+from api import counters
+from api import authentication
+from api import engagement
+from api import images
+from api import models as api_models
+from api import serializer as api_serializer
+from api import stats
+from api import jobs
+from api.management.commands import explain_hot_queries, run_worker
+from api.consumers import JWTQueryStringAuthMiddleware
+from api.pagination import KeysetCursorPagination
+from api.routing import websocket_urlpatterns
+from api import realtime
+from api import tags
+from api import tasks
+from api import throttling
+from api import unread
+from api import views as api_views
+from api import view_counter
+from api.view_counter import ViewCountBuffer, view_buffer
+
+# Tests flush views themselves; the background flusher would write from another connection
+view_buffer.timer = False
+
+
+def isolate_view_buffer(test):
+    """Start a test with no buffered views and leave none behind for the next test or the exit flush."""
+    view_buffer.drain()
+    test.addCleanup(view_buffer.drain)
+
+
+def make_user(username, **fields):
+    """A user at <username>@example.com; the post_save signal gives it a profile."""
+    return api_models.User.objects.create(email=f"{username}@example.com", username=username, **fields)
+
+
+def make_post(author, category=None, **fields):
+    """A post by `author`, filed under a shared "Tech" category unless another is given."""
+    if category is None:
+        category = api_models.Category.objects.get_or_create(title="Tech")[0]
+    fields.setdefault("title", "Post")
+    return api_models.Post.objects.create(user=author, profile=author.profile, category=category, **fields)
+
+
+class FeedQueryCountTests(TestCase):
+    """The feed must cost a constant number of queries, whatever the page holds."""
+
+    def setUp(self):
+        cache.clear()
+        isolate_view_buffer(self)
+        self.client = APIClient()
+        self.author = make_user("author")
+        self.category = api_models.Category.objects.create(title="Tech")
+        self.readers = [make_user(f"reader{i}") for i in range(4)]
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = make_post(self.author, category=self.category, title=f"Post {i}")
+            post.likes.add(*self.readers)
+            for reader in self.readers:
+                api_models.Comment.objects.create(
+                    post=post, user=reader, name=reader.username, email=reader.email, comment="Nice"
+                )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response
+
+    def test_post_list_query_count_is_constant(self):
+        self.create_posts(2)
+        small, _ = self.count_queries("/api/v1/post/lists/")
+        self.create_posts(6)
+        large, response = self.count_queries("/api/v1/post/lists/")
+
+        self.assertEqual(len(response.json()["results"]), 8)
+        self.assertEqual(small, large)
+
+    def test_category_feed_query_count_is_constant(self):
+        url = f"/api/v1/post/category/posts/{self.category.slug}/"
+        self.create_posts(1)
+        small, _ = self.count_queries(url)
+        self.create_posts(5)
+        large, _ = self.count_queries(url)
+
+        self.assertEqual(small, large)
+
+    def test_post_detail_query_count_does_not_grow_with_engagement(self):
+        self.create_posts(1)
+        post = api_models.Post.objects.get()
+        small, _ = self.count_queries(f"/api/v1/post/detail/{post.slug}/")
+
+        more_readers = [make_user(f"late{i}") for i in range(5)]
+        post.likes.add(*more_readers)
+        for reader in more_readers:
+            api_models.Comment.objects.create(post=post, user=reader, name=reader.username, email=reader.email)
+        large, _ = self.count_queries(f"/api/v1/post/detail/{post.slug}/")
+
+        self.assertEqual(small, large)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages are disjoint and complete under the composite (date, id) ordering."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = make_user("author")
+        for i in range(7):
+            make_post(self.author, title=f"Post {i}")
+        # Every post shares one timestamp, so only the id can order them
+        api_models.Post.objects.update(date=timezone.now())
+        self.ids = list(api_models.Post.objects.order_by("-id").values_list("id", flat=True))
+
+    def walk(self, url):
+        pages = []
+        while url:
+            body = self.client.get(url).json()
+            pages.append(body)
+            url = body["next"]
+        return pages
+
+    def test_ties_on_date_are_resolved_by_id(self):
+        pages = self.walk("/api/v1/post/lists/?page_size=3")
+        self.assertEqual([len(page["results"]) for page in pages], [3, 3, 1])
+        self.assertEqual([post["id"] for page in pages for post in page["results"]], self.ids)
+
+    def test_previous_cursor_returns_the_page_before(self):
+        first, second, third = self.walk("/api/v1/post/lists/?page_size=3")
+        self.assertIsNone(first["previous"])
+        back = self.client.get(third["previous"]).json()
+        self.assertEqual([post["id"] for post in back["results"]], [post["id"] for post in second["results"]])
+        back = self.client.get(back["previous"]).json()
+        self.assertEqual([post["id"] for post in back["results"]], [post["id"] for post in first["results"]])
+        self.assertIsNone(back["previous"])
+
+    def test_malformed_cursor_is_a_404(self):
+        for cursor in ("garbage", "W1sxXSwwXQ", "W1sibm90LWEtZGF0ZSIsMV0sMF0"):
+            self.assertEqual(self.client.get("/api/v1/post/lists/", {"cursor": cursor}).status_code, 404)
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(KeysetCursorPagination, "max_page_size", 4):
+            body = self.client.get("/api/v1/post/lists/?page_size=1000").json()
+        self.assertEqual(len(body["results"]), 4)
+        self.assertEqual(len(self.client.get("/api/v1/post/lists/?page_size=0").json()["results"]), 7)
+
+    def test_count_only_where_the_view_asks_for_it(self):
+        self.assertNotIn("count", self.client.get("/api/v1/post/lists/").json())
+        self.client.force_authenticate(self.author)
+        body = self.client.get(f"/api/v1/author/dashboard/post-list/{self.author.id}/?page_size=2").json()
+        self.assertEqual((body["count"], len(body["results"])), (7, 2))
+
+
+class SparseFieldsetTests(TestCase):
+    """?fields= and ?expand= shape the top-level post card only."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = make_user("author", otp="123456")
+        self.author.set_password("secret-pass")
+        self.author.save()
+        self.post = make_post(self.author)
+        self.post.likes.add(self.author)
+        api_models.Comment.objects.create(post=self.post, user=self.author, name="author", email="author@example.com", comment="Hi")
+
+    def first_card(self, **params):
+        response = self.client.get("/api/v1/post/lists/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["results"][0]
+
+    def test_fields_keeps_only_the_named_fields(self):
+        self.assertEqual(set(self.first_card(fields="id,title")), {"id", "title"})
+
+    def test_expand_adds_opt_in_fields(self):
+        self.assertNotIn("comments", self.first_card())
+        card = self.first_card(expand="comments,likes", fields="id")
+        self.assertEqual(set(card), {"id", "comments", "likes"})
+        self.assertEqual(card["comments"][0]["comment"], "Hi")
+
+    def test_unknown_names_are_ignored(self):
+        self.assertEqual(set(self.first_card(fields="id,bogus")), {"id"})
+        self.assertNotIn("bogus", self.first_card(expand="bogus"))
+
+    def test_nested_serializers_keep_their_shape(self):
+        card = self.first_card(fields="id,user")
+        self.assertEqual(set(card["user"]), {"id", "username", "full_name"})
+
+    def test_dashboard_post_payload_has_no_credentials(self):
+        self.client.force_authenticate(self.author)
+        body = json.dumps(self.client.get(f"/api/v1/author/dashboard/post-list/{self.author.id}/").json())
+        for secret in ("password", "otp", "reset_token", self.author.password):
+            self.assertNotIn(secret, body)
+
+
+class ViewCountBufferTests(TestCase):
+    """Views are buffered in memory and merged into the counter with F() updates."""
+
+    def setUp(self):
+        isolate_view_buffer(self)
+        author = make_user("author")
+        self.post = make_post(author, views=5)
+
+    def views(self):
+        return api_models.Post.objects.values_list("views", flat=True).get(id=self.post.id)
+
+    def test_flush_is_due_at_the_threshold_or_after_the_interval(self):
+        buffer = ViewCountBuffer(flush_interval=60, flush_threshold=3, timer=False)
+        buffer.record(self.post.id, 2)
+        self.assertFalse(buffer.flush_due())
+        buffer.record(self.post.id)
+        self.assertTrue(buffer.flush_due())
+
+        buffer.drain()
+        buffer.record(self.post.id)
+        with mock.patch("api.view_counter.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertTrue(buffer.flush_due())
+
+    def test_flush_merges_with_concurrent_increments(self):
+        buffer = ViewCountBuffer(timer=False)
+        self.assertEqual([buffer.record(self.post.id) for _ in range(3)], [1, 2, 3])
+        # Another worker's flush lands in between
+        api_models.Post.objects.filter(id=self.post.id).update(views=F("views") + 10)
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(self.views(), 18)
+        self.assertEqual(buffer.pending(self.post.id), 0)
+
+    def test_request_finished_flushes_once_due(self):
+        with mock.patch.object(view_buffer, "flush_threshold", 2):
+            self.client.get(f"/api/v1/post/detail/{self.post.slug}/")
+            self.assertEqual(self.views(), 5)
+            cache.clear()
+            self.client.get(f"/api/v1/post/detail/{self.post.slug}/")
+        self.assertEqual(self.views(), 7)
+
+    def test_exit_flush_writes_what_is_pending(self):
+        view_buffer.record(self.post.id, 4)
+        view_counter.flush_views_at_exit()
+        self.assertEqual(self.views(), 9)
+
+
+class ViewCountTimerTests(TransactionTestCase):
+    """An idle process still writes its views: the flusher thread doesn't wait for a request."""
+
+    def test_timer_thread_flushes_without_a_request(self):
+        author = make_user("author")
+        post = make_post(author)
+        buffer = ViewCountBuffer(flush_interval=0.05, flush_threshold=1000)
+        self.addCleanup(buffer.stop)
+        buffer.record(post.id, 3)
+
+        deadline = time.monotonic() + 5
+        while buffer.pending(post.id) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        buffer.stop()
+        self.assertEqual(api_models.Post.objects.values_list("views", flat=True).get(id=post.id), 3)
+
+
+class ResponseCacheInvalidationTests(TestCase):
+    """Writes drop exactly the cached responses that render what they changed."""
+
+    def setUp(self):
+        cache.clear()
+        isolate_view_buffer(self)
+        self.client = APIClient()
+        self.author = make_user("author")
+        self.reader = make_user("reader")
+        self.category = api_models.Category.objects.create(title="Tech")
+        self.post = make_post(self.author, category=self.category)
+        self.detail = f"/api/v1/post/detail/{self.post.slug}/"
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertCached(self, url, hit):
+        self.assertEqual(self.get(url)["X-Cache"], "HIT" if hit else "MISS")
+
+    def warm(self, *urls):
+        for url in urls:
+            self.get(url)
+            self.assertCached(url, True)
+
+    def test_like_refreshes_the_post_page_but_not_the_feeds(self):
+        self.warm(self.detail, "/api/v1/post/lists/")
+        feed_etag = self.get("/api/v1/post/lists/")["ETag"]
+        self.client.force_authenticate(self.reader)
+        self.client.post("/api/v1/post/like-post/", {"post_id": self.post.id})
+
+        response = self.get(self.detail)
+        self.assertEqual((response["X-Cache"], response.json()["likes_count"]), ("MISS", 1))
+        response = self.get("/api/v1/post/lists/")
+        self.assertEqual(response["X-Cache"], "HIT")
+        # The cached card is older than the like, and says so in its validator
+        self.assertEqual(response["ETag"], feed_etag)
+
+    def test_comment_refreshes_the_post_page_and_its_comment_pages(self):
+        comments = f"/api/v1/post/{self.post.id}/comments/"
+        self.warm(self.detail, comments, "/api/v1/post/lists/")
+        self.client.post("/api/v1/post/comment-post/", {
+            "post_id": self.post.id, "name": "reader", "email": "reader@example.com", "comment": "Hi",
+        }, format="json")
+        self.assertEqual(len(self.get(comments).json()["results"]), 1)
+        self.assertEqual(self.get(self.detail).json()["comments_count"], 1)
+        self.assertCached("/api/v1/post/lists/", True)
+
+    def test_post_edit_refreshes_the_feeds(self):
+        self.warm("/api/v1/post/lists/", self.detail)
+        self.client.force_authenticate(self.author)
+        self.client.put(f"/api/v1/author/dashboard/post-detail/{self.author.id}/{self.post.id}/", {
+            "title": "Edited", "category": self.category.id, "post_status": "Active",
+        }, format="json")
+        self.assertEqual(self.get("/api/v1/post/lists/").json()["results"][0]["title"], "Edited")
+        self.assertEqual(self.get(self.detail).json()["title"], "Edited")
+
+    def test_category_change_refreshes_category_lists(self):
+        self.warm("/api/v1/post/category/list/")
+        self.category.title = "Science"
+        self.category.save()
+        self.assertEqual(self.get("/api/v1/post/category/list/").json()["results"][0]["title"], "Science")
+
+    def test_category_change_refreshes_its_post_pages(self):
+        self.warm(self.detail)
+        self.category.title = "Science"
+        self.category.save()
+        self.assertEqual(self.get(self.detail).json()["category"]["title"], "Science")
+
+    def test_author_edits_refresh_the_posts_that_show_them(self):
+        comments = f"/api/v1/post/{self.post.id}/comments/"
+        api_models.Comment.objects.create(post=self.post, user=self.author, name="author", comment="Hi")
+        self.warm("/api/v1/post/lists/", self.detail, comments)
+        profile = api_models.Profile.objects.get(user=self.author)
+        profile.full_name = "Ada Author"
+        profile.save()
+        self.assertEqual(self.get("/api/v1/post/lists/").json()["results"][0]["profile"]["full_name"], "Ada Author")
+        self.assertEqual(self.get(self.detail).json()["profile"]["full_name"], "Ada Author")
+
+        self.warm("/api/v1/post/lists/", self.detail, comments)
+        user = api_models.User.objects.get(id=self.author.id)
+        user.username = "ada"
+        user.save()
+        self.assertEqual(self.get(self.detail).json()["user"]["username"], "ada")
+        self.assertEqual(self.get(comments).json()["results"][0]["user"]["username"], "ada")
+
+    def test_author_saves_that_change_nothing_shown_keep_the_cache(self):
+        self.warm("/api/v1/post/lists/", self.detail)
+        user = api_models.User.objects.get(id=self.author.id)
+        user.last_login = timezone.now()
+        user.save()  # saves the profile too
+        self.assertCached("/api/v1/post/lists/", True)
+        self.assertCached(self.detail, True)
+
+
+class ConditionalGetTests(TestCase):
+    """Lists revalidate by ETag (their cache tags' versions); the post page also by Last-Modified."""
+
+    def setUp(self):
+        cache.clear()
+        isolate_view_buffer(self)
+        self.client = APIClient()
+        author = make_user("author")
+        self.posts = [
+            make_post(author, title=f"Post {i}")
+            for i in range(2)
+        ]
+
+    def test_list_etag_answers_304_until_a_row_is_deleted(self):
+        response = self.client.get("/api/v1/post/lists/")
+        etag = response["ETag"]
+        self.assertNotIn("Last-Modified", response)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/v1/post/lists/", headers={"If-None-Match": etag}).status_code, 304)
+        # Another page or fieldset validates on its own
+        self.assertEqual(self.client.get("/api/v1/post/lists/?fields=id", headers={"If-None-Match": etag}).status_code, 200)
+
+        # Even the oldest post going bumps the "posts" tag
+        self.posts[0].delete()
+        response = self.client.get("/api/v1/post/lists/", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_author_and_category_edits_change_the_validators(self):
+        post = self.posts[1]
+        urls = ["/api/v1/post/lists/", f"/api/v1/post/detail/{post.slug}/", f"/api/v1/post/category/posts/{post.category.slug}/"]
+        for edit in ("profile", "user", "category"):
+            etags = {url: self.client.get(url)["ETag"] for url in urls}
+            if edit == "profile":
+                profile = api_models.Profile.objects.get(user=post.user)
+                profile.bio = "Writes about tech"
+                profile.save()
+            elif edit == "user":
+                user = api_models.User.objects.get(id=post.user_id)
+                user.full_name = "Ada Author"
+                user.save()
+            else:
+                category = api_models.Category.objects.get(id=post.category_id)
+                category.title = "Science"
+                category.save()
+            for url in urls:
+                self.assertEqual(self.client.get(url, headers={"If-None-Match": etags[url]}).status_code, 200, (edit, url))
+
+    def test_list_etag_rolls_over_with_the_cache_timeout(self):
+        url = "/api/v1/post/lists/"
+        etag = self.client.get(url)["ETag"]
+        # Like counts on the cards don't bump the "posts" tag; they show once the window passes
+        with mock.patch("api.conditional.time.time", return_value=time.time() + 86400):
+            self.assertEqual(self.client.get(url, headers={"If-None-Match": etag}).status_code, 200)
+
+    def test_list_ignores_if_modified_since_alone(self):
+        since = http_date(time.time() + 60)
+        self.posts[0].delete()
+        self.assertEqual(self.client.get("/api/v1/post/lists/", headers={"If-Modified-Since": since}).status_code, 200)
+
+    def test_detail_answers_if_modified_since(self):
+        post = self.posts[1]
+        url = f"/api/v1/post/detail/{post.slug}/"
+        last_modified = self.client.get(url)["Last-Modified"]
+        self.assertEqual(self.client.get(url, headers={"If-Modified-Since": last_modified}).status_code, 304)
+
+        api_models.Post.objects.filter(id=post.id).update(updated_at=timezone.now() + timedelta(seconds=5))
+        self.assertEqual(self.client.get(url, headers={"If-Modified-Since": last_modified}).status_code, 200)
+
+
+@skipUnless(connection.vendor == "sqlite", "asserts SQLite's EXPLAIN QUERY PLAN output")
+class HotQueryIndexTests(TestCase):
+    """The hot query shapes are served by the tuned indexes, and explain_hot_queries can show the difference."""
+
+    def setUp(self):
+        author = make_user("author")
+        post = make_post(author, status="Active")
+        api_models.Notification.objects.create(user=author, post=post, type="Like")
+
+    def plans(self):
+        return {label: queryset.explain() for label, queryset in explain_hot_queries.hot_queries()}
+
+    def test_feeds_and_inbox_use_their_indexes(self):
+        plans = self.plans()
+        self.assertIn("post_active_feed_idx", plans["Active feed, first page"])
+        self.assertIn("post_active_feed_idx", plans["Active feed, deep keyset page"])
+        self.assertIn("post_active_category_idx", plans["Category feed"])
+        self.assertIn("tag_cloud_idx", plans["Tag cloud"])
+        self.assertIn("noti_user_seen_idx", plans["Unseen notifications"])
+        self.assertNotIn("TEMP B-TREE", plans["Active feed, first page"])
+
+    def test_compare_drops_the_indexes_only_for_the_before_plans(self):
+        out = io.StringIO()
+        call_command("explain_hot_queries", "--compare", stdout=out)
+        before, _, after = out.getvalue().partition("== AFTER")
+        self.assertNotIn("post_active_feed_idx", before)
+        self.assertIn("post_active_feed_idx", after)
+        self.assertIn("post_active_feed_idx", self.plans()["Active feed, first page"])
+
+
+class SearchTests(TestCase):
+    """Ranked, highlighted full-text search that follows edits and never echoes markup."""
+
+    def setUp(self):
+        isolate_view_buffer(self)
+        self.client = APIClient()
+        self.author = make_user("author")
+
+    def post(self, title, description="", tags=""):
+        return make_post(self.author, title=title, description=description, tags=tags, status="Active")
+
+    def search(self, q):
+        response = self.client.get("/api/v1/post/search/", {"q": q})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_title_matches_rank_above_description_matches(self):
+        body = self.post("Gardening notes", description="<p>Something about zebras</p>")
+        title = self.post("Zebras of the savanna")
+        hits = self.search("zebras")
+        self.assertEqual([hit["id"] for hit in hits], [title.id, body.id])
+        self.assertGreater(hits[0]["rank"], hits[1]["rank"])
+
+    def test_last_term_matches_as_a_prefix(self):
+        post = self.post("Zebra crossing")
+        self.assertEqual([hit["id"] for hit in self.search("zeb")], [post.id])
+        self.assertEqual(self.search("crossing zeb")[0]["snippet"], "<mark>Zebra</mark> <mark>crossing</mark>")
+
+    def test_index_follows_edits_and_deletes(self):
+        post = self.post("Zebra crossing")
+        post.title = "Giraffe crossing"
+        post.save()
+        self.assertEqual(self.search("zebra"), [])
+        self.assertEqual([hit["id"] for hit in self.search("giraffe")], [post.id])
+
+        post.delete()
+        self.assertEqual(self.search("giraffe"), [])
+
+    def test_query_syntax_is_taken_literally(self):
+        post = self.post("Zebra crossing")
+        for q in ['"zebra', "zebra*", "* zebra", "(zebra", "-zebra ^", "zebra:"]:
+            self.assertEqual([hit["id"] for hit in self.search(q)], [post.id], q)
+        # Operators are plain words to match, not syntax
+        for q in ["zebra OR giraffe", "zebra NEAR(crossing", "title:zebra", '"*"']:
+            self.assertEqual(self.search(q), [], q)
+
+    def test_snippets_escape_post_markup(self):
+        self.post("<img src=x onerror=alert(1)> zebra")
+        self.post("Quiet title", description="<p>&lt;script&gt;alert(1)&lt;/script&gt; giraffe \ue000x\ue001</p>")
+        self.assertEqual(self.search("zebra")[0]["snippet"], "&lt;img src=x onerror=alert(1)&gt; <mark>zebra</mark>")
+        snippet = self.search("giraffe")[0]["snippet"]
+        self.assertEqual(snippet, "&lt;script&gt;alert(1)&lt;/script&gt; <mark>giraffe</mark> x")
+
+
+class TagTests(TestCase):
+    """Post.tags is mirrored into Tag/PostTag, with active-post counts kept current."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = make_user("author")
+
+    def create_post(self, tags, status="Active"):
+        return make_post(self.author, title=f"Post {tags}", tags=tags, status=status)
+
+    def counts(self):
+        return dict(api_models.Tag.objects.values_list("slug", "post_count"))
+
+    def test_parse_tags(self):
+        self.assertEqual(tags.parse_tags("Django, python ,django,  ,!!"), [("Django", "django"), ("python", "python")])
+        self.assertEqual(tags.parse_tags(None), [])
+
+    def test_counts_follow_edits_status_and_delete(self):
+        post = self.create_post("django, python")
+        self.create_post("python")
+        self.assertEqual(self.counts(), {"django": 1, "python": 2})
+
+        post.tags = "python, rest"
+        post.save()
+        self.assertEqual(self.counts(), {"django": 0, "python": 2, "rest": 1})
+
+        post.status = "Draft"
+        post.save()
+        self.assertEqual(self.counts(), {"django": 0, "python": 1, "rest": 0})
+
+        api_models.Post.objects.exclude(id=post.id).delete()
+        self.assertEqual(self.counts(), {"django": 0, "python": 0, "rest": 0})
+
+    def test_tag_feed_and_cloud(self):
+        self.create_post("django, python")
+        self.create_post("python")
+        self.create_post("python", status="Draft")
+
+        response = self.client.get("/api/v1/post/tag/python/")
+        self.assertEqual(len(response.json()["results"]), 2)
+        self.assertEqual(self.client.get("/api/v1/post/tag/missing/").status_code, 404)
+
+        cloud = self.client.get("/api/v1/post/tags/").json()
+        self.assertEqual([(tag["slug"], tag["post_count"]) for tag in cloud], [("python", 2), ("django", 1)])
+
+
+@jobs.task(max_attempts=2)
+def flaky_task(fail):
+    if fail:
+        raise RuntimeError("downstream is down")
+
+
+@override_settings(FRONTEND_URL="https://blog.example.com")
+class JobQueueTests(TestCase):
+    """Side effects are queued by the request and applied by the worker."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = make_user("author")
+        self.reader = make_user("reader")
+        self.post = make_post(self.author)
+        # Drop the image-variant jobs queued by the fixtures
+        api_models.Job.objects.all().delete()
+
+    def run_worker(self):
+        # What each run_worker thread does, on this test's connection
+        while jobs.run_due("test"):
+            pass
+
+    def test_password_reset_email_is_sent_by_the_worker(self):
+        response = self.client.get(f"/api/v1/user/password-reset/{self.reader.email}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(api_models.Job.objects.filter(name="api.tasks.send_password_reset_email").count(), 1)
+
+        self.run_worker()
+        self.assertEqual(len(mail.outbox), 1)
+        self.reader.refresh_from_db()
+        self.assertIn(self.reader.reset_token, mail.outbox[0].alternatives[0][0])
+        self.assertFalse(api_models.Job.objects.exists())
+
+    def test_engagement_notification_settles_on_current_state(self):
+        self.client.force_authenticate(self.reader)
+        self.client.post("/api/v1/post/like-post/", {"post_id": self.post.id})
+        self.client.post("/api/v1/post/like-post/", {"post_id": self.post.id})
+        self.client.post("/api/v1/post/like-post/", {"post_id": self.post.id})
+        self.run_worker()
+        self.assertEqual(api_models.Notification.objects.filter(type="Like").count(), 1)
+
+        self.client.post("/api/v1/post/like-post/", {"post_id": self.post.id})
+        self.run_worker()
+        self.assertFalse(api_models.Notification.objects.filter(type="Like").exists())
+
+    def test_failed_job_is_retried_with_backoff_then_marked_failed(self):
+        job = jobs.enqueue(flaky_task, fail=True)
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("queued", 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("downstream is down", job.last_error)
+
+        api_models.Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+
+    def test_worker_requeues_orphaned_jobs_once_per_lease(self):
+        job = jobs.enqueue(flaky_task, fail=False)
+        api_models.Job.objects.filter(id=job.id).update(
+            status="running", locked_by="crashed:1:0", locked_at=timezone.now() - timedelta(hours=1)
+        )
+        command = run_worker.Command(stdout=io.StringIO())
+        command.requeue_interval, command.next_requeue = 600, 0
+
+        command.maybe_requeue()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ("queued", None))
+
+        # Within the same lease the sweep doesn't run again
+        api_models.Job.objects.filter(id=job.id).update(status="running", locked_at=timezone.now() - timedelta(hours=1))
+        command.maybe_requeue()
+        self.assertEqual(api_models.Job.objects.get(id=job.id).status, "running")
+        with mock.patch("api.management.commands.run_worker.time.monotonic", return_value=time.monotonic() + 601):
+            command.maybe_requeue()
+        self.assertEqual(api_models.Job.objects.get(id=job.id).status, "queued")
+
+    def test_worker_thread_survives_errors(self):
+        command = run_worker.Command()
+        command.stop, command.max_backoff = threading.Event(), 0.01
+        outcomes = [OperationalError("connection lost"), RuntimeError("bug"), 1, 0]
+
+        def run_due(worker_id):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            if not outcomes:
+                command.stop.set()
+            return outcome
+
+        module = "api.management.commands.run_worker"
+        with mock.patch(f"{module}.jobs.run_due", side_effect=run_due), \
+                mock.patch(f"{module}.connection") as worker_connection, \
+                mock.patch(f"{module}.close_old_connections"), \
+                self.assertLogs(module, "ERROR") as logs:
+            command.work("test", {"burst": False, "poll_interval": 0.001})
+        self.assertEqual(outcomes, [])
+        self.assertEqual(len(logs.records), 2)
+        # The broken connection is dropped after each failure, and once more on the way out
+        self.assertEqual(worker_connection.close.call_count, 3)
+
+    @override_settings(CHANNEL_LAYERS={})
+    def test_worker_refuses_a_per_process_cache(self):
+        # Its invalidations and unread-count updates would never reach the web processes
+        with self.assertRaisesMessage(CommandError, "CACHE_BACKEND=db"):
+            call_command("run_worker", "--burst")
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        shared = {"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location}}
+        with override_settings(CACHES=shared):
+            run_worker.Command().check_shared_state()
+
+    def test_a_claimed_job_cannot_be_claimed_again(self):
+        job = jobs.enqueue(flaky_task, fail=False)
+        self.assertEqual([claimed.id for claimed in jobs.claim("a")], [job.id])
+        self.assertEqual(jobs.claim("b"), [])
+
+
+class NotificationSocketTests(TestCase):
+    """New notifications are pushed to the recipient's WebSocket."""
+
+    def setUp(self):
+        self.author = make_user("author")
+        self.reader = make_user("reader")
+        self.post = make_post(self.author)
+        self.app = JWTQueryStringAuthMiddleware(URLRouter(websocket_urlpatterns))
+
+    def connect(self, token):
+        return ApplicationCommunicator(self.app, {
+            "type": "websocket",
+            "path": "/ws/notifications/",
+            "query_string": f"token={token}".encode(),
+            "headers": [],
+            "subprotocols": [],
+        })
+
+    def notify(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return api_models.Notification.objects.create(user=self.author, actor=self.reader, post=self.post, type="Like")
+
+    def test_push_on_create(self):
+        async def scenario():
+            socket = self.connect(AccessToken.for_user(self.author))
+            await socket.send_input({"type": "websocket.connect"})
+            self.assertEqual((await socket.receive_output(1))["type"], "websocket.accept")
+
+            notification = await sync_to_async(self.notify)()
+            event = json.loads((await socket.receive_output(1))["text"])
+            self.assertEqual(event["event"], "notification.created")
+            self.assertEqual(event["id"], notification.id)
+            self.assertEqual(event["actor"], {"id": self.reader.id, "username": "reader"})
+            self.assertEqual(event["post"]["slug"], self.post.slug)
+
+            await socket.send_input({"type": "websocket.disconnect", "code": 1000})
+            await socket.wait(1)
+
+        async_to_sync(scenario)()
+
+    def test_push_from_the_job_worker(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        api_models.Job.objects.all().delete()
+
+        def like_and_work():
+            response = client.post("/api/v1/post/like-post/", {"post_id": self.post.id})
+            self.assertEqual(response.status_code, 201)
+            self.assertFalse(api_models.Notification.objects.exists())
+            with self.captureOnCommitCallbacks(execute=True):
+                while jobs.run_due("test"):
+                    pass
+            return api_models.Notification.objects.get(user=self.author, type="Like")
+
+        async def scenario():
+            socket = self.connect(AccessToken.for_user(self.author))
+            await socket.send_input({"type": "websocket.connect"})
+            self.assertEqual((await socket.receive_output(1))["type"], "websocket.accept")
+
+            notification = await sync_to_async(like_and_work)()
+            event = json.loads((await socket.receive_output(1))["text"])
+            self.assertEqual(event["event"], "notification.created")
+            self.assertEqual(event["id"], notification.id)
+            self.assertEqual(event["actor"]["id"], self.reader.id)
+
+            await socket.send_input({"type": "websocket.disconnect", "code": 1000})
+            await socket.wait(1)
+
+        async_to_sync(scenario)()
+
+    def test_unreachable_layer_fails_neither_request_nor_job(self):
+        class DownLayer:
+            async def group_send(self, group, message):
+                raise ConnectionError("redis is down")
+
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        api_models.Job.objects.all().delete()
+        with mock.patch("api.realtime.get_channel_layer", return_value=DownLayer()), \
+                self.assertLogs("api.realtime", "ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(client.post("/api/v1/post/like-post/", {"post_id": self.post.id}).status_code, 201)
+                while jobs.run_due("test"):
+                    pass
+            # The job succeeded once instead of failing into a retry that would notify again
+            self.assertFalse(api_models.Job.objects.exists())
+            notification = api_models.Notification.objects.get(user=self.author, type="Like")
+
+            client.force_authenticate(self.author)
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.post("/api/v1/author/dashboard/noti-mark-seen/", {"noti_id": notification.id}, format="json")
+            self.assertEqual(response.status_code, 200)
+
+    def test_worker_refuses_the_in_memory_layer(self):
+        # Its pushes would only reach sockets inside the worker process, i.e. none
+        with self.assertRaisesMessage(CommandError, "CHANNEL_LAYER=redis"):
+            call_command("run_worker", "--burst")
+        with override_settings(CHANNEL_LAYERS={}):
+            realtime.require_shared_layer("Jobs run in this worker")
+
+    def test_rejects_invalid_token(self):
+        async def scenario():
+            socket = self.connect("not-a-token")
+            await socket.send_input({"type": "websocket.connect"})
+            message = await socket.receive_output(1)
+            self.assertEqual((message["type"], message["code"]), ("websocket.close", 4401))
+
+        async_to_sync(scenario)()
+
+
+class AsyncReadViewTests(TestCase):
+    """The async read views answer exactly like their sync counterparts."""
+
+    def setUp(self):
+        cache.clear()
+        isolate_view_buffer(self)
+        self.client = APIClient()
+        self.factory = AsyncRequestFactory()
+        author = make_user("author")
+        reader = make_user("reader")
+        self.category = api_models.Category.objects.create(title="Tech")
+        for i in range(3):
+            post = make_post(author, category=self.category, title=f"Post {i}")
+            post.likes.add(reader)
+            api_models.Comment.objects.create(post=post, user=reader, name="reader", email=reader.email, comment="Nice")
+        self.post = post
+
+    def compare(self, url, view, **kwargs):
+        expected = self.client.get(url)
+        cache.clear()
+        response = async_to_sync(view.as_view())(self.factory.get(url), **kwargs)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(json.loads(response.content), expected.json())
+        return response
+
+    def test_same_bodies_as_sync_views(self):
+        self.compare("/api/v1/post/lists/?page_size=2&expand=comments", async_views.AsyncPostListAPIView)
+        self.compare("/api/v1/post/category/list/", async_views.AsyncCategoryListAPIView)
+        self.compare(
+            f"/api/v1/post/category/posts/{self.category.slug}/", async_views.AsyncPostCategoryListAPIView,
+            category_slug=self.category.slug,
+        )
+        self.compare("/api/v1/post/category/posts/missing/", async_views.AsyncPostCategoryListAPIView, category_slug="missing")
+
+    def test_detail_and_conditional_get(self):
+        response = async_to_sync(async_views.AsyncPostDetailAPIView.as_view())(
+            self.factory.get(f"/api/v1/post/detail/{self.post.slug}/"), slug=self.post.slug
+        )
+        self.assertEqual(json.loads(response.content)["comments"][0]["comment"], "Nice")
+
+        request = self.factory.get(f"/api/v1/post/detail/{self.post.slug}/", headers={"If-None-Match": response["ETag"]})
+        response = async_to_sync(async_views.AsyncPostDetailAPIView.as_view())(request, slug=self.post.slug)
+        self.assertEqual(response.status_code, 304)
+
+
+class ImageVariantTests(TestCase):
+    """Uploads get resized, metadata-free variants from the worker, exposed as URLs and srcsets."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        cache.clear()
+        self.author = make_user("author")
+
+    def upload(self, size=(2000, 1000)):
+        exif = Image.Exif()
+        exif[0x010F] = "SecretCam"  # Make
+        buffer = io.BytesIO()
+        Image.new("RGB", size, (200, 30, 30)).save(buffer, "JPEG", exif=exif)
+        return SimpleUploadedFile("photo.jpg", buffer.getvalue(), content_type="image/jpeg")
+
+    def run_worker(self):
+        while jobs.run_due("test"):
+            pass
+
+    def test_variants_are_built_off_the_request_and_served(self):
+        post = make_post(self.author, title="Photo", image=self.upload())
+        self.assertIsNone(post.image_variants)
+        self.run_worker()
+        post.refresh_from_db()
+
+        variants = post.image_variants["variants"]
+        self.assertEqual(variants["sm"]["width"], 480)
+        self.assertEqual(variants["lg"]["height"], 800)
+        for name in variants["sm"]["files"].values():
+            with Image.open(f"{self.media_root}/{name}") as image:
+                self.assertEqual(image.width, 480)
+                self.assertNotIn(0x010F, image.getexif())
+
+        card = APIClient().get("/api/v1/post/lists/").json()["results"][0]
+        self.assertIn("480w", card["image_variants"]["srcset"]["jpeg"])
+        self.assertTrue(card["image_variants"]["variants"]["md"]["webp"].endswith("/md.webp"))
+
+    def test_small_images_are_not_upscaled_and_replacements_rebuild(self):
+        post = make_post(self.author, title="Small", image=self.upload((600, 300)))
+        self.run_worker()
+        post.refresh_from_db()
+        self.assertEqual(sorted(post.image_variants["variants"]), ["sm"])
+
+        post.image = self.upload((1200, 600))
+        post.save()
+        self.run_worker()
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants["source"], post.image.name)
+        self.assertEqual(sorted(post.image_variants["variants"]), ["md", "sm"])
+
+    def test_variants_replace_cached_and_validated_copies(self):
+        post = make_post(self.author, title="Photo", image=self.upload())
+        client = APIClient()
+        url = f"/api/v1/post/detail/{post.slug}/"
+        before = client.get(url)
+        self.assertIsNone(before.json()["image_variants"])
+        self.assertIsNone(client.get("/api/v1/post/lists/").json()["results"][0]["image_variants"])
+
+        self.run_worker()
+        after = client.get(url, HTTP_IF_NONE_MATCH=before["ETag"])
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after["ETag"], before["ETag"])
+        self.assertIn("sm", after.json()["image_variants"]["variants"])
+        self.assertIsNotNone(client.get("/api/v1/post/lists/").json()["results"][0]["image_variants"])
+
+    def test_profile_variants_reach_the_author_posts(self):
+        post = make_post(self.author)
+        self.run_worker()
+        client = APIClient()
+        url = f"/api/v1/post/detail/{post.slug}/"
+        before = client.get(url)
+        self.assertIsNone(before.json()["profile"]["image_variants"])
+
+        profile = self.author.profile
+        profile.image = self.upload()
+        profile.save()
+        self.run_worker()
+        after = client.get(url, HTTP_IF_NONE_MATCH=before["ETag"])
+        self.assertEqual(after.status_code, 200)
+        self.assertIn("sm", after.json()["profile"]["image_variants"]["variants"])
+
+
+class MediaBlobTests(TestCase):
+    """Uploads are stored once per content, reference counted, collected when orphaned and served immutable."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.author = make_user("author")
+
+    def post(self, content, title="Photo"):
+        upload = SimpleUploadedFile("holiday.jpg", content, content_type="image/jpeg")
+        return make_post(self.author, title=title, image=upload)
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.post(b"same bytes")
+        second = self.post(b"same bytes", title="Again")
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(first.image.name.startswith("cas/"))
+        blob = api_models.MediaBlob.objects.get()
+        self.assertEqual((blob.refcount, blob.size), (2, 10))
+
+        second.image = SimpleUploadedFile("other.jpg", b"other bytes")
+        second.save()
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 1)
+        first.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 0)
+
+    def test_gc_removes_orphans_after_the_grace_period(self):
+        kept = self.post(b"kept")
+        orphan = self.post(b"orphan")
+        orphan_name = orphan.image.name
+        orphan.delete()
+
+        call_command("gc_media", stdout=io.StringIO())
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, orphan_name)))
+
+        api_models.MediaBlob.objects.update(last_seen_at=timezone.now() - timedelta(days=2))
+        call_command("gc_media", stdout=io.StringIO())
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, orphan_name)))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, kept.image.name)))
+        self.assertEqual(list(api_models.MediaBlob.objects.values_list("name", flat=True)), [kept.image.name])
+
+    def test_gc_removes_variants_no_image_uses(self):
+        def photo(color):
+            buffer = io.BytesIO()
+            Image.new("RGB", (600, 300), color).save(buffer, "JPEG")
+            return buffer.getvalue()
+
+        def variants_of(name):
+            return os.path.join(self.media_root, images.variant_dir(name))
+
+        kept = self.post(photo((10, 10, 10)))
+        orphan = self.post(photo((200, 200, 200)), title="Orphan")
+        while jobs.run_due("test"):
+            pass
+        orphan_name = orphan.image.name
+        self.assertTrue(os.path.isdir(variants_of(orphan_name)))
+        orphan.delete()
+        # Left behind by an image replaced (or a blob collected) before variants were collected
+        stray = variants_of("image/replaced.jpg")
+        os.makedirs(stray)
+        with open(os.path.join(stray, "sm.jpeg"), "wb") as handle:
+            handle.write(b"stale")
+
+        call_command("gc_media", stdout=io.StringIO())
+        self.assertTrue(os.path.isdir(variants_of(orphan_name)))
+        self.assertTrue(os.path.isdir(stray))
+
+        api_models.MediaBlob.objects.update(last_seen_at=timezone.now() - timedelta(days=2))
+        two_days_ago = time.time() - 2 * 86400
+        for directory in (stray, variants_of(kept.image.name)):
+            os.utime(directory, (two_days_ago, two_days_ago))
+        call_command("gc_media", stdout=io.StringIO())
+        self.assertFalse(os.path.exists(variants_of(orphan_name)))
+        self.assertFalse(os.path.exists(stray))
+        self.assertTrue(os.path.isdir(variants_of(kept.image.name)))
+
+    def test_recount_repairs_bypassed_updates(self):
+        post = self.post(b"counted")
+        api_models.Post.objects.filter(id=post.id).update(image="")
+        call_command("gc_media", "--recount", "--grace-hours", "0", stdout=io.StringIO())
+        self.assertFalse(api_models.MediaBlob.objects.exists())
+
+    def test_blobs_are_served_with_immutable_cache_headers(self):
+        post = self.post(b"served")
+        response = self.client.get(post.image.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"served")
+        self.assertIn("immutable", response["Cache-Control"])
+
+        response = self.client.get(post.image.url, headers={"If-None-Match": response["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+
+class ChunkedUploadTests(TestCase):
+    """Post images can be sent in resumable chunks and attached to a post by upload id."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            UPLOADS={"TEMP_DIR": os.path.join(self.media_root, "tmp"), "CHUNK_SIZE": 1024, "MAX_SIZE": 64 * 1024},
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.author = make_user("author")
+        self.category = api_models.Category.objects.create(title="Tech")
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+        buffer = io.BytesIO()
+        Image.effect_noise((64, 64), 80).convert("RGB").save(buffer, "PNG")
+        self.image = buffer.getvalue()
+
+    def start(self, size):
+        response = self.client.post("/api/v1/author/dashboard/upload/", {"filename": "big.png", "size": size}, format="json")
+        self.assertEqual(response.status_code, 201)
+        return f"/api/v1/author/dashboard/upload/{response.data['upload_id']}/", response.data["upload_id"]
+
+    def put(self, url, data, start):
+        return self.client.generic(
+            "PUT", url, data, content_type="application/octet-stream",
+            headers={"Content-Range": f"bytes {start}-{start + len(data) - 1}/{len(self.image)}"},
+        )
+
+    def test_chunks_resume_and_attach_to_a_post(self):
+        url, upload_id = self.start(len(self.image))
+        chunks = [self.image[i:i + 1024] for i in range(0, len(self.image), 1024)]
+        self.assertGreater(len(chunks), 2)
+
+        self.assertEqual(self.put(url, chunks[0], 0).data["offset"], 1024)
+        # A retried or skipped chunk is refused; the client resumes from the reported offset
+        self.assertEqual(self.put(url, chunks[0], 0).status_code, 409)
+        self.assertEqual(self.put(url, chunks[2], 2048).status_code, 409)
+        offset = self.client.get(url).data["offset"]
+        for index in range(offset // 1024, len(chunks)):
+            response = self.put(url, chunks[index], index * 1024)
+        self.assertEqual(response.data["status"], "complete")
+
+        response = self.client.post("/api/v1/author/dashboard/post-create/", {
+            "title": "Big", "category": self.category.id, "post_status": "Active", "upload_id": upload_id,
+        })
+        self.assertEqual(response.status_code, 201)
+        post = api_models.Post.objects.get(title="Big")
+        self.assertTrue(post.image.name.startswith("cas/"))
+        with post.image.open("rb") as stored:
+            self.assertEqual(stored.read(), self.image)
+        self.assertFalse(api_models.Upload.objects.exists())
+
+    def test_first_chunk_must_be_a_supported_image(self):
+        url, _ = self.start(len(self.image))
+        response = self.put(url, b"<?php system($_GET['c']); ?>" + b" " * 100, 0)
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(self.client.get(url).data["offset"], 0)
+
+    def test_oversized_uploads_are_refused_up_front(self):
+        response = self.client.post("/api/v1/author/dashboard/upload/", {"filename": "huge.png", "size": 10 ** 9}, format="json")
+        self.assertEqual(response.status_code, 413)
+
+
+class NotificationInboxTests(TestCase):
+    """Notifications are marked seen in bulk with single UPDATEs and the badge count comes from the cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = make_user("author")
+        self.reader = make_user("reader")
+        self.post = make_post(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notifications = [
+                api_models.Notification.objects.create(user=self.author, actor=self.reader, post=self.post, type="Like")
+                for _ in range(5)
+            ]
+            api_models.Notification.objects.create(user=self.reader, post=self.post, type="Comment")
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def unread(self):
+        return self.client.get("/api/v1/author/dashboard/noti-unread-count/").data["unread"]
+
+    def mark(self, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post("/api/v1/author/dashboard/noti-mark-seen/", data, format="json")
+        self.assertEqual(len([q for q in queries if q["sql"].startswith("UPDATE")]), 1)
+        return response.data["updated"]
+
+    def test_bulk_mark_seen(self):
+        ids = [n.id for n in self.notifications]
+        self.assertEqual(self.unread(), 5)
+        self.assertEqual(self.mark({"ids": ids[:2]}), 2)
+        self.assertEqual(self.mark({"before": ids[3]}), 2)
+        self.assertEqual(self.mark({"noti_id": ids[3]}), 0)
+        self.assertEqual(self.unread(), 1)
+        self.assertEqual(self.mark({"all": True}), 1)
+        self.assertEqual(api_models.Notification.objects.filter(user=self.reader, seen=False).count(), 1)
+
+    def test_unread_count_is_cached_and_kept_current(self):
+        self.assertEqual(self.unread(), 5)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread.unread_count(self.author.id), 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            api_models.Notification.objects.create(user=self.author, post=self.post, type="Comment")
+            self.notifications[0].delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(unread.unread_count(self.author.id), 5)
+
+
+class NotificationCoalescingTests(TestCase):
+    """Engagement on a post folds into one unseen notification per type; old seen ones are compacted."""
+
+    def setUp(self):
+        self.author = make_user("author")
+        self.readers = [make_user(f"reader{i}") for i in range(3)]
+        self.post = make_post(self.author)
+
+    def like(self, reader, liked=True):
+        if liked:
+            self.post.likes.add(reader)
+        else:
+            self.post.likes.remove(reader)
+        tasks.sync_engagement_notification(post_id=self.post.id, actor_id=reader.id, noti_type="Like")
+
+    def test_likes_fold_into_one_unseen_row(self):
+        for reader in self.readers:
+            self.like(reader)
+        self.like(self.readers[0], liked=False)
+        self.like(self.readers[0])
+
+        row = api_models.Notification.objects.get()
+        self.assertEqual(row.actor_count, 3)
+        self.assertEqual([actor["username"] for actor in row.latest_actors], ["reader0", "reader2", "reader1"])
+
+        self.like(self.readers[1], liked=False)
+        row.refresh_from_db()
+        self.assertEqual((row.actor_count, row.actor_id), (2, self.readers[0].id))
+
+        # Once seen, new activity opens a new row
+        api_models.Notification.objects.update(seen=True)
+        self.like(self.readers[1])
+        self.assertEqual(api_models.Notification.objects.filter(seen=False).get().actor_count, 1)
+
+    def test_inbox_puts_the_row_with_the_latest_activity_first(self):
+        self.like(self.readers[0])
+        other = make_post(self.author, category=self.post.category, title="Other")
+        other.likes.add(self.readers[1])
+        tasks.sync_engagement_notification(post_id=other.id, actor_id=self.readers[1].id, noti_type="Like")
+        # Folding a new like into the older row brings it back to the top
+        self.like(self.readers[2])
+
+        client = APIClient()
+        client.force_authenticate(self.author)
+        results = client.get(f"/api/v1/author/dashboard/noti-list/{self.author.id}/").json()["results"]
+        self.assertEqual([row["post"]["id"] for row in results], [self.post.id, other.id])
+
+    def test_compaction_archives_and_deletes_old_seen_rows(self):
+        old = timezone.now() - timedelta(days=200)
+        for reader in self.readers:
+            api_models.Notification.objects.create(user=self.author, actor=reader, post=self.post, type="Comment", seen=True)
+        keep = api_models.Notification.objects.create(user=self.author, post=self.post, type="Like")
+        api_models.Notification.objects.update(updated=old)
+
+        archive = os.path.join(tempfile.mkdtemp(), "notifications.jsonl")
+        self.addCleanup(shutil.rmtree, os.path.dirname(archive), ignore_errors=True)
+        call_command("compact_notifications", "--batch-size", "2", "--archive", archive, stdout=io.StringIO())
+
+        self.assertEqual(list(api_models.Notification.objects.values_list("id", flat=True)), [keep.id])
+        with open(archive, encoding="utf-8") as lines:
+            self.assertEqual([json.loads(line)["type"] for line in lines], ["Comment"] * 3)
+
+
+class DashboardStatsTests(TestCase):
+    """The dashboard totals keep the meaning existing clients rely on."""
+
+    def test_bookmarks_made_and_received_are_separate(self):
+        author = make_user("author")
+        reader = make_user("reader")
+        mine = make_post(author, title="Mine")
+        theirs = make_post(reader, title="Theirs")
+        engagement.toggle_bookmark(theirs.id, author.id)
+        engagement.toggle_bookmark(mine.id, author.id)
+        engagement.toggle_bookmark(mine.id, reader.id)
+        engagement.toggle_bookmark(mine.id, make_user("third").id)
+
+        client = APIClient()
+        client.force_authenticate(author)
+        totals = client.get(f"/api/v1/author/dashboard/stats/{author.id}/").json()[0]
+        self.assertEqual((totals["bookmarks"], totals["bookmarks_received"], totals["posts"]), (2, 3, 1))
+
+    def test_backfill_keeps_recorded_days_and_adds_only_untracked_history(self):
+        author = make_user("writer")
+        category = api_models.Category.objects.create(title="News")
+        post = make_post(author, category=category, title="Old")
+        published = timezone.now() - timedelta(days=5)
+        api_models.Post.objects.filter(id=post.id).update(date=published, views=10, likes_count=2)
+        # What the incremental paths recorded since the rollup went live
+        stats.record_activity(author.id, views=3, likes=1)
+
+        for _ in range(2):
+            call_command("backfill_author_stats", stdout=io.StringIO())
+            rows = {row.date: (row.views, row.likes, row.posts) for row in api_models.AuthorDailyStats.objects.filter(author=author)}
+            self.assertEqual(rows, {timezone.localdate(): (3, 1, 0), timezone.localdate(published): (7, 1, 1)})
+
+
+class CounterMaintenanceTests(TestCase):
+    """Stored totals follow edits and deletes made anywhere, not only through the create paths."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = make_user("author")
+        self.category = api_models.Category.objects.create(title="Tech")
+        self.post = make_post(self.author, category=self.category)
+
+    def comment(self, text, parent=None):
+        self.client.post("/api/v1/post/comment-post/", {
+            "post_id": self.post.id, "name": "reader", "email": "reader@example.com", "comment": text,
+            "parent_id": parent.id if parent else None,
+        }, format="json")
+        return api_models.Comment.objects.latest("id")
+
+    def test_post_edit_keeps_increments_made_during_the_request(self):
+        stale = api_models.Post.objects.get(id=self.post.id)
+
+        def get_object(view):
+            # A like and a view flush land after the edit loaded the post
+            api_models.Post.objects.filter(id=stale.id).update(likes_count=F("likes_count") + 1, views=F("views") + 7)
+            return stale
+
+        self.client.force_authenticate(self.author)
+        with mock.patch.object(api_views.DashboardPostEditAPIView, "get_object", get_object):
+            response = self.client.put(f"/api/v1/author/dashboard/post-detail/{self.author.id}/{self.post.id}/", {
+                "title": "Edited", "category": self.category.id, "post_status": "Active",
+            }, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.title, self.post.likes_count, self.post.views), ("Edited", 1, 7))
+
+    def test_deleting_a_thread_uncounts_every_comment_in_it(self):
+        root = self.comment("root")
+        self.comment("nested", self.comment("reply", root))
+        self.comment("other")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 4)
+
+        root.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        today = api_models.AuthorDailyStats.objects.get(author=self.author, date=timezone.localdate())
+        self.assertEqual(today.comments, 1)
+
+    def test_rows_created_and_deleted_outside_the_views_balance(self):
+        # Admin, shell and fixtures go through the ORM only
+        other = api_models.Category.objects.create(title="Science")
+        post = make_post(self.author, category=self.category, title="Shell")
+        comment = api_models.Comment.objects.create(post=post, name="reader", comment="Hi")
+        self.assertEqual(api_models.Category.objects.get(id=self.category.id).active_post_count, 2)
+        self.assertEqual(api_models.Post.objects.get(id=post.id).comments_count, 1)
+
+        post = api_models.Post.objects.get(id=post.id)  # as the admin form loads it
+        post.category = other
+        post.save()
+        self.assertEqual(api_models.Category.objects.get(id=other.id).active_post_count, 1)
+        post.status = "Draft"
+        post.save(update_fields=["status"])
+        self.assertEqual(api_models.Category.objects.get(id=other.id).active_post_count, 0)
+
+        comment.delete()
+        self.assertEqual(api_models.Post.objects.get(id=post.id).comments_count, 0)
+        post.delete()
+        self.assertEqual(api_models.Category.objects.get(id=self.category.id).active_post_count, 1)
+        self.assertEqual(api_models.Category.objects.get(id=other.id).active_post_count, 0)
+        today = api_models.AuthorDailyStats.objects.get(author=self.author, date=timezone.localdate())
+        self.assertEqual((today.posts, today.comments), (2, 0))
+
+    def test_cascaded_post_delete_uncounts_the_category(self):
+        self.assertEqual(api_models.Category.objects.get(id=self.category.id).active_post_count, 1)
+        self.author.delete()
+        self.assertEqual(api_models.Category.objects.get(id=self.category.id).active_post_count, 0)
+
+
+class EngagementToggleTests(TestCase):
+    """Like/bookmark toggles flip one row with an indexed DELETE or INSERT and keep the counters exact."""
+
+    def setUp(self):
+        self.author = make_user("author")
+        self.reader = make_user("reader")
+        self.post = make_post(self.author)
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_toggles(self):
+        response = self.client.post("/api/v1/post/like-post/", {"post_id": self.post.id}, format="json")
+        self.assertEqual((response.status_code, response.data["likes_count"]), (201, 1))
+        response = self.client.post("/api/v1/post/like-post/", {"post_id": self.post.id}, format="json")
+        self.assertEqual((response.data["liked"], response.data["likes_count"]), (False, 0))
+
+        response = self.client.post("/api/v1/post/bookmark-post/", {"post_id": self.post.id}, format="json")
+        self.assertEqual((response.data["bookmarked"], response.data["bookmarks_count"]), (True, 1))
+        self.assertEqual(api_models.Bookmark.objects.count(), 1)
+
+    def test_losing_the_insert_race_does_not_count_twice(self):
+        engagement.toggle_bookmark(self.post.id, self.reader.id)
+        # As if a concurrent request inserted the row between our DELETE and INSERT
+        with mock.patch.object(engagement, "_remove", return_value=0):
+            bookmarked, delta, count = engagement.toggle_bookmark(self.post.id, self.reader.id)
+        self.assertEqual((bookmarked, delta, count), (True, 0, 1))
+        self.assertEqual(api_models.Bookmark.objects.count(), 1)
+
+
+@skipUnless(connection.vendor == "postgresql", "needs a database with concurrent writers")
+class EngagementConcurrencyTests(TransactionTestCase):
+    """Concurrent double-taps from many users leave the counters equal to the rows."""
+
+    def test_concurrent_toggles(self):
+        author = make_user("author")
+        post = make_post(author)
+        readers = [make_user(f"r{i}") for i in range(8)]
+        barrier = threading.Barrier(len(readers) * 3)
+
+        def tap(user_id):
+            barrier.wait()
+            try:
+                engagement.toggle_like(post.id, user_id)
+                engagement.toggle_bookmark(post.id, user_id)
+            finally:
+                connection.close()
+
+        # Three taps per reader, all at once: each ends up liked or not, never counted twice
+        threads = [threading.Thread(target=tap, args=(reader.id,)) for reader in readers for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        post.refresh_from_db()
+        self.assertEqual(post.likes_count, post.likes.count())
+        self.assertEqual(post.bookmarks_count, api_models.Bookmark.objects.filter(post=post).count())
+        self.assertEqual(api_models.Bookmark.objects.filter(post=post).values("user").distinct().count(), api_models.Bookmark.objects.count())
+
+
+class EngagementRaceTests(TestCase):
+    """
+    The double-tap race EngagementConcurrencyTests provokes with threads, replayed
+    step by step so it runs on SQLite too: the other tap commits its row between
+    this tap's DELETE and its INSERT, and the unique constraint settles it.
+    """
+
+    def setUp(self):
+        author = make_user("author")
+        self.reader = make_user("reader")
+        self.post = make_post(author)
+
+    def race(self, toggle, create, counter):
+        remove = engagement._remove
+
+        def remove_then_lose_the_race(rows):
+            removed = remove(rows)
+            # What the other tap does after finding nothing to remove either
+            create(post_id=self.post.id, user_id=self.reader.id)
+            counters.bump_post(self.post.id, **{counter: 1})
+            return removed
+
+        with mock.patch.object(engagement, "_remove", side_effect=remove_then_lose_the_race):
+            return toggle(self.post.id, self.reader.id)
+
+    def test_like_inserted_by_the_other_tap_is_counted_once(self):
+        Like = api_models.Post.likes.through
+        self.assertEqual(self.race(engagement.toggle_like, Like.objects.create, "likes_count"), (True, 0, 1))
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.likes.count()), (1, 1))
+
+        self.assertEqual(engagement.toggle_like(self.post.id, self.reader.id), (False, -1, 0))
+        self.assertFalse(Like.objects.exists())
+
+    def test_bookmark_inserted_by_the_other_tap_is_counted_once(self):
+        create = api_models.Bookmark.objects.create
+        self.assertEqual(self.race(engagement.toggle_bookmark, create, "bookmarks_count"), (True, 0, 1))
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.bookmarks_count, api_models.Bookmark.objects.count()), (1, 1))
+
+        self.assertEqual(engagement.toggle_bookmark(self.post.id, self.reader.id), (False, -1, 0))
+        self.assertFalse(api_models.Bookmark.objects.exists())
+
+
+class ViewerEngagementTests(TestCase):
+    """The caller's like/bookmark flags come in one batch per page, never through the shared caches."""
+
+    def setUp(self):
+        cache.clear()
+        author = make_user("author")
+        self.reader = make_user("reader")
+        self.posts = [
+            make_post(author, title=f"Post {i}")
+            for i in range(3)
+        ]
+        engagement.toggle_like(self.posts[0].id, self.reader.id)
+        engagement.toggle_bookmark(self.posts[1].id, self.reader.id)
+        self.auth = {"Authorization": f"Bearer {AccessToken.for_user(self.reader)}"}
+        self.expected = {
+            self.posts[0].id: {"liked": True, "bookmarked": False},
+            self.posts[1].id: {"liked": False, "bookmarked": True},
+            self.posts[2].id: {"liked": False, "bookmarked": False},
+        }
+
+    def test_batch_endpoint(self):
+        with self.assertNumQueries(2):
+            engagement.viewer_state(self.reader, [post.id for post in self.posts])
+
+        ids = ",".join(str(post.id) for post in self.posts)
+        response = APIClient().get(f"/api/v1/post/engagement/?ids={ids}", headers=self.auth)
+        self.assertEqual({row["post_id"]: {"liked": row["liked"], "bookmarked": row["bookmarked"]} for row in response.data["results"]}, self.expected)
+
+    def test_feed_expand_viewer_bypasses_shared_caches(self):
+        client = APIClient()
+        client.get("/api/v1/post/lists/")  # warm the shared cache with the anonymous page
+        response = client.get("/api/v1/post/lists/?expand=viewer", headers=self.auth)
+        self.assertEqual({post["id"]: post["viewer"] for post in response.json()["results"]}, self.expected)
+        self.assertNotIn("ETag", response)
+        self.assertNotIn("X-Cache", response)
+
+        request = AsyncRequestFactory().get("/api/v1/post/lists/?expand=viewer", headers=self.auth)
+        response = async_to_sync(async_views.AsyncPostListAPIView.as_view())(request)
+        self.assertEqual({post["id"]: post["viewer"] for post in json.loads(response.content)["results"]}, self.expected)
+
+
+class CommentThreadTests(TestCase):
+    """Comments nest through a materialized path, page lazily per level, and posts embed only a preview."""
+
+    def setUp(self):
+        cache.clear()
+        isolate_view_buffer(self)
+        author = make_user("author")
+        self.post = make_post(author, title="Viral", status="Active")
+        self.client = APIClient()
+
+    def comment(self, text, parent=None):
+        response = self.client.post("/api/v1/post/comment-post/", {
+            "post_id": self.post.id, "name": "reader", "email": "reader@example.com", "comment": text,
+            "parent_id": parent.id if parent else None,
+        }, format="json")
+        self.assertEqual(response.status_code, 201)
+        return api_models.Comment.objects.latest("id")
+
+    def test_threads_and_lazy_pages(self):
+        root = self.comment("root")
+        reply = self.comment("reply", root)
+        nested = self.comment("nested", reply)
+        self.comment("second reply", root)
+        for i in range(4):
+            self.comment(f"top {i}")
+
+        root.refresh_from_db()
+        self.assertEqual((root.reply_count, nested.depth), (2, 2))
+        self.assertEqual(nested.path, f"{root.id:010d}/{reply.id:010d}/{nested.id:010d}/")
+
+        url = f"/api/v1/post/{self.post.id}/comments/"
+        top = self.client.get(url, {"page_size": 3}).json()
+        self.assertEqual([c["comment"] for c in top["results"]], ["top 3", "top 2", "top 1"])
+        self.assertIsNotNone(top["next"])
+        replies = self.client.get(url, {"parent": root.id}).json()["results"]
+        self.assertEqual([(c["comment"], c["reply_count"]) for c in replies], [("reply", 1), ("second reply", 0)])
+        thread = self.client.get(url, {"thread": root.id}).json()["results"]
+        self.assertEqual([c["comment"] for c in thread], ["reply", "nested", "second reply"])
+
+    def test_subtree_is_an_index_range_that_stops_at_the_next_sibling(self):
+        self.assertEqual(comment_threads.subtree_bounds("0000000012/0000000099/"), ("0000000012/0000000099/", "0000000012/0000000100/"))
+        root = self.comment("root")
+        reply = self.comment("reply", root)
+        sibling = self.comment("sibling")
+        self.comment("sibling reply", sibling)
+        self.assertEqual(sibling.path, comment_threads.path_segment(root.id + 2))  # the root's bound, not inside its range
+
+        with CaptureQueriesContext(connection) as queries:
+            thread = self.client.get(f"/api/v1/post/{self.post.id}/comments/", {"thread": root.id}).json()["results"]
+        self.assertEqual([c["id"] for c in thread], [reply.id])
+        self.assertFalse([q for q in queries if " LIKE " in q["sql"]])
+
+    def test_replies_past_max_depth_attach_to_the_deepest_allowed_ancestor(self):
+        with override_settings(COMMENTS={"MAX_DEPTH": 2}):
+            root = self.comment("root")
+            reply = self.comment("reply", root)
+            deep = self.comment("deep", reply)
+        self.assertEqual((deep.parent_id, deep.depth), (root.id, 1))
+
+    def test_feed_and_detail_embed_only_a_preview(self):
+        for i in range(5):
+            self.comment(f"top {i}")
+        self.comment("a reply", api_models.Comment.objects.earliest("id"))
+
+        with override_settings(COMMENTS={"PREVIEW_SIZE": 2}):
+            detail = self.client.get(f"/api/v1/post/detail/{self.post.slug}/").json()
+            cache.clear()
+            feed = self.client.get("/api/v1/post/lists/?expand=comments").json()
+        self.assertEqual([c["comment"] for c in detail["comments"]], ["top 4", "top 3"])
+        self.assertEqual(detail["comments_count"], 6)
+        self.assertEqual(len(feed["results"][0]["comments"]), 2)
+
+
+@override_settings(THROTTLE_POLICIES={
+    "password_reset": [{"key": "ip", "rate": "10/hour"}, {"key": "target", "rate": "2/hour"}],
+    "login": [{"key": "target", "rate": "1/min"}],
+})
+class ThrottleTests(TestCase):
+    """Token buckets reject abusive calls before the view touches the database."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.reader = make_user("reader")
+
+    def test_bucket_refills_at_its_rate(self):
+        self.assertEqual([throttling.take("k", 2, 1.0, now=100) for _ in range(2)], [0, 0])
+        self.assertAlmostEqual(throttling.take("k", 2, 1.0, now=100.25), 0.75)
+        self.assertEqual(throttling.take("k", 2, 1.0, now=101), 0)
+
+    def test_password_reset_is_limited_per_address_before_any_write(self):
+        for _ in range(2):
+            self.assertEqual(self.client.get("/api/v1/user/password-reset/reader@example.com/").status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/v1/user/password-reset/READER@example.com/")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        self.assertEqual(api_models.Job.objects.filter(name="api.tasks.send_password_reset_email").count(), 2)
+        # Another address has its own bucket
+        self.assertEqual(self.client.get("/api/v1/user/password-reset/other@example.com/").status_code, 404)
+
+    def test_login_is_limited_per_account_before_hashing(self):
+        credentials = {"email": "reader@example.com", "password": "wrong"}
+        self.assertEqual(self.client.post("/api/v1/user/token/", credentials, format="json").status_code, 401)
+        with mock.patch("django.contrib.auth.backends.ModelBackend.authenticate") as authenticate, self.assertNumQueries(0):
+            response = self.client.post("/api/v1/user/token/", credentials, format="json")
+        self.assertEqual(response.status_code, 429)
+        authenticate.assert_not_called()
+
+
+class ClaimsAuthenticationTests(TestCase):
+    """Read-only dashboard endpoints take the caller from the token claims instead of the users table."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user("author", full_name="An Author")
+        token = api_serializer.MyTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.token = AccessToken(str(token))
+
+    def test_dashboard_reads_skip_the_user_query(self):
+        api_models.Notification.objects.create(user=self.user, type="Like")
+        self.assertEqual(self.client.get("/api/v1/author/dashboard/noti-unread-count/").json(), {"unread": 1})
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/v1/author/dashboard/noti-unread-count/")
+        self.assertEqual(response.json(), {"unread": 1})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/api/v1/author/dashboard/noti-list/{self.user.id}/")
+        self.assertEqual(len(response.json()["results"]), 1)
+        self.assertFalse([q for q in queries if 'FROM "api_user"' in q["sql"]])
+
+    def test_full_user_is_loaded_once_and_dropped_on_save(self):
+        user = authentication.ClaimsJWTAuthentication().get_user(self.token)
+        self.assertEqual((user.id, user.email, user.full_name), (self.user.id, "author@example.com", "An Author"))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.date_joined, self.user.date_joined)
+        with self.assertNumQueries(0):
+            self.assertEqual(authentication.ClaimsJWTAuthentication().get_user(self.token).instance, self.user)
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            authentication.ClaimsJWTAuthentication().get_user(self.token).instance
+
@@ -0,0 +1,86 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from api.cache import shared_cache
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Read-modify-write of a bucket is atomic within a process; across workers sharing
+# a file or db cache two requests may occasionally both take the last token
+_lock = threading.Lock()
+
+
+def parse_rate(rate):
+    """"10/min" -> (10, 60): that many requests per period, like DRF's rate strings."""
+    count, _, period = rate.partition("/")
+    return int(count), PERIODS[period[0]]
+
+
+def policy(scope):
+    """The rules for a scope from settings.THROTTLE_POLICIES; no rules means unthrottled."""
+    return getattr(settings, "THROTTLE_POLICIES", {}).get(scope, [])
+
+
+def take(key, capacity, per_second, now=None):
+    """
+    Take one token from the bucket at `key`. A bucket holds up to `capacity`
+    tokens and refills at `per_second`; a missing bucket is a full one, so an
+    entry only lives as long as it takes to refill. Returns 0 when a token was
+    taken, else the seconds until the next one.
+    """
+    cache = shared_cache(getattr(settings, "THROTTLE_CACHE", "default"))
+    now = time.time() if now is None else now
+    with _lock:
+        tokens, stamp = cache.get(key) or (capacity, now)
+        tokens = min(capacity, tokens + (now - stamp) * per_second)
+        if tokens < 1:
+            return (1 - tokens) / per_second
+        cache.set(key, (tokens - 1, now), math.ceil(capacity / per_second))
+    return 0
+
+
+class BucketThrottle(BaseThrottle):
+    """
+    Token-bucket throttle driven by settings.THROTTLE_POLICIES[view.throttle_scope].
+    Each rule is {"key": "ip" | "user" | "target", "rate": "10/min", "burst": 5}:
+    a bucket per client IP, per authenticated user, or per whatever the view's
+    throttle_target(request) returns (an email address, a username), refilled at
+    `rate` and holding up to `burst` requests (default: the rate's count).
+    Rules are checked in order and the first empty bucket rejects the request
+    with 429 and Retry-After. Throttles run in APIView.initial(), so a rejected
+    request never reaches the handler's queries, writes or password hashing.
+    """
+
+    def allow_request(self, request, view):
+        self.wait_time = None
+        scope = getattr(view, "throttle_scope", None)
+        for rule in policy(scope):
+            ident = self.identify(rule["key"], request, view)
+            if ident is None:
+                continue
+            count, period = parse_rate(rule["rate"])
+            digest = hashlib.sha1(str(ident).encode()).hexdigest()
+            wait = take(f"throttle:{scope}:{rule['key']}:{digest}", rule.get("burst", count), count / period)
+            if wait:
+                self.wait_time = wait
+                return False
+        return True
+
+    def identify(self, key, request, view):
+        if key == "ip":
+            return self.get_ident(request)
+        if key == "user":
+            return request.user.pk if request.user.is_authenticated else None
+        if key == "target":
+            target = view.throttle_target(request) if hasattr(view, "throttle_target") else None
+            # Case and stray spaces must not buy a fresh bucket for the same address
+            return str(target).strip().lower() if target else None
+        raise ValueError(f"Unknown throttle key {key!r}")
+
+    def wait(self):
+        return self.wait_time
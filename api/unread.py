@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.db import transaction
+
+from api import models as api_models
+from api.cache import shared_cache
+
+
+def _key(user_id):
+    return f"noti:unread:{user_id}"
+
+
+def unread_count(user_id):
+    """
+    The user's unseen notification count, counted once (an index-only COUNT
+    on noti_user_seen_idx) and then kept in the cache by adjust(). Entries
+    expire after UNREAD_COUNT_TIMEOUT seconds, which bounds any drift from
+    races between a recount and a concurrent adjustment.
+    """
+    cache = shared_cache()
+    count = cache.get(_key(user_id))
+    if count is None:
+        count = api_models.Notification.objects.filter(user_id=user_id, seen=False).count()
+        cache.add(_key(user_id), count, getattr(settings, "UNREAD_COUNT_TIMEOUT", 300))
+    return count
+
+
+def adjust(user_id, delta):
+    """Shift the cached count by `delta` once the transaction commits; a missing entry is left to the next read."""
+    def apply():
+        cache = shared_cache()
+        try:
+            count = cache.incr(_key(user_id), delta)
+        except ValueError:
+            return
+        if count < 0:
+            cache.delete(_key(user_id))
+    if delta:
+        transaction.on_commit(apply)
+
+
+def forget(user_id):
+    """Drop the cached count (after changes too irregular to track); the next read recounts."""
+    transaction.on_commit(lambda: shared_cache().delete(_key(user_id)))
@@ -0,0 +1,187 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.utils import timezone
+from PIL import Image
+
+from api import models as api_models
+from api.apps import app_settings
+from api.storage import media_storage_instance
+
+# Leading bytes of the image types accepted for posts
+SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/gif": ".gif", "image/webp": ".webp", "image/avif": ".avif"}
+SNIFF_BYTES = 16
+
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """A chunk that can't be accepted; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+config = app_settings("UPLOADS", {
+    "MAX_SIZE": 20 * 1024 * 1024,
+    "CHUNK_SIZE": 1024 * 1024,
+    "TEMP_DIR": os.path.join(settings.BASE_DIR, "tmp", "uploads"),
+    "EXPIRE_HOURS": 24,
+})
+
+
+def sniff(head):
+    """Content type of an image from its first bytes, or None."""
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:12] in (b"ftypavif", b"ftypavis"):
+        return "image/avif"
+    return None
+
+
+def temp_path(upload):
+    return os.path.join(config("TEMP_DIR"), f"{upload.id}.part")
+
+
+def parse_content_range(header):
+    """`bytes <start>-<end>/<total>` -> (start, end, total), end inclusive; None if malformed."""
+    try:
+        unit, _, spec = header.partition(" ")
+        span, _, total = spec.partition("/")
+        start, _, end = span.partition("-")
+        start, end, total = int(start), int(end), int(total)
+    except ValueError:
+        return None
+    if unit != "bytes" or start < 0 or end < start or end >= total:
+        return None
+    return start, end, total
+
+
+def start_upload(user, filename, size):
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        size = 0
+    if size <= 0:
+        raise UploadError("size must be a positive number of bytes.")
+    if size > config("MAX_SIZE"):
+        raise UploadError(f"Images may be at most {config('MAX_SIZE')} bytes.", status=413)
+    return api_models.Upload.objects.create(user=user, filename=os.path.basename(filename or "upload")[:255], size=size)
+
+
+def write_chunk(upload, content_range, stream):
+    """
+    Append one chunk, read from `stream` in READ_SIZE pieces straight into
+    the upload's temp file. Chunks must arrive in order: a chunk that does
+    not start at the current offset is refused with 409, and the client
+    resumes from the offset reported by GET. The first chunk's leading bytes
+    must be a supported image type (so it must hold at least SNIFF_BYTES).
+    Completes the upload after the last chunk.
+    """
+    if upload.status != "pending":
+        raise UploadError("This upload is already complete.", status=409)
+    parsed = parse_content_range(content_range or "")
+    if parsed is None:
+        raise UploadError("A Content-Range header (bytes start-end/total) is required.")
+    if stream is None:
+        raise UploadError("The chunk body is empty.")
+    start, end, total = parsed
+    if total != upload.size:
+        raise UploadError("Content-Range total does not match the upload size.")
+    if start != upload.received:
+        raise UploadError(f"Expected a chunk starting at byte {upload.received}.", status=409)
+    length = end - start + 1
+    if length > config("CHUNK_SIZE"):
+        raise UploadError(f"Chunks may be at most {config('CHUNK_SIZE')} bytes.", status=413)
+
+    os.makedirs(config("TEMP_DIR"), exist_ok=True)
+    path = temp_path(upload)
+    with open(path, "r+b" if start else "wb") as out:
+        out.seek(start)
+        remaining = length
+        while remaining:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            if out.tell() == 0:
+                upload.content_type = sniff(data[:SNIFF_BYTES])
+                if upload.content_type is None:
+                    raise UploadError("Only JPEG, PNG, GIF, WebP and AVIF images can be uploaded.", status=415)
+            out.write(data)
+            remaining -= len(data)
+        if remaining:
+            # A short body doesn't move the offset; the client resends the chunk
+            out.truncate(start)
+    if remaining:
+        raise UploadError("The chunk body is shorter than its Content-Range.")
+
+    # Conditional on the offset, so of two requests racing with the same chunk only one advances it
+    won = api_models.Upload.objects.filter(id=upload.id, status="pending", received=start).update(
+        received=end + 1, content_type=upload.content_type, updated_at=timezone.now()
+    )
+    if not won:
+        raise UploadError("This chunk was already written by another request.", status=409)
+    upload.received = end + 1
+    if upload.received == upload.size:
+        finish(upload)
+    return upload
+
+
+def finish(upload):
+    """Check the assembled file decodes as an image, then move it into media storage."""
+    path = temp_path(upload)
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception:
+        discard(upload)
+        raise UploadError("The uploaded file is not a valid image.", status=415)
+
+    with open(path, "rb") as source:
+        # Hashed and copied in chunks by the content-addressed storage
+        upload.name = media_storage_instance.save(f"image/{upload.id}{EXTENSIONS[upload.content_type]}", File(source))
+    os.remove(path)
+    upload.status = "complete"
+    upload.save(update_fields=["status", "name", "updated_at"])
+
+
+def discard(upload):
+    try:
+        os.remove(temp_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def completed_upload(user, upload_id):
+    """The user's completed upload with this id; UploadError if there is none. Delete it once attached."""
+    try:
+        upload = api_models.Upload.objects.filter(id=upload_id, user=user, status="complete").first()
+    except ValidationError:  # not a UUID
+        upload = None
+    if upload is None:
+        raise UploadError("Unknown or incomplete upload_id.")
+    return upload
+
+
+def purge_expired():
+    """Drop uploads that were abandoned (or completed but never attached) EXPIRE_HOURS ago."""
+    cutoff = timezone.now() - timedelta(hours=config("EXPIRE_HOURS"))
+    expired = list(api_models.Upload.objects.filter(updated_at__lt=cutoff))
+    for upload in expired:
+        discard(upload)
+    return len(expired)
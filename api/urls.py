@@ -1,5 +1,7 @@
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenRefreshView
+from django.conf import settings
+from api import async_views
 from api import views as api_views
 from django.urls import path
 # from .views import home
@@ -8,6 +10,18 @@ from django.urls import path
 #     path('', home),
 # ]
 
+# Under ASGI the public read endpoints can be served by the async-native views (api/async_views.py)
+if getattr(settings, 'ASYNC_READ_VIEWS', False):
+    CategoryListView = async_views.AsyncCategoryListAPIView
+    PostCategoryListView = async_views.AsyncPostCategoryListAPIView
+    PostListView = async_views.AsyncPostListAPIView
+    PostDetailView = async_views.AsyncPostDetailAPIView
+else:
+    CategoryListView = api_views.CategoryListAPIView
+    PostCategoryListView = api_views.PostCategoryListAPIView
+    PostListView = api_views.PostListAPIView
+    PostDetailView = api_views.PostDetailAPIView
+
 urlpatterns = [
     # Userauths API Endpoints
     path('user/token/', api_views.MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -18,23 +32,32 @@ urlpatterns = [
     path('user/password-change/', api_views.PasswordChangeView.as_view(), name='password_reset'),
 
     # Post Endpoints
-    path('post/category/list/', api_views.CategoryListAPIView.as_view()),
-    path('post/category/posts/<category_slug>/', api_views.PostCategoryListAPIView.as_view()),
-    path('post/lists/', api_views.PostListAPIView.as_view()),
-    path('post/detail/<slug>/', api_views.PostDetailAPIView.as_view()),
+    path('post/category/list/', CategoryListView.as_view()),
+    path('post/category/posts/<category_slug>/', PostCategoryListView.as_view()),
+    path('post/tag/<tag_slug>/', api_views.PostTagListAPIView.as_view()),
+    path('post/tags/', api_views.TagCloudAPIView.as_view()),
+    path('post/lists/', PostListView.as_view()),
+    path('post/detail/<slug>/', PostDetailView.as_view()),
+    path('post/search/', api_views.PostSearchAPIView.as_view()),
     path('post/like-post/', api_views.LikePostAPIView.as_view()),
     path('post/comment-post/', api_views.PostCommentAPIView.as_view()),
+    path('post/<int:post_id>/comments/', api_views.PostCommentListAPIView.as_view()),
     path('post/bookmark-post/', api_views.BookmarkPostAPIView.as_view()),
+    path('post/engagement/', api_views.PostEngagementAPIView.as_view()),
 
     # Dashboard APIS
     path('author/dashboard/stats/<user_id>/', api_views.DashboardStats.as_view()),
+    path('author/dashboard/stats-series/<user_id>/', api_views.DashboardStatsSeries.as_view()),
     path('author/dashboard/post-list/<user_id>/', api_views.DashboardPostLists.as_view()),
     path('author/dashboard/comment-list/', api_views.DashboardCommentLists.as_view()),
     path('author/dashboard/noti-list/<user_id>/', api_views.DashboardNotificationLists.as_view()),
     path('author/dashboard/noti-mark-seen/', api_views.DashboardMarkNotiSeenAPIView.as_view()),
+    path('author/dashboard/noti-unread-count/', api_views.DashboardUnreadCountAPIView.as_view()),
     path('author/dashboard/reply-comment/', api_views.DashboardPostCommentAPIView.as_view()),
     path('author/dashboard/post-create/', api_views.DashboardPostCreateAPIView.as_view()),
     path('author/dashboard/post-detail/<user_id>/<post_id>/', api_views.DashboardPostEditAPIView.as_view()),
+    path('author/dashboard/upload/', api_views.DashboardUploadStartAPIView.as_view()),
+    path('author/dashboard/upload/<uuid:upload_id>/', api_views.DashboardUploadChunkAPIView.as_view()),
 
 
 ]
\ No newline at end of file
@@ -0,0 +1,148 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import connection, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCountBuffer:
+    """
+    Accumulates post views in process memory and writes them out in bulk.
+
+    `record()` is a dict increment under a lock. Pending counts are flushed as
+    one `UPDATE ... SET views = views + n WHERE id IN (...)` per distinct n
+    (plus the authors' daily rollup rows),
+    after a response has been sent once `flush_interval` seconds have passed
+    or `flush_threshold` views are pending, and every `flush_interval`
+    seconds from a background thread, so an idle worker doesn't sit on its
+    views until it exits. Increments are never lost to concurrent
+    read-modify-write, and a detail read no longer writes. What a killed
+    process loses is bounded by the interval.
+    """
+
+    def __init__(self, flush_interval=10, flush_threshold=500, timer=True):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.timer = timer
+        self._pending = Counter()
+        self._total = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def record(self, post_id, count=1):
+        """Buffer `count` views and return how many are pending for the post."""
+        with self._lock:
+            self._pending[post_id] += count
+            self._total += count
+            pending = self._pending[post_id]
+        self.start()
+        return pending
+
+    def pending(self, post_id):
+        with self._lock:
+            return self._pending.get(post_id, 0)
+
+    def drain(self):
+        with self._lock:
+            pending = self._pending
+            self._pending, self._total = Counter(), 0
+            self._last_flush = time.monotonic()
+        return pending
+
+    def flush_due(self):
+        return self._total >= self.flush_threshold or (
+            self._total and time.monotonic() - self._last_flush >= self.flush_interval
+        )
+
+    def flush(self):
+        """Write every pending view to the database. Returns the number of posts touched."""
+        from api import stats
+        from api.models import Post
+
+        pending = self.drain()
+        if not pending:
+            return 0
+
+        by_increment = defaultdict(list)
+        for post_id, count in pending.items():
+            by_increment[count].append(post_id)
+
+        try:
+            with transaction.atomic():
+                for count, post_ids in by_increment.items():
+                    Post.objects.filter(id__in=post_ids).update(views=F("views") + count)
+                stats.record_post_views(pending)
+        except Exception:
+            # Put the views back so the next flush retries them
+            with self._lock:
+                self._pending.update(pending)
+                self._total += sum(pending.values())
+            raise
+        return len(pending)
+
+    def start(self):
+        """Start the flusher thread, once per process (again after a fork), on the first recorded view."""
+        if not self.timer or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="view-count-flush", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            if not self._total:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush buffered post views.")
+            finally:
+                # This thread's own connection; don't hold it open between flushes
+                connection.close()
+
+
+view_buffer = ViewCountBuffer(
+    flush_interval=getattr(settings, "POST_VIEWS_FLUSH_INTERVAL", 10),
+    flush_threshold=getattr(settings, "POST_VIEWS_FLUSH_THRESHOLD", 500),
+    timer=getattr(settings, "POST_VIEWS_FLUSH_TIMER", True),
+)
+
+
+def record_view(post_id):
+    return view_buffer.record(post_id)
+
+
+def flush_views_after_request(sender, **kwargs):
+    # Runs once the response has been handed to the server, off the request's latency path
+    if view_buffer.flush_due():
+        try:
+            view_buffer.flush()
+        except Exception:
+            logger.exception("Failed to flush buffered post views.")
+
+
+def flush_views_at_exit():
+    try:
+        view_buffer.flush()
+    except Exception:
+        logger.exception("Failed to flush buffered post views at exit.")
+
+
+request_finished.connect(flush_views_after_request, dispatch_uid="api.view_counter.flush")
+atexit.register(flush_views_at_exit)
@@ -1,9 +1,7 @@
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse, HttpResponse
-from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified
+from django.views.static import serve as static_serve
 from django.conf import settings
-from django.db.models import Sum
 from rest_framework import status, generics
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
@@ -15,10 +13,32 @@ from drf_yasg.utils import swagger_auto_schema
 
 from rest_framework.decorators import api_view, permission_classes
 
+import os
 import random
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
 from api import serializer as api_serializer
 from api import models as api_models
+from api import comments as comment_threads
+from api import counters
+from api import engagement
+from api import jobs
+from api import search
+from api import stats
+from api import realtime
+from api import tasks
+from api.throttling import BucketThrottle
+from api import unread
+from api import uploads
+from api.authentication import ClaimsUserMixin
+from api.cache import CachedResponseMixin, engagement_tags, invalidate
+from api.conditional import ConditionalGetMixin, make_etag, tag_validators
+from api.engagement import ViewerStateMixin
+from api.prefetch import apply_prefetch_plan
+from api.view_counter import record_view
 from django.shortcuts import get_object_or_404
 
 @api_view(['GET', 'POST', 'PUT', 'PATCH', 'DELETE']) # Allow all methods for flexibility
@@ -37,8 +57,31 @@ def home(request):
     return HttpResponse("Welcome to the blog backend!")
 
 
+def serve_media_blob(request, path):
+    """
+    Serve a content-addressed media blob (api/storage.py). The name is the
+    content digest, so the bytes behind a URL never change: clients and CDNs
+    may cache it for a year without revalidating.
+    """
+    digest = os.path.splitext(os.path.basename(path))[0]
+    etag = f'"{digest}"'
+    if etag in request.headers.get("If-None-Match", ""):
+        response = HttpResponseNotModified()
+    else:
+        response = static_serve(request, path, document_root=settings.MEDIA_ROOT)
+    response["ETag"] = etag
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = api_serializer.MyTokenObtainPairSerializer
+    # Checked before the password is hashed; the target is the account being logged into
+    throttle_classes = [BucketThrottle]
+    throttle_scope = 'login'
+
+    def throttle_target(self, request):
+        return request.data.get(api_models.User.USERNAME_FIELD)
 
 
 class RegisterView(generics.CreateAPIView):
@@ -86,6 +129,12 @@ def generate_numeric_otp(length=7):
 class PasswordEmailVerify(generics.RetrieveAPIView):
     permission_classes = (AllowAny,)
     serializer_class = api_serializer.UserSerializer
+    # Each call writes a token and sends an email, so it is limited per IP and per address
+    throttle_classes = [BucketThrottle]
+    throttle_scope = 'password_reset'
+
+    def throttle_target(self, request):
+        return self.kwargs['email']
 
     def get_object(self):
         email = self.kwargs['email']
@@ -96,7 +145,6 @@ class PasswordEmailVerify(generics.RetrieveAPIView):
             raise NotFound("User with this email does not exist.")
 
         user.otp = generate_numeric_otp()
-        uidb64 = user.pk
 
         refresh = RefreshToken.for_user(user)
         reset_token = str(refresh.access_token)
@@ -104,26 +152,9 @@ class PasswordEmailVerify(generics.RetrieveAPIView):
         user.reset_token = reset_token
         user.save()
 
-        # IMPORTANT: For live app, replace localhost:5173 with your actual frontend domain
-        # This link needs to be accessible from where the user opens the email.
-        link = f"{settings.FRONTEND_URL}/create-new-password?otp={user.otp}&uidb64={uidb64}&reset_token={reset_token}"
-
-        merge_data = {
-            'link': link,
-            'username': user.username,
-        }
-        subject = "Password Reset Request"
-        text_body = render_to_string("email/password_reset.txt", merge_data)
-        html_body = render_to_string("email/password_reset.html", merge_data)
-
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            from_email=settings.FROM_EMAIL,
-            to=[user.email],
-            body=text_body
-        )
-        msg.attach_alternative(html_body, "text/html")
-        msg.send()
+        # Rendering and sending the email happens in the worker (api/tasks.py), off the request path.
+        # The link there points at settings.FRONTEND_URL, which must be reachable from the user's inbox.
+        jobs.enqueue(tasks.send_password_reset_email, user_id=user.id)
 
         return user
 
@@ -164,46 +195,193 @@ class PasswordChangeView(generics.CreateAPIView):
 ######################## Post APIs ########################
 
 
-class CategoryListAPIView(generics.ListAPIView):
+class CategoryListAPIView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     serializer_class = api_serializer.CategorySerializer
     permission_classes = [AllowAny]
+    cursor_ordering = ('id',)
+    cache_tags = ("categories",)
+
+    def get_validators(self):
+        return tag_validators(self.request, self.get_cache_tags())
 
     def get_queryset(self):
         return api_models.Category.objects.all()
 
 
-class PostCategoryListAPIView(generics.ListAPIView):
-    serializer_class = api_serializer.PostSerializer
+class PostCategoryListAPIView(ViewerStateMixin, ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
+    serializer_class = api_serializer.PostListSerializer
     permission_classes = [AllowAny]
+    cache_tags = ("posts", "categories")
+
+    def get_validators(self):
+        return tag_validators(self.request, self.get_cache_tags())
 
     def get_queryset(self):
         category_slug = self.kwargs['category_slug']
         # Use get_object_or_404 for cleaner handling of non-existent category
         category = get_object_or_404(api_models.Category, slug=category_slug)
-        return api_models.Post.objects.filter(category=category, status="Active")
+        posts = api_models.Post.objects.filter(category=category, status="Active")
+        return apply_prefetch_plan(posts, self.get_serializer())
 
 
-class PostListAPIView(generics.ListAPIView):
-    serializer_class = api_serializer.PostSerializer
+class PostTagListAPIView(ViewerStateMixin, ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
+    serializer_class = api_serializer.PostListSerializer
     permission_classes = [AllowAny]
+    cache_tags = ("posts",)
+
+    def get_validators(self):
+        return tag_validators(self.request, self.get_cache_tags())
 
     def get_queryset(self):
-        return api_models.Post.objects.filter(status="Active") # Only show active posts
+        tag = get_object_or_404(api_models.Tag, slug=self.kwargs['tag_slug'])
+        # Resolved through the (tag, post) index on PostTag instead of a LIKE scan over Post.tags
+        posts = api_models.Post.objects.filter(tag_links__tag=tag, status="Active")
+        return apply_prefetch_plan(posts, self.get_serializer())
 
 
-class PostDetailAPIView(generics.RetrieveAPIView):
-    serializer_class = api_serializer.PostSerializer
+class TagCloudAPIView(CachedResponseMixin, generics.ListAPIView):
+    serializer_class = api_serializer.TagSerializer
+    permission_classes = [AllowAny]
+    pagination_class = None
+    cache_tags = ("tags",)
+
+    def get_queryset(self):
+        # post_count is maintained on write (api/tags.py), so the cloud is a plain indexed read
+        limit = self.request.query_params.get('limit', '')
+        limit = min(int(limit), 500) if limit.isdigit() and int(limit) > 0 else 100
+        return api_models.Tag.objects.filter(post_count__gt=0).order_by('-post_count', 'name')[:limit]
+
+
+class PostListAPIView(ViewerStateMixin, ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
+    serializer_class = api_serializer.PostListSerializer
+    permission_classes = [AllowAny]
+    cache_tags = ("posts",)
+
+    def get_validators(self):
+        return tag_validators(self.request, self.get_cache_tags())
+
+    def get_queryset(self):
+        # Only show active posts; KeysetCursorPagination orders by ('-date', '-id')
+        posts = api_models.Post.objects.filter(status="Active")
+        return apply_prefetch_plan(posts, self.get_serializer())
+
+
+class PostDetailAPIView(ViewerStateMixin, ConditionalGetMixin, CachedResponseMixin, generics.RetrieveAPIView):
+    serializer_class = api_serializer.PostDetailSerializer
     permission_classes = [AllowAny]
 
+    def get_cache_tags(self):
+        return (f"post:{self.kwargs['slug']}",)
+
+    def get_validators(self):
+        # `updated_at` moves on edits and on every like/comment/bookmark counter update.
+        # The view count is deliberately left out, or no read could ever be a 304.
+        self.validator_row = api_models.Post.objects.filter(
+            slug=self.kwargs['slug'], status="Active"
+        ).values('id', 'updated_at').first()
+        if self.validator_row is None:
+            return None, None # Let the normal path answer 404
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        etag = make_etag(self.request.get_full_path(), getattr(renderer, 'format', ''), *self.validator_row.values())
+        return etag, self.validator_row['updated_at']
+
+    def not_modified(self):
+        record_view(self.validator_row['id'])
+
+    def cache_hit(self, meta):
+        # A cached read is still a read
+        record_view(meta["post_id"])
+
     def get_object(self):
         slug = self.kwargs['slug']
         # Use get_object_or_404 for cleaner handling
-        post = get_object_or_404(api_models.Post, slug=slug, status="Active")
-        post.views += 1
-        post.save()
+        posts = apply_prefetch_plan(api_models.Post.objects.all(), self.get_serializer())
+        post = get_object_or_404(posts, slug=slug, status="Active")
+        # Views are buffered and flushed in bulk (api/view_counter.py); show the pending ones too
+        post.views += record_view(post.id)
+        self.cache_meta = {"post_id": post.id}
         return post
 
 
+class PostCommentListAPIView(CachedResponseMixin, generics.ListAPIView):
+    """
+    A post's comments, a page at a time. Without parameters: its top-level
+    comments, newest first, each with its `reply_count`. With ?parent=<id>:
+    that comment's direct replies, oldest first. With ?thread=<id>: the
+    comment's whole subtree in reading order (by materialized path).
+    """
+    serializer_class = api_serializer.CommentThreadSerializer
+    permission_classes = [AllowAny]
+
+    def get_cache_tags(self):
+        return (f"comments:{self.kwargs['post_id']}",)
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('parent', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="List the direct replies of this comment"),
+            openapi.Parameter('thread', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="List the whole subtree under this comment"),
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        post = get_object_or_404(api_models.Post.objects.only("id"), id=self.kwargs['post_id'], status="Active")
+        comments = api_models.Comment.objects.filter(post=post)
+        parent_id = self.request.query_params.get('parent')
+        thread_id = self.request.query_params.get('thread')
+
+        if thread_id:
+            root = generics.get_object_or_404(comments.only("path"), id=thread_id)
+            self.cursor_ordering = ('path',)
+            low, high = comment_threads.subtree_bounds(root.path)
+            comments = comments.filter(path__gt=low, path__lt=high)
+        elif parent_id:
+            generics.get_object_or_404(comments.only("id"), id=parent_id)
+            self.cursor_ordering = ('date', 'id')
+            comments = comments.filter(parent_id=parent_id)
+        else:
+            self.cursor_ordering = ('-date', '-id')
+            comments = comments.filter(parent__isnull=True)
+        return apply_prefetch_plan(comments, self.get_serializer())
+
+
+class PostSearchAPIView(ViewerStateMixin, generics.ListAPIView):
+    serializer_class = api_serializer.PostSearchResultSerializer
+    permission_classes = [AllowAny]
+    pagination_class = None # Ranked results: the client asks for the top `limit`
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True, description="Search terms"),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Number of results (default 20)"),
+        ],
+    )
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"message": "Query parameter 'q' is required."}, status=status.HTTP_400_BAD_REQUEST)
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        try:
+            limit = min(int(self.request.query_params.get('limit', 20)), settings.API_MAX_PAGE_SIZE)
+        except ValueError:
+            limit = 20
+        hits = search.search_posts(self.request.query_params['q'].strip(), max(limit, 1))
+
+        posts = apply_prefetch_plan(api_models.Post.objects.filter(id__in=[hit[0] for hit in hits]), self.get_serializer())
+        posts_by_id = {post.id: post for post in posts}
+        results = []
+        for post_id, rank, snippet in hits:
+            post = posts_by_id.get(post_id)
+            if post is not None:
+                post.search_rank = rank
+                post.search_snippet = snippet
+                results.append(post)
+        return results
+
+
 class LikePostAPIView(APIView):
     permission_classes = [IsAuthenticated] # Only authenticated users can like/unlike
 
@@ -232,42 +410,60 @@ class LikePostAPIView(APIView):
             return Response({"message": "Post ID is required."}, status=status.HTTP_400_BAD_REQUEST)
 
         # Use get_object_or_404 for cleaner error handling if post doesn't exist
-        post = get_object_or_404(api_models.Post, id=post_id)
+        post = get_object_or_404(api_models.Post.objects.only("id", "slug", "user_id"), id=post_id)
+
+        liked, delta, likes_count = engagement.toggle_like(post.id, user.id)
+        if delta:
+            stats.record_activity(post.user_id, likes=delta)
+            invalidate(*engagement_tags(post))
+            # The notification (created on like, removed on unlike) is written by the worker
+            if user.id != post.user_id:
+                jobs.enqueue(tasks.sync_engagement_notification, post_id=post.id, actor_id=user.id, noti_type="Like")
 
-        liked = False
-        if user in post.likes.all():
-            post.likes.remove(user)
-            # Delete notification if the user unlikes the post
-            api_models.Notification.objects.filter(
-                user=post.user,
-                post=post,
-                type="Like",
-                actor=user # Assuming you add an 'actor' field to Notification model to track who did the action
-            ).delete()
-            message = "Post Disliked"
-        else:
-            post.likes.add(user)
-            liked = True
-            message = "Post Liked"
-            # Create notification only if the post author is not the one liking their own post
-            if user != post.user:
-                api_models.Notification.objects.create(
-                    user=post.user,
-                    post=post,
-                    type="Like",
-                    actor=user # Add 'actor' to track who liked it
-                )
-        
         # Return current like status and count for frontend to update UI
         return Response({
-            "message": message,
+            "message": "Post Liked" if liked else "Post Disliked",
             "liked": liked,
-            "likes_count": post.likes.count()
+            "likes_count": likes_count,
         }, status=status.HTTP_200_OK if not liked else status.HTTP_201_CREATED)
 
 
+class PostEngagementAPIView(APIView):
+    """
+    The caller's like/bookmark state for a page of posts, so a feed can show
+    its badges without downloading the likers: two indexed queries, whatever
+    the number of likes. GET post/engagement/?ids=1,2,3
+    """
+    permission_classes = [IsAuthenticated]
+    max_ids = 100
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('ids', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True, description="Comma-separated post ids (at most 100)"),
+        ],
+    )
+    def get(self, request):
+        try:
+            ids = list(dict.fromkeys(int(item) for item in request.query_params.get('ids', '').split(',') if item.strip()))
+        except ValueError:
+            return Response({"message": "ids must be comma-separated integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if not ids or len(ids) > self.max_ids:
+            return Response({"message": f"Pass between 1 and {self.max_ids} post ids."}, status=status.HTTP_400_BAD_REQUEST)
+
+        state = engagement.viewer_state(request.user, ids)
+        response = Response({"results": [{"post_id": post_id, **state[post_id]} for post_id in ids]})
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+
 class PostCommentAPIView(APIView):
     permission_classes = [AllowAny] # Keeping AllowAny for comments as per previous. If users must be logged in to comment, change to IsAuthenticated
+    throttle_classes = [BucketThrottle]
+    throttle_scope = 'comment'
+
+    def throttle_target(self, request):
+        return request.data.get('email') # Anonymous commenters are known by their email
+
     @swagger_auto_schema(
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
@@ -277,6 +473,7 @@ class PostCommentAPIView(APIView):
                 'email': openapi.Schema(type=openapi.TYPE_STRING),
                 'comment': openapi.Schema(type=openapi.TYPE_STRING),
                 'user_id': openapi.Schema(type=openapi.TYPE_INTEGER, description="Optional: ID of the authenticated user if commenting as registered user"),
+                'parent_id': openapi.Schema(type=openapi.TYPE_INTEGER, description="Optional: ID of the comment being replied to"),
             },
         ),
     )
@@ -286,6 +483,7 @@ class PostCommentAPIView(APIView):
         email = request.data.get('email')
         comment_text = request.data.get('comment') # Renamed to avoid conflict with model field name
         user_id = request.data.get('user_id') # Optional user ID for comments
+        parent_id = request.data.get('parent_id') # Optional: the comment this one replies to
 
         if not all([post_id, name, email, comment_text]):
             return Response({"message": "Missing fields in request."}, status=status.HTTP_400_BAD_REQUEST)
@@ -300,20 +498,21 @@ class PostCommentAPIView(APIView):
             # For now, it's just an optional field to link the comment to a user.
 
 
+        parent = None
+        if parent_id:
+            parent = generics.get_object_or_404(api_models.Comment.objects.all(), id=parent_id, post=post)
+
+        # Counted on the post and in its author's rollup by the post_save signal (api/counters.py)
         api_models.Comment.objects.create(
             post=post,
+            parent=parent, # Depth and path are filled in by api/comments.py
             user=user_instance, # Link the user if provided
             name=name,
             email=email,
             comment=comment_text,
         )
 
-        api_models.Notification.objects.create(
-            user=post.user, # The author of the post
-            post=post,
-            type="Comment",
-            actor=user_instance # The user who commented
-        )
+        jobs.enqueue(tasks.notify_comment, post_id=post.id, actor_id=user_instance.id if user_instance else None)
 
         return Response({"message": "Comment Sent"}, status=status.HTTP_201_CREATED)
 
@@ -344,35 +543,22 @@ class BookmarkPostAPIView(APIView):
         if not post_id:
             return Response({"message": "Post ID is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        post = get_object_or_404(api_models.Post, id=post_id)
+        post = get_object_or_404(api_models.Post.objects.only("id", "slug", "user_id"), id=post_id)
 
-        bookmark = api_models.Bookmark.objects.filter(post=post, user=user).first()
-        if bookmark:
-            bookmark.delete()
-            # Delete notification for bookmark
-            api_models.Notification.objects.filter(
-                user=post.user,
-                post=post,
-                type="Bookmark",
-                actor=user
-            ).delete()
-            return Response({"message": "Post Un-Bookmarked", "bookmarked": False}, status=status.HTTP_200_OK)
-        else:
-            api_models.Bookmark.objects.create(user=user, post=post)
-            # Create notification only if the post author is not the one bookmarking their own post
-            if user != post.user:
-                api_models.Notification.objects.create(
-                    user=post.user,
-                    post=post,
-                    type="Bookmark",
-                    actor=user
-                )
-            return Response({"message": "Post Bookmarked", "bookmarked": True}, status=status.HTTP_201_CREATED)
+        bookmarked, delta, bookmarks_count = engagement.toggle_bookmark(post.id, user.id)
+        if delta:
+            stats.record_activity(post.user_id, bookmarks=delta)
+            invalidate(*engagement_tags(post))
+            if user.id != post.user_id:
+                jobs.enqueue(tasks.sync_engagement_notification, post_id=post.id, actor_id=user.id, noti_type="Bookmark")
+        if bookmarked:
+            return Response({"message": "Post Bookmarked", "bookmarked": True, "bookmarks_count": bookmarks_count}, status=status.HTTP_201_CREATED)
+        return Response({"message": "Post Un-Bookmarked", "bookmarked": False, "bookmarks_count": bookmarks_count}, status=status.HTTP_200_OK)
 
 
 ######################## Author Dashboard APIs ########################
 
-class DashboardStats(generics.ListAPIView):
+class DashboardStats(ClaimsUserMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated] # Dashboard stats should be for authenticated users only
     serializer_class = api_serializer.AuthorStats
 
@@ -389,18 +575,8 @@ class DashboardStats(generics.ListAPIView):
         # user = get_object_or_404(api_models.User, id=user_id_from_url)
         # However, for 'DashboardStats', it usually implies the logged-in user's stats.
         
-        posts = api_models.Post.objects.filter(user=user)
-        views = posts.aggregate(view_count=Sum("views"))['view_count'] or 0
-        posts_count = posts.count()
-        likes = sum(post.likes.count() for post in posts)
-        bookmarks = api_models.Bookmark.objects.filter(user=user).count()
-
-        return [{
-            "views": views,
-            "posts": posts_count,
-            "likes": likes,
-            "bookmarks": bookmarks,
-        }]
+        # One conditional-aggregation query over the author's posts (api/stats.py)
+        return [stats.author_totals(user.id)]
 
     def list(self, request, *args, **kwargs):
         # No need for user_id in URL for this if it's for the authenticated user's dashboard
@@ -414,58 +590,132 @@ class DashboardStats(generics.ListAPIView):
         return Response(serializer.data)
 
 
-class DashboardPostLists(generics.ListAPIView):
+class DashboardStatsSeries(ClaimsUserMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    max_days = 366
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('start', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, description="First day (default: 29 days before end)"),
+            openapi.Parameter('end', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE, description="Last day (default: today)"),
+        ],
+        responses={200: api_serializer.AuthorStatsPoint(many=True)},
+    )
+    def get(self, request, *args, **kwargs):
+        try:
+            end = parse_date(request.query_params.get('end', '')) or timezone.now().date()
+            start = parse_date(request.query_params.get('start', '')) or end - timedelta(days=29)
+        except ValueError:
+            return Response({"message": "Dates must be YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if start > end or (end - start).days >= self.max_days:
+            return Response({"message": f"Range must be between 1 and {self.max_days} days."}, status=status.HTTP_400_BAD_REQUEST)
+
+        series = stats.author_series(request.user.id, start, end)
+        return Response(api_serializer.AuthorStatsPoint(series, many=True).data)
+
+
+class DashboardPostLists(ClaimsUserMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated] # Should be for authenticated user
     serializer_class = api_serializer.PostSerializer
+    cursor_ordering = ('-id',)
+    pagination_include_count = True # Per-author lists are small, the total is cheap here
 
     def get_queryset(self):
         # Again, use request.user instead of URL user_id for authenticated user's dashboard
-        user = self.request.user
-        return api_models.Post.objects.filter(user=user).order_by("-id")
+        # request.user is built from the token claims (ClaimsUserMixin): filter on its id
+        posts = api_models.Post.objects.filter(user_id=self.request.user.id).order_by("-id")
+        return apply_prefetch_plan(posts, self.get_serializer())
 
 
-class DashboardCommentLists(generics.ListAPIView):
+class DashboardCommentLists(ClaimsUserMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated] # Comments on authenticated user's posts
     serializer_class = api_serializer.CommentSerializer
+    cursor_ordering = ('-id',)
+    pagination_include_count = True
 
     def get_queryset(self):
         # Fetch comments on posts authored by the authenticated user
-        user = self.request.user
-        return api_models.Comment.objects.filter(post__user=user).order_by("-id")
+        comments = api_models.Comment.objects.filter(post__user_id=self.request.user.id).order_by("-id")
+        return apply_prefetch_plan(comments, self.get_serializer())
 
 
-class DashboardNotificationLists(generics.ListAPIView):
+class DashboardNotificationLists(ClaimsUserMixin, generics.ListAPIView):
     permission_classes = [IsAuthenticated] # Notifications for authenticated user
     serializer_class = api_serializer.NotificationSerializer
+    # Latest activity first: a coalesced row that took in a new actor keeps its id but moves to the top
+    cursor_ordering = ('-updated', '-id')
+    pagination_include_count = True
 
     def get_queryset(self):
-        user = self.request.user
-        return api_models.Notification.objects.filter(seen=False, user=user).order_by("-id")
+        notifications = api_models.Notification.objects.filter(seen=False, user_id=self.request.user.id).order_by("-updated", "-id")
+        return apply_prefetch_plan(notifications, self.get_serializer())
 
 
 class DashboardMarkNotiSeenAPIView(APIView):
+    """
+    Mark the authenticated user's notifications as seen, with one UPDATE:
+    a single `noti_id`, a list of `ids`, everything up to and including
+    `before` (the newest id the client has shown), or `all`.
+    """
     permission_classes = [IsAuthenticated] # Mark notification seen for authenticated user
+    max_ids = 500
+
     @swagger_auto_schema(
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
                 'noti_id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                'ids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                'before': openapi.Schema(type=openapi.TYPE_INTEGER, description="Mark every notification with id <= before"),
+                'all': openapi.Schema(type=openapi.TYPE_BOOLEAN),
             },
         ),
     )
     def post(self, request):
         noti_id = request.data.get('noti_id')
+        ids = request.data.get('ids')
+        before = request.data.get('before')
+        mark_all = request.data.get('all') in (True, "true", "1")
         user = request.user # Authenticated user
 
-        if not noti_id:
-            return Response({"message": "Missing notification ID."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Ensure the notification belongs to the authenticated user
-        noti = get_object_or_404(api_models.Notification, id=noti_id, user=user)
-
-        noti.seen = True
-        noti.save()
-        return Response({"message": "Notification marked as seen."}, status=status.HTTP_200_OK)
+        # Only the user's own, still unseen notifications; the row count is exactly how many became seen
+        notifications = api_models.Notification.objects.filter(user=user, seen=False)
+        try:
+            if noti_id:
+                noti_id = int(noti_id)
+                notifications = notifications.filter(id=noti_id)
+            elif ids:
+                if not isinstance(ids, list) or len(ids) > self.max_ids:
+                    return Response({"message": f"ids must be a list of at most {self.max_ids} ids."}, status=status.HTTP_400_BAD_REQUEST)
+                ids = [int(i) for i in ids]
+                notifications = notifications.filter(id__in=ids)
+            elif before:
+                before = int(before)
+                notifications = notifications.filter(id__lte=before)
+            elif not mark_all:
+                return Response({"message": "Missing notification ID."}, status=status.HTTP_400_BAD_REQUEST)
+        except (TypeError, ValueError):
+            return Response({"message": "Notification ids must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        updated = notifications.update(seen=True)
+        if noti_id and not updated and not api_models.Notification.objects.filter(id=noti_id, user=user).exists():
+            return Response({"message": "Notification not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        unread.adjust(user.id, -updated)
+        if updated:
+            realtime.push_seen(user.id, ids=[noti_id] if noti_id else ids or None, before=before or None)
+        return Response({"message": "Notification marked as seen.", "updated": updated}, status=status.HTTP_200_OK)
+
+
+class DashboardUnreadCountAPIView(ClaimsUserMixin, APIView):
+    """The notification badge: how many of the user's notifications are unseen, from the cache."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        response = Response({"unread": unread.unread_count(request.user.id)})
+        response["Cache-Control"] = "private, no-cache"
+        return response
 
 
 class DashboardPostCommentAPIView(APIView):
@@ -492,6 +742,7 @@ class DashboardPostCommentAPIView(APIView):
 
         comment.reply = reply
         comment.save()
+        counters.touch_post(comment.post_id)
 
         return Response({"message": "Comment response sent."}, status=status.HTTP_201_CREATED)
 
@@ -505,6 +756,7 @@ class DashboardPostCreateAPIView(generics.CreateAPIView):
         user = request.user 
         title = request.data.get('title')
         image = request.data.get('image')
+        upload_id = request.data.get('upload_id')
         description = request.data.get('description')
         tags = request.data.get('tags')
         category_id = request.data.get('category')
@@ -516,6 +768,15 @@ class DashboardPostCreateAPIView(generics.CreateAPIView):
         # Category is still needed from request data
         category = get_object_or_404(api_models.Category, id=category_id)
 
+        # An image sent through the chunked upload API (preferred for large files)
+        upload = None
+        if upload_id:
+            try:
+                upload = uploads.completed_upload(user, upload_id)
+            except uploads.UploadError as error:
+                return Response({"message": error.message}, status=error.status)
+            image = upload.name
+
         post = api_models.Post.objects.create(
             user=user, # Assign the authenticated user
             title=title,
@@ -525,6 +786,8 @@ class DashboardPostCreateAPIView(generics.CreateAPIView):
             category=category,
             status=post_status
         )
+        if upload is not None:
+            upload.delete() # Category and author totals follow in the post_save signal
         # Return serialized post data, not just a message
         serializer = self.get_serializer(post)
         return Response({"message": "Post created successfully.", "post": serializer.data}, status=status.HTTP_201_CREATED)
@@ -540,7 +803,8 @@ class DashboardPostEditAPIView(generics.RetrieveUpdateDestroyAPIView):
         user = self.request.user # Authenticated user
 
         # Ensure the post belongs to the authenticated user
-        post = get_object_or_404(api_models.Post, user=user, id=post_id)
+        posts = apply_prefetch_plan(api_models.Post.objects.all(), self.get_serializer())
+        post = get_object_or_404(posts, user=user, id=post_id)
         return post
 
     def update(self, request, *args, **kwargs):
@@ -548,6 +812,7 @@ class DashboardPostEditAPIView(generics.RetrieveUpdateDestroyAPIView):
 
         title = request.data.get('title')
         image = request.data.get('image')
+        upload_id = request.data.get('upload_id')
         description = request.data.get('description')
         tags = request.data.get('tags')
         category_id = request.data.get('category')
@@ -558,6 +823,14 @@ class DashboardPostEditAPIView(generics.RetrieveUpdateDestroyAPIView):
 
         category = get_object_or_404(api_models.Category, id=category_id)
 
+        upload = None
+        if upload_id:
+            try:
+                upload = uploads.completed_upload(request.user, upload_id)
+            except uploads.UploadError as error:
+                return Response({"message": error.message}, status=error.status)
+            image = upload.name
+
         post_instance.title = title
         if image != "undefined" and image is not None:
             post_instance.image = image
@@ -565,7 +838,11 @@ class DashboardPostEditAPIView(generics.RetrieveUpdateDestroyAPIView):
         post_instance.tags = tags
         post_instance.category = category
         post_instance.status = post_status
-        post_instance.save()
+        # Only what was edited: the counters and views on this instance were read at the start of the
+        # request, and writing them back would undo increments made since (api/counters.py)
+        post_instance.save(update_fields=["title", "image", "description", "tags", "category", "status", "slug", "updated_at"])
+        if upload is not None:
+            upload.delete() # Category totals follow in the post_save signal
         
         # Return serialized updated post data
         serializer = self.get_serializer(post_instance)
@@ -573,9 +850,70 @@ class DashboardPostEditAPIView(generics.RetrieveUpdateDestroyAPIView):
 
     def destroy(self, request, *args, **kwargs):
         post_instance = self.get_object() # get_object_or_404 handles user/post existence and ownership
-        post_instance.delete()
+        post_instance.delete() # Category totals follow in the post_delete signal
         return Response({"message": "Post deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
+class DashboardUploadStartAPIView(APIView):
+    """
+    Start a resumable image upload. The file is then sent in order with
+    PUT author/dashboard/upload/<upload_id>/ and a Content-Range header per
+    chunk; the completed upload_id is passed to post-create/post-detail.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'filename': openapi.Schema(type=openapi.TYPE_STRING),
+                'size': openapi.Schema(type=openapi.TYPE_INTEGER, description="Total file size in bytes"),
+            },
+        ),
+    )
+    def post(self, request):
+        try:
+            upload = uploads.start_upload(request.user, request.data.get('filename'), request.data.get('size'))
+        except uploads.UploadError as error:
+            return Response({"message": error.message}, status=error.status)
+        return Response(
+            {"upload_id": str(upload.id), "offset": 0, "chunk_size": uploads.config("CHUNK_SIZE")},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class DashboardUploadChunkAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_upload(self):
+        return get_object_or_404(api_models.Upload, id=self.kwargs['upload_id'], user=self.request.user)
+
+    def describe(self, upload):
+        return {"upload_id": str(upload.id), "offset": upload.received, "size": upload.size, "status": upload.status}
+
+    def get(self, request, upload_id):
+        # Where to resume after a dropped connection
+        return Response(self.describe(self.get_upload()))
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter('Content-Range', openapi.IN_HEADER, type=openapi.TYPE_STRING, required=True, description="bytes <start>-<end>/<total>"),
+        ],
+    )
+    def put(self, request, upload_id):
+        # The raw body is read straight from the socket in small pieces (never request.data),
+        # so a chunk is never held in memory or spooled by Django's upload handlers
+        upload = self.get_upload()
+        try:
+            uploads.write_chunk(upload, request.headers.get('Content-Range'), request.stream)
+        except uploads.UploadError as error:
+            return Response({"message": error.message, **self.describe(upload)}, status=error.status)
+        return Response(self.describe(upload))
+
+    def delete(self, request, upload_id):
+        uploads.discard(self.get_upload())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 # --- Add this new serializer in api/serializer.py ---
 # class LikePostResponseSerializer(serializers.Serializer):
 #     message = serializers.CharField()
@@ -9,8 +9,29 @@ https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 
 import os
 
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
-application = get_asgi_application()
\ No newline at end of file
+# Set up Django before importing anything that touches models
+django_asgi_app = get_asgi_application()
+
+from api import jobs, realtime  # noqa: E402
+from api.consumers import JWTQueryStringAuthMiddleware  # noqa: E402
+from api.routing import websocket_urlpatterns  # noqa: E402
+
+# Notifications are written by run_worker unless jobs run eagerly, and gunicorn forks
+# WEB_CONCURRENCY of these processes: either way pushes cross process boundaries
+if not jobs.config("EAGER"):
+    realtime.require_shared_layer("Notifications are created by the job worker")
+elif int(os.environ.get("WEB_CONCURRENCY", 1)) > 1:
+    realtime.require_shared_layer("WEB_CONCURRENCY runs several ASGI processes")
+
+application = ProtocolTypeRouter({
+    "http": django_asgi_app,
+    "websocket": AllowedHostsOriginValidator(
+        JWTQueryStringAuthMiddleware(URLRouter(websocket_urlpatterns))
+    ),
+})
\ No newline at end of file
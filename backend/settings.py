@@ -58,6 +58,7 @@ INSTALLED_APPS = [
     'anymail',
     'storages',
     'django_ckeditor_5',
+    'channels',
 ]
 
 MIDDLEWARE = [
@@ -92,6 +93,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'
+ASGI_APPLICATION = 'backend.asgi.application'
 
 
 # Database configuration
@@ -145,11 +147,161 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Uploads are stored once per content digest and shared between rows (api/storage.py).
+# Don't add django-cleanup: it would delete a shared file when one of its users changes.
 
 AUTH_USER_MODEL = 'api.User'
 
+# Django Rest Framework config
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ),
+    # Keyset pagination: every list endpoint returns {next, previous, results}
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetCursorPagination',
+    'PAGE_SIZE': env.int("API_PAGE_SIZE", default=20),
+    # Proxies in front of the app (1 on Render); throttles then key on the real client IP
+    # from X-Forwarded-For instead of a header the client could vary per request
+    'NUM_PROXIES': env.int("NUM_PROXIES", default=None),
+}
+API_MAX_PAGE_SIZE = env.int("API_MAX_PAGE_SIZE", default=100)
+
+# Token-bucket throttles (api/throttling.py) for the endpoints that write, send email or hash
+# passwords on anonymous requests. Per view scope, rules are checked in order: a bucket per
+# "ip", per authenticated "user", or per "target" (the email / account the request is about),
+# refilled at "rate" and holding up to "burst" requests. Buckets live in THROTTLE_CACHE.
+THROTTLE_CACHE = "default"
+THROTTLE_POLICIES = {
+    "comment": [
+        {"key": "ip", "rate": env.str("THROTTLE_COMMENT_IP", default="30/hour"), "burst": 10},
+        {"key": "user", "rate": "30/hour", "burst": 10},
+        {"key": "target", "rate": "20/hour", "burst": 10},
+    ],
+    "password_reset": [
+        {"key": "ip", "rate": env.str("THROTTLE_PASSWORD_RESET_IP", default="10/hour"), "burst": 5},
+        {"key": "target", "rate": "3/hour", "burst": 3},
+    ],
+    "login": [
+        {"key": "ip", "rate": env.str("THROTTLE_LOGIN_IP", default="60/hour"), "burst": 20},
+        {"key": "target", "rate": "10/hour", "burst": 5},
+    ],
+}
+
+# Serve the public read endpoints with the async-native views (api/async_views.py).
+# Only worth it under an ASGI server (see render.asgi.yaml); under WSGI every async view
+# gets its own event loop per request.
+ASYNC_READ_VIEWS = env.bool("ASYNC_READ_VIEWS", default=False)
+
+# Cache backend. "locmem" is per process; "file" and "db" are shared between workers
+# without any external service ("db" needs `manage.py createcachetable`). run_worker
+# refuses "locmem" (api/cache.py shared_cache).
+CACHE_BACKEND = env.str("CACHE_BACKEND", default="locmem")
+CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "blog-backend",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": env.str("CACHE_LOCATION", default=os.path.join(BASE_DIR, ".cache")),
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    },
+    "db": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "api_cache",
+        "OPTIONS": {"MAX_ENTRIES": 20000},
+    },
+}
+CACHES = {
+    "default": CACHE_BACKENDS[CACHE_BACKEND],
+}
+
+# Rendered responses of the public read endpoints (api/cache.py); TIMEOUT = 0 disables it
+RESPONSE_CACHE = {
+    "ALIAS": "default",
+    "TIMEOUT": env.int("RESPONSE_CACHE_TIMEOUT", default=60),
+}
+
+# Post views are buffered in memory and written as `views = views + n` bulk updates
+POST_VIEWS_FLUSH_INTERVAL = env.int("POST_VIEWS_FLUSH_INTERVAL", default=10)  # seconds
+POST_VIEWS_FLUSH_THRESHOLD = env.int("POST_VIEWS_FLUSH_THRESHOLD", default=500)  # pending views
+# Also flush every interval from a background thread, so idle workers write their views too
+POST_VIEWS_FLUSH_TIMER = env.bool("POST_VIEWS_FLUSH_TIMER", default=True)
+
+# Cached unread-notification badge counts (api/unread.py), adjusted in place and recounted after this
+UNREAD_COUNT_TIMEOUT = env.int("UNREAD_COUNT_TIMEOUT", default=300)  # seconds
+
+# Read-only dashboard endpoints authenticate from the access-token claims (api/authentication.py);
+# when a view needs the full User it is loaded once and cached for this long (and dropped on save)
+CLAIMS_USER_CACHE_TIMEOUT = env.int("CLAIMS_USER_CACHE_TIMEOUT", default=60)  # seconds
+
+# Likes, comments and bookmarks on a post fold into one unseen notification per recipient
+# and type ("12 people liked your post"), see api/notifications.py
+NOTIFICATION_COALESCE = {
+    "ENABLED": env.bool("NOTIFICATION_COALESCE", default=True),
+    "TYPES": ["Like", "Comment", "Bookmark"],
+    "LATEST_ACTORS": 10,  # most recent actors kept on a row
+}
+# Seen notifications older than this are removed by `manage.py compact_notifications`
+NOTIFICATION_RETENTION_DAYS = env.int("NOTIFICATION_RETENTION_DAYS", default=90)
+
+# Threaded comments: feed and detail payloads embed only the newest PREVIEW_SIZE top-level
+# comments; the rest are paged from /api/v1/post/<id>/comments/
+COMMENTS = {
+    "PREVIEW_SIZE": env.int("COMMENT_PREVIEW_SIZE", default=3),
+    "MAX_DEPTH": 8,  # levels; replies past it are attached to the deepest allowed ancestor
+}
+
+# Background jobs (api/jobs.py), run by `manage.py run_worker`. EAGER runs them inline instead.
+JOB_QUEUE = {
+    "EAGER": env.bool("JOB_QUEUE_EAGER", default=False),
+    "CONCURRENCY": env.int("JOB_WORKER_CONCURRENCY", default=2),  # worker threads
+    "POLL_INTERVAL": env.float("JOB_POLL_INTERVAL", default=1.0),  # seconds between polls of an empty queue
+    "MAX_ATTEMPTS": env.int("JOB_MAX_ATTEMPTS", default=5),
+    "BACKOFF_BASE": 10,  # seconds before the first retry, doubled per attempt
+    "BACKOFF_MAX": 3600,
+    "LOCK_TIMEOUT": 600,  # a job running longer than this is assumed orphaned and requeued
+}
+
+# Channel layer for the notification WebSocket (api/consumers.py). "memory" only reaches
+# sockets served by the same process, so run_worker and a multi-process ASGI server refuse
+# it at startup (api/realtime.py); use "redis" there, or "none" when no sockets are served.
+CHANNEL_LAYER = env.str("CHANNEL_LAYER", default="memory")
+CHANNEL_LAYER_BACKENDS = {
+    "memory": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+    },
+    "redis": {
+        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "CONFIG": {"hosts": [env.str("CHANNEL_REDIS_URL", default="redis://localhost:6379/0")]},
+    },
+}
+# No "default" alias makes get_channel_layer() return None and realtime.send() a no-op
+CHANNEL_LAYERS = {
+    "default": CHANNEL_LAYER_BACKENDS[CHANNEL_LAYER],
+} if CHANNEL_LAYER != "none" else {}
+
+# Resized image variants (api/images.py), built by the job worker after each upload.
+# Formats the installed Pillow cannot encode are skipped.
+IMAGE_VARIANTS = {
+    "FORMATS": env.list("IMAGE_VARIANT_FORMATS", default=["avif", "webp", "jpeg"]),
+    "QUALITY": {"avif": 50, "webp": 75, "jpeg": 80},
+}
+
+# Chunked, resumable post image uploads (api/uploads.py). Chunks are appended to files in
+# TEMP_DIR, which must be shared by all web processes serving the same upload.
+UPLOADS = {
+    "MAX_SIZE": env.int("UPLOAD_MAX_SIZE", default=20 * 1024 * 1024),
+    "CHUNK_SIZE": env.int("UPLOAD_CHUNK_SIZE", default=1024 * 1024),
+    "TEMP_DIR": env.str("UPLOAD_TEMP_DIR", default=str(BASE_DIR / "tmp" / "uploads")),
+    "EXPIRE_HOURS": 24,  # unfinished or unattached uploads are dropped by gc_media after this
+}
+
 # Email settings
 FROM_EMAIL = env.str("FROM_EMAIL", default="no-reply@example.com")
+FRONTEND_URL = env.str("FRONTEND_URL", default="http://localhost:5173")  # password reset links point here
 EMAIL_BACKEND = env.str("EMAIL_BACKEND", default="django.core.mail.backends.console.EmailBackend")
 DEFAULT_FROM_EMAIL = env.str("DEFAULT_FROM_EMAIL", default="no-reply@example.com")
 SERVER_EMAIL = env.str("SERVER_EMAIL", default="server@example.com")
@@ -1,9 +1,11 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.http import JsonResponse
 
+from api.views import serve_media_blob
+
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
@@ -25,6 +27,12 @@ urlpatterns = [
 
     path("admin/", admin.site.urls),
     path("api/v1/", include("api.urls")),
+
+    # Content-addressed uploads, served with far-future cache headers (also when DEBUG is off)
+    re_path(
+        r"^%s(?P<path>cas/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]+)?)$" % settings.MEDIA_URL.lstrip("/"),
+        serve_media_blob,
+    ),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)